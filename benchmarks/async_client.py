@@ -0,0 +1,61 @@
+"""
+Compares query throughput of :any:`AsyncFaunaClient` on one event loop with
+:any:`FaunaClient` driven by a pool of threads, against a local stub server.
+
+Run from the repository root::
+
+  python -m benchmarks.async_client --queries 2000 --concurrency 100 --latency 0.01
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from faunadb.async_client import AsyncFaunaClient
+from tests.stub_server import StubServer
+
+
+def run_threads(server, queries, concurrency):
+  client = server.client(pool_connections=1, pool_maxsize=concurrency)
+  with ThreadPoolExecutor(max_workers=concurrency) as executor:
+    list(executor.map(client.query, range(queries)))
+
+
+def run_async(server, queries, concurrency):
+  async def run():
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(client, i):
+      async with semaphore:
+        return await client.query(i)
+
+    async with AsyncFaunaClient(secret="secret", domain="127.0.0.1", scheme="http",
+                                port=server.port, pool_maxsize=concurrency) as client:
+      await asyncio.gather(*[one(client, i) for i in range(queries)])
+
+  loop = asyncio.new_event_loop()
+  try:
+    loop.run_until_complete(run())
+  finally:
+    loop.close()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+  parser.add_argument("--queries", type=int, default=2000)
+  parser.add_argument("--concurrency", type=int, default=100)
+  parser.add_argument("--latency", type=float, default=0.01,
+                      help="Seconds the stub server waits before answering.")
+  args = parser.parse_args()
+
+  with StubServer(latency=args.latency) as server:
+    for name, runner in [("threads", run_threads), ("asyncio", run_async)]:
+      start = time()
+      runner(server, args.queries, args.concurrency)
+      elapsed = time() - start
+      print("%-8s %6d queries in %6.2fs  %8.1f queries/s" %
+            (name, args.queries, elapsed, args.queries / elapsed))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,45 @@
+"""
+Measures the per-request CPU overhead of each :any:`Transport` against a local stub server.
+
+Queries are sent one at a time, so the numbers reflect the client's own work per
+request rather than concurrency. Run from the repository root::
+
+  python -m benchmarks.transport --queries 5000
+"""
+import argparse
+from time import time
+
+try:
+  from time import thread_time
+except ImportError:
+  from time import clock as thread_time
+
+from faunadb.query import get, index
+from faunadb.transport import Urllib3Transport
+from tests.stub_server import StubServer
+
+
+def run(client, queries):
+  expression = get(index("widgets"))
+  client.query(expression)
+  start_wall, start_cpu = time(), thread_time()
+  for _ in range(queries):
+    client.query(expression)
+  return time() - start_wall, thread_time() - start_cpu
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+  parser.add_argument("--queries", type=int, default=5000)
+  args = parser.parse_args()
+
+  with StubServer() as server:
+    for name, transport in [("requests", None), ("urllib3", Urllib3Transport())]:
+      client = server.client(transport=transport)
+      wall, cpu = run(client, args.queries)
+      print("%-9s %7.1f us CPU/request  %7.1f us wall/request" %
+            (name, cpu / args.queries * 1e6, wall / args.queries * 1e6))
+
+
+if __name__ == "__main__":
+  main()
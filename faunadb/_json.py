@@ -17,7 +17,13 @@ def parse_json(json_string):
 
 
 def parse_json_or_none(json_string):
+  """
+  Like :py:func:`parse_json`, but returns None for invalid JSON.
+  Also accepts UTF-8 encoded bytes, such as a response body.
+  """
   try:
+    if isinstance(json_string, bytes):
+      json_string = json_string.decode("utf-8")
     return parse_json(json_string)
   except ValueError:
     return None
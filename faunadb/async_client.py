@@ -0,0 +1,417 @@
+"""
+Asyncio counterpart of :any:`FaunaClient`.
+
+Requires Python 3.6, and the optional ``aiohttp`` dependency (``pip install faunadb[async]``).
+"""
+import asyncio
+from time import time
+
+import aiohttp
+
+from faunadb.client import _Counter, _default_headers, _LastTxnTime
+from faunadb.errors import _get_or_raise, FaunaError, StreamError, UnexpectedError
+from faunadb.query import _wrap, now, to_micros
+from faunadb.request_result import RequestResult
+from faunadb.streams import ERROR, POLL, START, STREAM, StreamEvent, _history_page, \
+  _history_query, _is_transient, _raise_for_response, _stream_event
+from faunadb.transport import _basic_auth_header
+from faunadb._json import parse_json, parse_json_or_none, to_json
+
+
+class AsyncFaunaClient(object):
+  """
+  Communicates with FaunaDB from an asyncio event loop.
+
+  It has the same surface as :any:`FaunaClient`, except that :py:meth:`query` and
+  :py:meth:`ping` are coroutines. Requests go through a non-blocking ``aiohttp``
+  connection pool, so many queries can be in flight on one event loop at once.
+
+  The connection pool is opened on first use and must be released with :py:meth:`close`,
+  or by using the client as an async context manager::
+
+    async with AsyncFaunaClient(secret="your-secret-here") as client:
+      await client.query(q.paginate(q.indexes()))
+  """
+
+  # pylint: disable=too-many-arguments, too-many-instance-attributes
+  def __init__(
+      self,
+      secret,
+      domain="db.fauna.com",
+      scheme="https",
+      port=None,
+      timeout=60,
+      observer=None,
+      pool_maxsize=100,
+      rate_limiter=None,
+      **kwargs):
+    """
+    :param secret:
+      Auth token for the FaunaDB server.
+    :param domain:
+      Base URL for the FaunaDB server.
+    :param scheme:
+      ``"http"`` or ``"https"``.
+    :param port:
+      Port of the FaunaDB server.
+    :param timeout:
+      Read timeout in seconds.
+    :param observer:
+      Callback that will be passed a :any:`RequestResult` after every completed request.
+    :param pool_maxsize:
+      The maximum number of simultaneous connections in the pool.
+    :param rate_limiter:
+      A :any:`RateLimiter` bounding the rate of requests, and optionally of read and write ops.
+    """
+
+    self.domain = domain
+    self.scheme = scheme
+    self.port = (443 if scheme == "https" else 80) if port is None else port
+
+    self.auth = _basic_auth_header(secret)
+    self.base_url = "%s://%s:%s" % (self.scheme, self.domain, self.port)
+    self.observer = observer
+
+    self.pool_maxsize = pool_maxsize
+    self.rate_limiter = rate_limiter
+
+    self._last_txn_time = kwargs.get('last_txn_time') or _LastTxnTime()
+    self._query_timeout_ms = kwargs.get('query_timeout_ms')
+    if self._query_timeout_ms is not None:
+      self._query_timeout_ms = int(self._query_timeout_ms)
+
+    if ('session' not in kwargs) or ('counter' not in kwargs):
+      self.session = _LazySession(_default_headers(self._query_timeout_ms), timeout,
+                                  pool_maxsize)
+      self.counter = _Counter(1)
+    else:
+      self.session = kwargs['session']
+      self.counter = kwargs['counter']
+
+  def sync_last_txn_time(self, new_txn_time):
+    """
+    Sync the freshest timestamp seen by this client.
+
+    This has no effect if staler than currently stored timestamp.
+    See :any:`FaunaClient.sync_last_txn_time`.
+
+    :param new_txn_time: the new seen transaction time.
+    """
+    self._last_txn_time.update_txn_time(new_txn_time)
+
+  def get_last_txn_time(self):
+    """
+    Get the freshest timestamp reported to this client.
+    """
+    return self._last_txn_time.time
+
+  def get_query_timeout(self):
+    """
+    Get the query timeout for all queries.
+    """
+    return self._query_timeout_ms
+
+  async def close(self):
+    """
+    Release this client. The connection pool is closed once the root client
+    and all of its session clients have been closed.
+    """
+    if self.counter.decrement() == 0:
+      await self.session.close()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *args):
+    await self.close()
+
+  async def query(self, expression, timeout_millis=None):
+    """
+    Use the FaunaDB query API.
+
+    :param expression: A query. See :doc:`query` for information on queries.
+    :param timeout_millis: Query timeout in milliseconds.
+    :return: Converted JSON response.
+    """
+    return await self._execute("POST", "", _wrap(expression), with_txn_time=True,
+                               query_timeout_ms=timeout_millis)
+
+  async def ping(self, scope=None, timeout=None):
+    """
+    Ping FaunaDB.
+    """
+    return await self._execute("GET", "ping", query={"scope": scope, "timeout": timeout})
+
+  def stream(self, expression, **kwargs):
+    """
+    Receive the change events of a document, or of a set, as they happen.
+
+    :param expression: A document ref, or a set.
+    :param kwargs: Options of :any:`AsyncEventStream`, e.g. ``mode``.
+    :return: An :any:`AsyncEventStream`, to iterate over with ``async for``.
+    """
+    return AsyncEventStream(self, expression, **kwargs)
+
+  def new_session_client(self, secret, observer=None, rate_limiter=None):
+    """
+    Create a new client from the existing config with a given secret.
+    The returned client share its parent underlying resources.
+
+    :param secret:
+      Credentials to use when sending requests.
+    :param observer:
+      Callback that will be passed a :any:`RequestResult` after every completed request.
+    :param rate_limiter:
+      A :any:`RateLimiter` for this secret only. Defaults to the parent's.
+    :return:
+    """
+    if self.counter.get_and_increment() > 0:
+      return AsyncFaunaClient(secret=secret,
+                              domain=self.domain,
+                              scheme=self.scheme,
+                              port=self.port,
+                              timeout=self.session.timeout,
+                              observer=observer or self.observer,
+                              session=self.session,
+                              counter=self.counter,
+                              pool_maxsize=self.pool_maxsize,
+                              rate_limiter=rate_limiter or self.rate_limiter,
+                              last_txn_time=self._last_txn_time,
+                              query_timeout_ms=self._query_timeout_ms)
+    else:
+      raise UnexpectedError("Cannnot create a session client from a closed session", None)
+
+  async def _execute(self, action, path, data=None, query=None, with_txn_time=False,
+                     query_timeout_ms=None):
+    """Performs an HTTP action, logs it, and looks for errors."""
+    if query is not None:
+      query = {k: v for k, v in query.items() if v is not None}
+
+    headers = {"Authorization": self.auth}
+
+    if query_timeout_ms is not None:
+      headers["X-Query-Timeout"] = str(query_timeout_ms)
+
+    if with_txn_time:
+      headers.update(self._last_txn_time.request_header)
+
+    rate_limit_wait = 0
+    if self.rate_limiter is not None:
+      rate_limit_wait = await self.rate_limiter.acquire_async()
+
+    start_time = time()
+    response, response_raw = await self._perform_request(action, path, data, query, headers)
+    end_time = time()
+
+    if with_txn_time:
+      if "X-Txn-Time" in response.headers:
+        new_txn_time = int(response.headers["X-Txn-Time"])
+        self.sync_last_txn_time(new_txn_time)
+
+    response_content = parse_json_or_none(response_raw)
+
+    request_result = RequestResult(
+      action, path, query, data,
+      response_raw, response_content, response.status, response.headers,
+      start_time, end_time, rate_limit_wait=rate_limit_wait)
+
+    if self.rate_limiter is not None:
+      self.rate_limiter.record(response.headers)
+    if self.observer is not None:
+      self.observer(request_result)
+
+    if response_content is None:
+      raise UnexpectedError("Invalid JSON.", request_result)
+
+    FaunaError.raise_for_status_code(request_result)
+    return _get_or_raise(request_result, response_content, "resource")
+
+  async def _perform_request(self, action, path, data, query, headers):
+    """Performs an HTTP action, returning the response and its body as bytes."""
+    url = self.base_url + "/" + path
+    async with self.session.get().request(
+        action, url, params=query, data=to_json(data), headers=headers) as response:
+      return response, await response.read()
+
+
+class AsyncEventStream(object):
+  """
+  Asyncio counterpart of :any:`EventStream`::
+
+    async with client.stream(q.ref(q.collection("things"), "1")) as stream:
+      async for event in stream:
+        ...
+
+  Events are read from the connection as they are iterated over, so a slow consumer slows
+  down the server instead of events piling up in memory. Reconnection, catching up on missed
+  events, and :py:data:`POLL` mode work as in :any:`EventStream`; errors that end the stream
+  are raised by iteration.
+  """
+
+  # pylint: disable=too-many-arguments, too-many-instance-attributes
+  def __init__(self, client, expression, fields=None, mode=STREAM, start_ts=None,
+               poll_interval=1.0, page_size=100, reconnect_delay=0.1, max_reconnect_delay=10.0):
+    """
+    See :any:`EventStream` for the parameters.
+    """
+    if mode not in (STREAM, POLL):
+      raise ValueError("mode must be STREAM or POLL.")
+    self.client = client
+    self.expression = _wrap(expression)
+    self.fields = fields
+    self.mode = mode
+    self.poll_interval = poll_interval
+    self.page_size = page_size
+    self.reconnect_delay = reconnect_delay
+    self.max_reconnect_delay = max_reconnect_delay
+    self.last_txn = start_ts
+    """Transaction time of the last event received, or of the last :py:data:`START`."""
+    self.reconnects = 0
+    """Number of times the stream reconnected."""
+
+    self._closed = False
+    # Created on first iteration, since it must belong to the running event loop.
+    self._wakeup = None
+    self._response = None
+
+  async def close(self):
+    """Stops receiving events and closes the connection."""
+    self._closed = True
+    if self._wakeup is not None:
+      self._wakeup.set()
+    if self._response is not None:
+      self._response.close()
+
+  @property
+  def closed(self):
+    return self._closed
+
+  def __aiter__(self):
+    return self._events()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *args):
+    await self.close()
+
+  async def _events(self):
+    self._wakeup = asyncio.Event()
+    delay = self.reconnect_delay
+    while not self._closed:
+      source = self._stream() if self.mode == STREAM else self._poll()
+      try:
+        async for event in source:
+          if event.type == START:
+            delay = self.reconnect_delay
+          yield event
+      except Exception as error: # pylint: disable=broad-except
+        if self._closed:
+          return
+        if not (_is_transient(error) or isinstance(error, (aiohttp.ClientError,
+                                                           asyncio.TimeoutError))):
+          raise
+      finally:
+        await source.aclose()
+      if await self._wait(delay):
+        return
+      delay = min(delay * 2, self.max_reconnect_delay)
+      self.reconnects += 1
+
+  async def _stream(self):
+    start_time = time()
+    async with self.client.session.get().post(
+        self.client.base_url + "/stream", data=to_json(self.expression),
+        params={"fields": ",".join(self.fields)} if self.fields else None,
+        headers={"Authorization": self.client.auth},
+        timeout=aiohttp.ClientTimeout(total=None, sock_read=None)) as response:
+      self._response = response
+      try:
+        if response.status != 200:
+          _raise_for_response(self.expression, response.status, response.headers,
+                              await response.read(), start_time)
+        async for line in response.content:
+          if self._closed:
+            return
+          line = line.strip()
+          if not line:
+            continue
+          event = _stream_event(parse_json(line.decode("utf-8")))
+          if event.type == ERROR:
+            raise StreamError(event)
+          if event.type != START:
+            self.last_txn = event.txn
+            yield event
+            continue
+          yield event
+          if self.last_txn is not None:
+            async for missed in _history(self.client, self.expression, self.last_txn, event.txn,
+                                         self.page_size):
+              self.last_txn = missed.txn
+              yield missed
+          self.last_txn = max(self.last_txn or 0, event.txn)
+      finally:
+        self._response = None
+
+  async def _poll(self):
+    if self.last_txn is None:
+      self.last_txn = await self.client.query(to_micros(now()))
+    yield StreamEvent(START, self.last_txn, self.last_txn)
+    while not self._closed:
+      caught_up = True
+      async for event in _history(self.client, self.expression, self.last_txn, None,
+                                  self.page_size):
+        self.last_txn = event.txn
+        caught_up = False
+        yield event
+      if caught_up and await self._wait(self.poll_interval):
+        return
+
+  async def _wait(self, delay):
+    """Sleeps for ``delay`` seconds, or until the stream is closed. Returns whether it is."""
+    try:
+      await asyncio.wait_for(self._wakeup.wait(), delay)
+    except asyncio.TimeoutError:
+      pass
+    return self._closed
+
+
+async def _history(client, expression, after_txn, until_txn, page_size):
+  """Asyncio counterpart of :py:func:`faunadb.streams._history`."""
+  cursor = after_txn + 1
+  while cursor is not None:
+    missed, cursor = _history_page(
+      await client.query(_history_query(expression, cursor, page_size)), until_txn)
+    for event in missed:
+      yield event
+
+
+class _LazySession(object):
+  """
+  Holds the :class:`aiohttp.ClientSession` shared by a client and its session clients.
+  The session is opened on first use, since it must be created inside a running event loop.
+  Once closed, it is not opened again.
+  """
+
+  def __init__(self, headers, timeout, pool_maxsize):
+    self.headers = headers
+    self.timeout = timeout
+    self.pool_maxsize = pool_maxsize
+    self._session = None
+    self.closed = False
+
+  def get(self):
+    if self.closed:
+      raise UnexpectedError("Cannot send a request through a closed client.", None)
+    if self._session is None or self._session.closed:
+      self._session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=self.pool_maxsize),
+        headers=self.headers,
+        timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout))
+    return self._session
+
+  async def close(self):
+    self.closed = True
+    if self._session is not None:
+      await self._session.close()
+      self._session = None
@@ -0,0 +1,213 @@
+"""Write-behind batching of writes into as few requests as possible."""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import deque
+from concurrent.futures import Future
+import threading
+from time import time
+
+from faunadb import query
+from faunadb.client import DEFAULT_MAX_BATCH_BYTES, _batch_error_index
+from faunadb.errors import BadRequest, HttpError, NotFound, UnexpectedError
+from faunadb.query import _wrap
+from faunadb._json import to_json
+
+
+class BatchWriter(object):
+  """
+  Buffers writes and sends them together, so that many small writes cost few round trips::
+
+    with BatchWriter(client) as writer:
+      futures = [writer.create(q.collection("events"), {"data": event}) for event in events]
+    results = [future.result() for future in futures]
+
+  Each write returns a :class:`concurrent.futures.Future` for its result. A background thread
+  sends the buffered writes as one array expression, whose elements run in a single
+  transaction, once ``max_ops`` writes or ``max_bytes`` of them are buffered, or once the
+  oldest has waited ``max_latency_ms``.
+
+  If a batch fails because of one of its writes, none of it was committed. The failing write
+  gets the error and the others are sent again without it. When the error does not say which
+  write failed, the batch is split in halves until it does. Other errors, such as an
+  :any:`Unauthorized` or an :any:`UnavailableError` left after the client's retries, fail every
+  write of the batch.
+
+  Once ``max_pending`` writes are waiting, further writes block until there is room.
+  """
+
+  # pylint: disable=too-many-arguments, too-many-instance-attributes
+  def __init__(self, client, max_ops=100, max_bytes=DEFAULT_MAX_BATCH_BYTES, max_latency_ms=50,
+               max_pending=None, timeout_millis=None):
+    """
+    :param client: The :any:`FaunaClient` writes are sent with.
+    :param max_ops: Maximum number of writes in a request.
+    :param max_bytes: Maximum size in bytes of a request body.
+    :param max_latency_ms: Maximum milliseconds a write is buffered before it is sent.
+    :param max_pending: Maximum number of buffered writes. Defaults to ``10 * max_ops``.
+    :param timeout_millis: Query timeout in milliseconds, applied to each request.
+    """
+    self.client = client
+    self.max_ops = max_ops
+    self.max_bytes = max_bytes
+    self.max_latency_ms = max_latency_ms
+    self.max_pending = max_pending if max_pending is not None else 10 * max_ops
+    self.timeout_millis = timeout_millis
+    self.batches = 0
+    """Number of requests sent, including those sent again after a failure."""
+
+    self._cond = threading.Condition()
+    self._buffer = deque()
+    self._buffered_bytes = 0
+    self._unfinished = 0
+    self._flushes = 0
+    self._closed = False
+    self._thread = None
+
+  def create(self, collection_ref, params):
+    """Buffers ``create(collection_ref, params)``. See :py:meth:`write`."""
+    return self.write(query.create(collection_ref, params))
+
+  def update(self, ref, params):
+    """Buffers ``update(ref, params)``. See :py:meth:`write`."""
+    return self.write(query.update(ref, params))
+
+  def replace(self, ref, params):
+    """Buffers ``replace(ref, params)``. See :py:meth:`write`."""
+    return self.write(query.replace(ref, params))
+
+  def delete(self, ref):
+    """Buffers ``delete(ref)``. See :py:meth:`write`."""
+    return self.write(query.delete(ref))
+
+  def write(self, expression):
+    """
+    Buffers a write, blocking while ``max_pending`` writes are waiting.
+
+    :param expression: A query.
+    :return: A :class:`concurrent.futures.Future` for the converted JSON response.
+    """
+    op = _Op(_wrap(expression))
+    with self._cond:
+      while len(self._buffer) >= self.max_pending and not self._closed:
+        self._cond.wait()
+      if self._closed:
+        raise UnexpectedError("Cannot write to a closed BatchWriter", None)
+      self._buffer.append(op)
+      self._buffered_bytes += op.size
+      self._unfinished += 1
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="BatchWriter")
+        self._thread.daemon = True
+        self._thread.start()
+      self._cond.notify_all()
+    return op.future
+
+  @property
+  def pending(self):
+    """Number of writes buffered or being sent."""
+    with self._cond:
+      return self._unfinished
+
+  def flush(self):
+    """Sends buffered writes now, and waits until no write is buffered or being sent."""
+    with self._cond:
+      self._flushes += 1
+      self._cond.notify_all()
+      try:
+        while self._unfinished:
+          self._cond.wait()
+      finally:
+        self._flushes -= 1
+
+  def close(self):
+    """Sends buffered writes, waits for them, and stops the background thread."""
+    with self._cond:
+      self._closed = True
+      self._cond.notify_all()
+      thread = self._thread
+    if thread is not None:
+      thread.join()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _run(self):
+    while True:
+      with self._cond:
+        batch = self._next_batch()
+      if batch is None:
+        return
+      sending = [op for op in batch if op.future.set_running_or_notify_cancel()]
+      if sending:
+        self._send(sending)
+      with self._cond:
+        self._unfinished -= len(batch)
+        self._cond.notify_all()
+
+  def _next_batch(self):
+    """Waits until a batch is due and takes it from the buffer, or returns None once closed."""
+    while True:
+      if self._buffer:
+        due = self._buffer[0].added_at + self.max_latency_ms / 1000.0 - time()
+        if (due <= 0 or self._closed or self._flushes or len(self._buffer) >= self.max_ops or
+            self._buffered_bytes + 2 >= self.max_bytes):
+          break
+        self._cond.wait(due)
+      elif self._closed:
+        return None
+      else:
+        self._cond.wait()
+
+    batch, size = [], 2
+    while self._buffer and len(batch) < self.max_ops and \
+        (not batch or size + self._buffer[0].size <= self.max_bytes):
+      op = self._buffer.popleft()
+      batch.append(op)
+      size += op.size
+    self._buffered_bytes -= size - 2
+    self._cond.notify_all()
+    return batch
+
+  def _send(self, batch):
+    """Sends ``batch``, isolating the writes that make it fail."""
+    self.batches += 1
+    try:
+      results = self.client.query([op.expression for op in batch], self.timeout_millis)
+    except HttpError as error:
+      index = _batch_error_index(error, len(batch))
+      if len(batch) == 1:
+        batch[0].future.set_exception(error)
+      elif index is not None:
+        batch[index].future.set_exception(error)
+        self._send(batch[:index] + batch[index + 1:])
+      elif isinstance(error, (BadRequest, NotFound)):
+        half = len(batch) // 2
+        self._send(batch[:half])
+        self._send(batch[half:])
+      else:
+        _fail(batch, error)
+      return
+    except Exception as error: # pylint: disable=broad-except
+      _fail(batch, error)
+      return
+    for op, result in zip(batch, results):
+      op.future.set_result(result)
+
+
+def _fail(batch, error):
+  for op in batch:
+    op.future.set_exception(error)
+
+
+class _Op(object):
+  """A buffered write."""
+  __slots__ = ("expression", "size", "added_at", "future")
+
+  def __init__(self, expression):
+    self.expression = expression
+    self.size = len(to_json(expression).encode("utf-8")) + 1
+    self.added_at = time()
+    self.future = Future()
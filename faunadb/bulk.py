@@ -0,0 +1,470 @@
+"""
+Bulk loading of documents into a collection from JSONL or CSV files, and bulk export of sets
+to JSONL files.
+
+Each line of a JSONL file, or each row of a CSV file with a header, becomes the ``data`` of
+a new document. Exports write each element of a set as a line of JSON, gzipped if the file
+name ends in ``.gz``. Run from the command line::
+
+  export FAUNA_SECRET=...
+  python -m faunadb.bulk import --collection things --checkpoint things.ckpt things.jsonl
+  python -m faunadb.bulk export --collection things --checkpoint export.ckpt things.jsonl.gz
+
+Interrupted loads and exports resume from the checkpoint when run again with the same arguments.
+"""
+# pylint: disable=redefined-builtin
+from builtins import object
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import csv
+import gzip
+from io import BytesIO, open
+import json
+import mmap
+import os
+import sys
+from time import time
+
+from faunadb.client import DEFAULT_MAX_BATCH_BYTES, FaunaClient
+from faunadb.query import _wrap, collection as collection_ref, create, documents, foreach, get, \
+  lambda_, map_, paginate, var
+from faunadb._json import parse_json, to_json
+
+
+class LatencyHistogram(object):
+  """Counts latencies in buckets whose bounds double from 1 millisecond."""
+
+  BUCKETS = 24
+
+  def __init__(self):
+    self.counts = [0] * self.BUCKETS
+    """Number of latencies in each bucket. Bucket ``i`` holds those up to ``2 ** i`` ms."""
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+
+  def record(self, seconds):
+    bucket = 0
+    while bucket < self.BUCKETS - 1 and seconds * 1000 > 2 ** bucket:
+      bucket += 1
+    self.counts[bucket] += 1
+    self.count += 1
+    self.total += seconds
+    self.max = max(self.max, seconds)
+
+  @property
+  def mean(self):
+    return self.total / self.count if self.count else 0.0
+
+  def percentile(self, percentile):
+    """Upper bound in seconds of the bucket holding the ``percentile``-th latency."""
+    rank = self.count * percentile / 100.0
+    seen = 0
+    for bucket, count in enumerate(self.counts):
+      seen += count
+      if count and seen >= rank:
+        return min(2 ** bucket / 1000.0, self.max)
+    return self.max
+
+  def __str__(self):
+    return "\n".join("%8s ms %8d" % ("<= %d" % 2 ** bucket, count)
+                     for bucket, count in enumerate(self.counts) if count)
+
+
+class BulkStats(object):
+  """Progress of a bulk import or export."""
+
+  def __init__(self, offset=0):
+    self.offset = offset
+    """Byte offset in the file up to which every record has been processed."""
+    self.records = 0
+    """Number of documents processed."""
+    self.batches = 0
+    """Number of requests sent."""
+    self.started_at = time()
+    self.latencies = LatencyHistogram()
+    """Latencies of the requests."""
+
+  @property
+  def elapsed(self):
+    return time() - self.started_at
+
+  @property
+  def docs_per_sec(self):
+    elapsed = self.elapsed
+    return self.records / elapsed if elapsed > 0 else 0.0
+
+  def __str__(self):
+    latencies = self.latencies
+    return "%d documents in %d batches, %.1fs, %.0f docs/s; " \
+      "latency mean %.1fms p50 %.0fms p90 %.0fms p99 %.0fms max %.1fms" % (
+        self.records, self.batches, self.elapsed, self.docs_per_sec, latencies.mean * 1000,
+        latencies.percentile(50) * 1000, latencies.percentile(90) * 1000,
+        latencies.percentile(99) * 1000, latencies.max * 1000)
+
+
+class ImportStats(BulkStats):
+  """Progress of :py:func:`import_file`. ``records`` counts documents created."""
+
+
+class ExportStats(BulkStats):
+  """Progress of :py:func:`export_set`. ``records`` counts set elements written."""
+
+  def __init__(self, offset=0, after=None):
+    super(ExportStats, self).__init__(offset)
+    self.after = after
+    """Cursor of the next page to export, or None."""
+    self.done = False
+    """Whether the whole set has been exported."""
+
+
+def read_records(path, format=None, offset=0):
+  """
+  Reads records from a JSONL file, or from a CSV file with a header row. The file is
+  memory-mapped rather than read into memory.
+
+  :param path: Path of the file.
+  :param format: ``"jsonl"`` or ``"csv"``. Defaults to ``"csv"`` for ``.csv`` files.
+  :param offset: Byte offset to start reading from, as yielded for an earlier record.
+  :return: Generator of ``(record, offset)``, ``offset`` being where the record ends.
+  """
+  if format is None:
+    format = "csv" if path.lower().endswith(".csv") else "jsonl"
+  if format not in ("jsonl", "csv"):
+    raise ValueError("Unknown format %r; expected 'jsonl' or 'csv'." % format)
+
+  with open(path, "rb") as source:
+    if os.fstat(source.fileno()).st_size == 0:
+      return
+    data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      read = _read_csv if format == "csv" else _read_jsonl
+      for record in read(data, offset):
+        yield record
+    finally:
+      data.close()
+
+
+def _read_jsonl(data, offset):
+  data.seek(offset)
+  for line in iter(data.readline, b""):
+    if line.strip():
+      yield json.loads(line.decode("utf-8")), data.tell()
+
+
+def _read_csv(data, offset):
+  # The reader pulls one line at a time, so after each row the map is positioned at its end.
+  lines = iter(data.readline, b"")
+  if sys.version_info[0] < 3:
+    # Python 2's csv module only reads bytes, so cells are decoded once split.
+    reader = ([cell.decode("utf-8") for cell in row] for row in csv.reader(lines))
+  else:
+    reader = csv.reader(line.decode("utf-8") for line in lines)
+  header = next(reader, None)
+  if header is None:
+    return
+  if offset > data.tell():
+    data.seek(offset)
+  for row in reader:
+    if row:
+      yield dict(zip(header, row)), data.tell()
+
+
+def import_expression(collection, records):
+  """The query creating a document in ``collection`` with each of ``records`` as its data."""
+  return foreach(lambda_("data", create(collection, {"data": var("data")})), records)
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+def import_file(client, collection, path, format=None, workers=None,
+                max_batch_bytes=DEFAULT_MAX_BATCH_BYTES, max_batch_records=1000, checkpoint=None,
+                checkpoint_interval=1.0, progress=None):
+  """
+  Creates a document for each record of a JSONL or CSV file, see :py:func:`read_records`.
+
+  Records are sent in batches of up to ``max_batch_records`` and ``max_batch_bytes``, each
+  created by one ``foreach`` query in its own transaction, with up to ``workers`` batches in
+  flight at once. Records are read as batches are sent, so memory use does not grow with
+  the file.
+
+  With a ``checkpoint`` path, the offset up to which every record has been written is saved
+  there every ``checkpoint_interval`` seconds and at the end, and a load interrupted by an
+  error or by the process stopping resumes from it. Batches after that offset that had
+  already been written are written again, so documents may be created twice on resume.
+
+  :param client: The :any:`FaunaClient` to write with.
+  :param collection: The collection, as a collection ref or a name.
+  :param path: Path of the file.
+  :param format: ``"jsonl"`` or ``"csv"``. See :py:func:`read_records`.
+  :param workers: Maximum number of batches in flight. Defaults to the client's ``pool_maxsize``.
+  :param max_batch_bytes: Maximum size in bytes of a batch of records.
+  :param max_batch_records: Maximum number of records in a batch.
+  :param checkpoint: Path of the checkpoint file, or None.
+  :param checkpoint_interval: Seconds between checkpoint saves.
+  :param progress: Callback passed the :py:class:`ImportStats` whenever a batch is done.
+  :return: :py:class:`ImportStats` of the load.
+  """
+  if not hasattr(collection, "to_fauna_json"):
+    collection = collection_ref(collection)
+  offset = _load_checkpoint(checkpoint, path) if checkpoint is not None else 0
+  stats = ImportStats(offset)
+  batches = _batches(read_records(path, format, offset), max_batch_bytes, max_batch_records)
+  workers = workers or client.pool_maxsize
+  in_flight = OrderedDict()
+  saved_at = time()
+
+  executor = ThreadPoolExecutor(max_workers=workers)
+  try:
+    while True:
+      # Queue more batches than workers, so that they stay busy while the first one finishes.
+      while len(in_flight) < 2 * workers:
+        batch = next(batches, None)
+        if batch is None:
+          break
+        records, end = batch
+        future = executor.submit(_timed, client.query, import_expression(collection, records))
+        in_flight[future] = (len(records), end)
+      if not in_flight:
+        break
+
+      wait([next(iter(in_flight))])
+      # Only batches whose predecessors are all written move the checkpoint.
+      while in_flight and next(iter(in_flight)).done():
+        future, (count, end) = in_flight.popitem(last=False)
+        stats.latencies.record(future.result())
+        stats.records += count
+        stats.batches += 1
+        stats.offset = end
+      if checkpoint is not None and time() - saved_at >= checkpoint_interval:
+        _save_checkpoint(checkpoint, path, stats)
+        saved_at = time()
+      if progress is not None:
+        progress(stats)
+  finally:
+    for future in in_flight:
+      future.cancel()
+    executor.shutdown(wait=True)
+    if checkpoint is not None:
+      _save_checkpoint(checkpoint, path, stats)
+  return stats
+
+
+# pylint: disable=too-many-arguments, too-many-locals
+def export_set(client, set_query, path, map_lambda=None, size=1000, ts=None, after=None,
+               compress=None, checkpoint=None, progress=None):
+  """
+  Writes every element of a set to a file, one line of JSON per element, in the same format as
+  queries and responses: refs, for instance, are written as ``{"@ref": ...}``.
+
+  Pages of ``size`` elements are written as they arrive, while the next page is fetched,
+  so memory use does not grow with the set.
+
+  With a ``checkpoint`` path, the file offset and cursor after each page are saved there,
+  and an interrupted export resumes from them: the file is truncated to the last page
+  saved and appended to. When compressed, each page is a gzip member of its own, so the
+  file is valid at every page boundary.
+
+  :param client: The :any:`FaunaClient` to read with.
+  :param set_query: The set to export, e.g. ``documents(collection("things"))``.
+  :param path: Path of the file.
+  :param map_lambda: A :any:`lambda_` mapping each element, e.g. to ``get`` the document.
+  :param size: Number of elements per page.
+  :param ts: Transaction time to export the set at, for a consistent snapshot.
+  :param after: Cursor to start from, e.g. the ``after`` of an earlier export.
+  :param compress: Whether to gzip the file. Defaults to whether ``path`` ends in ``.gz``.
+  :param checkpoint: Path of the checkpoint file, or None.
+  :param progress: Callback passed the :py:class:`ExportStats` whenever a page is written.
+  :return: :py:class:`ExportStats` of the export.
+  """
+  if compress is None:
+    compress = path.endswith(".gz")
+  stats = ExportStats(after=after)
+  saved = _load_export_checkpoint(checkpoint, path) if checkpoint is not None else None
+  if saved is not None:
+    stats.offset, stats.done = saved["offset"], saved["done"]
+    stats.after = parse_json(saved["after"])
+    if stats.done:
+      return stats
+
+  def fetch(cursor):
+    queried = paginate(set_query, size=size, ts=ts, after=cursor)
+    if map_lambda is not None:
+      queried = map_(map_lambda, queried)
+    return _timed_result(client.query, queried)
+
+  executor = ThreadPoolExecutor(max_workers=1)
+  with open(path, "r+b" if saved is not None else "wb") as target:
+    target.truncate(stats.offset)
+    target.seek(stats.offset)
+    try:
+      page = executor.submit(fetch, stats.after)
+      while page is not None:
+        latency, result = page.result()
+        after = result.get("after")
+        # Fetch the next page while this one is written.
+        page = executor.submit(fetch, after) if after is not None else None
+        data = b"".join(to_json(element).encode("utf-8") + b"\n" for element in result["data"])
+        target.write(_gzip(data) if compress else data)
+        target.flush()
+        stats.offset = target.tell()
+        stats.after = after
+        stats.done = after is None
+        stats.records += len(result["data"])
+        stats.batches += 1
+        stats.latencies.record(latency)
+        if checkpoint is not None:
+          _save_export_checkpoint(checkpoint, path, stats)
+        if progress is not None:
+          progress(stats)
+    finally:
+      if page is not None:
+        page.cancel()
+      executor.shutdown(wait=True)
+  return stats
+
+
+def _batches(records, max_bytes, max_records):
+  """Groups ``(record, offset)`` pairs into ``(records, offset)`` batches."""
+  batch, size, end = [], 2, 0
+  for record, offset in records:
+    record = _wrap(record)
+    record_size = len(to_json(record).encode("utf-8")) + 1
+    if batch and (size + record_size > max_bytes or len(batch) >= max_records):
+      yield batch, end
+      batch, size = [], 2
+    batch.append(record)
+    size += record_size
+    end = offset
+  if batch:
+    yield batch, end
+
+
+def _timed(func, *args):
+  start = time()
+  func(*args)
+  return time() - start
+
+
+def _timed_result(func, *args):
+  start = time()
+  result = func(*args)
+  return time() - start, result
+
+
+def _load_checkpoint(checkpoint, path):
+  try:
+    with open(checkpoint, encoding="utf-8") as source:
+      saved = json.load(source)
+  except (IOError, OSError):
+    return 0
+  if saved["path"] != os.path.abspath(path):
+    raise ValueError("Checkpoint %s is for %s, not %s." % (checkpoint, saved["path"], path))
+  return saved["offset"]
+
+
+def _save_checkpoint(checkpoint, path, stats):
+  _write_checkpoint(checkpoint, {"path": os.path.abspath(path), "offset": stats.offset,
+                                 "records": stats.records})
+
+
+def _load_export_checkpoint(checkpoint, path):
+  try:
+    with open(checkpoint, encoding="utf-8") as source:
+      saved = json.load(source)
+  except (IOError, OSError):
+    return None
+  if saved["path"] != os.path.abspath(path):
+    raise ValueError("Checkpoint %s is for %s, not %s." % (checkpoint, saved["path"], path))
+  return saved
+
+
+def _save_export_checkpoint(checkpoint, path, stats):
+  _write_checkpoint(checkpoint, {"path": os.path.abspath(path), "offset": stats.offset,
+                                 "after": to_json(stats.after), "done": stats.done,
+                                 "records": stats.records})
+
+
+def _gzip(data):
+  """``data`` as a gzip member, like ``gzip.compress`` of Python 3.2."""
+  buf = BytesIO()
+  with gzip.GzipFile(fileobj=buf, mode="wb") as target:
+    target.write(data)
+  return buf.getvalue()
+
+
+def _write_checkpoint(checkpoint, saved):
+  # Written as bytes, since Python 2's json.dumps returns bytes, which text files do not take.
+  with open(checkpoint + ".tmp", "wb") as target:
+    target.write(json.dumps(saved).encode("utf-8"))
+  _replace(checkpoint + ".tmp", checkpoint)
+
+
+def _replace(source, target):
+  """Renames ``source`` to ``target``, replacing it, like ``os.replace`` of Python 3.3."""
+  if hasattr(os, "replace"):
+    os.replace(source, target)
+    return
+  # On POSIX, rename replaces the target atomically. Windows refuses to replace it, so there
+  # the old checkpoint is removed first, and a crash in between leaves only ``source``.
+  if os.name == "nt" and os.path.exists(target):
+    os.remove(target)
+  os.rename(source, target)
+
+
+def _client_arguments(parser):
+  parser.add_argument("--secret", default=os.environ.get("FAUNA_SECRET"),
+                      help="Secret to connect with. Defaults to $FAUNA_SECRET.")
+  parser.add_argument("--domain", default="db.fauna.com")
+  parser.add_argument("--scheme", default="https")
+  parser.add_argument("--port", type=int)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog="python -m faunadb.bulk",
+                                   description=__doc__.strip().split("\n\n")[0])
+  commands = parser.add_subparsers(dest="command")
+  command = commands.add_parser("import", help="Create a document for each record of a file.")
+  _client_arguments(command)
+  command.add_argument("file")
+  command.add_argument("--collection", required=True, help="Name of the collection.")
+  command.add_argument("--format", choices=["jsonl", "csv"],
+                       help="Format of the file. Defaults to csv for .csv files, else jsonl.")
+  command.add_argument("--workers", type=int, default=8, help="Batches in flight at once.")
+  command.add_argument("--batch-bytes", type=int, default=DEFAULT_MAX_BATCH_BYTES)
+  command.add_argument("--batch-records", type=int, default=1000)
+  command.add_argument("--checkpoint", help="File to save progress to, and resume from.")
+
+  command = commands.add_parser("export", help="Write the documents of a collection to a file.")
+  _client_arguments(command)
+  command.add_argument("file", help="File to write. Gzipped if its name ends in .gz.")
+  command.add_argument("--collection", required=True, help="Name of the collection.")
+  command.add_argument("--size", type=int, default=1000, help="Documents per page.")
+  command.add_argument("--checkpoint", help="File to save progress to, and resume from.")
+  args = parser.parse_args(argv)
+  if args.command is None:
+    parser.error("a command is required")
+  if not args.secret:
+    parser.error("--secret or $FAUNA_SECRET is required")
+
+  def report(stats):
+    sys.stderr.write("\r%d documents, %.0f docs/s" % (stats.records, stats.docs_per_sec))
+
+  if args.command == "import":
+    client = FaunaClient(secret=args.secret, domain=args.domain, scheme=args.scheme,
+                         port=args.port, pool_maxsize=args.workers)
+    stats = import_file(client, args.collection, args.file, args.format, args.workers,
+                        args.batch_bytes, args.batch_records, args.checkpoint, progress=report)
+  else:
+    client = FaunaClient(secret=args.secret, domain=args.domain, scheme=args.scheme,
+                         port=args.port)
+    stats = export_set(client, documents(collection_ref(args.collection)), args.file,
+                       map_lambda=lambda_("ref", get(var("ref"))), size=args.size,
+                       checkpoint=args.checkpoint, progress=report)
+  sys.stderr.write("\n")
+  print(stats)
+  print(stats.latencies)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
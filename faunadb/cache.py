@@ -0,0 +1,212 @@
+"""Caching of read-only query results on the client."""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import OrderedDict
+from hashlib import sha256
+import threading
+from time import time
+
+from faunadb._json import to_json
+
+
+def query_key(auth, expression):
+  """
+  Identifies ``expression`` run with the ``Authorization`` header ``auth``,
+  whatever the order of keys in its objects.
+  """
+  data = auth + "\0" + to_json(expression, sort_keys=True)
+  return sha256(data.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(object):
+  """
+  Storage of a :py:class:`QueryCache`. Keys are strings; values are raw response bodies (bytes).
+  """
+
+  def get(self, key):
+    """The value stored for ``key``, or None if there is none or it expired."""
+    raise NotImplementedError
+
+  def set(self, key, value, ttl):
+    """Stores ``value`` for ``key`` for ``ttl`` seconds, or without expiry if ``ttl`` is None."""
+    raise NotImplementedError
+
+  def clear(self):
+    """Removes all entries."""
+    raise NotImplementedError
+
+  def __len__(self):
+    raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+  """In-process least recently used cache of up to ``max_size`` entries. This is the default."""
+
+  def __init__(self, max_size=1024):
+    self.max_size = max_size
+    self.evictions = 0
+    """Number of entries evicted to make room for new ones."""
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.pop(key, None)
+      if entry is None:
+        return None
+      if entry[0] is not None and entry[0] <= time():
+        return None
+      self._entries[key] = entry
+      return entry[1]
+
+  def set(self, key, value, ttl):
+    with self._lock:
+      self._entries.pop(key, None)
+      self._entries[key] = (None if ttl is None else time() + ttl, value)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    with self._lock:
+      return len(self._entries)
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+
+
+class MappingBackend(CacheBackend):
+  """
+  Stores entries in any dict-like object, such as a ``multiprocessing.Manager().dict()``
+  shared by several processes. Once ``max_size`` entries are stored, expired entries are
+  purged, and new entries are not stored until there is room again.
+  """
+
+  def __init__(self, mapping, max_size=1024):
+    self.mapping = mapping
+    self.max_size = max_size
+
+  def get(self, key):
+    entry = self.mapping.get(key)
+    if entry is None or (entry[0] is not None and entry[0] <= time()):
+      return None
+    return entry[1]
+
+  def set(self, key, value, ttl):
+    if len(self.mapping) >= self.max_size:
+      now = time()
+      for stale, entry in list(self.mapping.items()):
+        if entry[0] is not None and entry[0] <= now:
+          self.mapping.pop(stale, None)
+      if len(self.mapping) >= self.max_size:
+        return
+    self.mapping[key] = (None if ttl is None else time() + ttl, value)
+
+  def clear(self):
+    self.mapping.clear()
+
+  def __len__(self):
+    return len(self.mapping)
+
+
+class QueryCache(object):
+  """
+  Read-through cache of query results for :any:`FaunaClient`.
+
+  Results are keyed by the query, serialized with sorted keys, and by the secret it ran with,
+  so clients for different secrets never see each other's results. Only read-only queries
+  are cached; queries with writes or function calls always go to the database, and so do
+  queries reading the clock or generating ids, such as ``now()`` or ``new_id()``.
+
+  With ``default=True`` every read-only query is cached unless it is run with
+  ``cache=False``; otherwise only queries run with ``cache=True`` are.
+
+  With ``snapshot=True``, cached queries instead run at a pinned snapshot: they are wrapped
+  in ``at(ts, ...)``, with ``ts`` the last transaction time the client has seen, and cached
+  for that ``ts``. Results at a snapshot never change, so there is nothing to invalidate and
+  all cached reads are consistent with each other. The snapshot moves forward once the
+  client has seen a transaction time more than ``max_staleness`` seconds past it, so reads
+  may miss writes made less than ``max_staleness`` ago, including the client's own.
+  Until the client has seen a transaction time, queries are not cached.
+  """
+
+  # pylint: disable=too-many-arguments
+  def __init__(self, backend=None, max_size=1024, ttl=60.0, default=True, snapshot=False,
+               max_staleness=1.0):
+    """
+    :param backend: A :py:class:`CacheBackend`. Defaults to a :py:class:`MemoryBackend`.
+    :param max_size: Maximum number of entries of the default backend.
+    :param ttl:
+      Seconds a result is served from the cache, or None to keep it until evicted.
+      In snapshot mode, results are valid for as long as their snapshot is pinned; ``ttl``
+      then only frees entries early.
+    :param default: Whether queries are cached unless they opt out.
+    :param snapshot: Whether to cache results at a pinned snapshot rather than for ``ttl``.
+    :param max_staleness: Seconds the snapshot may lag the last transaction time seen.
+    """
+    self.backend = backend if backend is not None else MemoryBackend(max_size)
+    self.ttl = ttl
+    self.default = default
+    self.snapshot = snapshot
+    self.max_staleness = max_staleness
+    self._lock = threading.Lock()
+    self._snapshot_ts = None
+    self.hits = 0
+    """Number of queries answered from the cache."""
+    self.misses = 0
+    """Number of cacheable queries sent to the database."""
+
+  @property
+  def hit_rate(self):
+    """Share of cacheable queries answered from the cache."""
+    with self._lock:
+      total = self.hits + self.misses
+      return self.hits / float(total) if total else 0.0
+
+  @property
+  def snapshot_ts(self):
+    """Transaction time, in microseconds, of the snapshot queries currently run at, or None."""
+    with self._lock:
+      return self._snapshot_ts
+
+  def pin(self, last_txn_time):
+    """
+    The snapshot to run a query at, given the client's last transaction time,
+    moving it forward first if it is too stale. None if no time has been seen yet.
+    """
+    with self._lock:
+      if last_txn_time is not None and (
+          self._snapshot_ts is None or
+          last_txn_time - self._snapshot_ts > self.max_staleness * 1000000):
+        self._snapshot_ts = last_txn_time
+      return self._snapshot_ts
+
+  def key(self, auth, expression):
+    """The cache key of ``expression`` run with the ``Authorization`` header ``auth``."""
+    return query_key(auth, expression)
+
+  def get(self, key):
+    """The raw response body cached for ``key``, or None. Counts a hit or a miss."""
+    value = self.backend.get(key)
+    with self._lock:
+      if value is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+    return value
+
+  def set(self, key, value):
+    self.backend.set(key, value, self.ttl)
+
+  def clear(self):
+    """Removes all cached results."""
+    self.backend.clear()
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+    if hasattr(self.backend, "_after_fork"):
+      self.backend._after_fork() # pylint: disable=protected-access
@@ -0,0 +1,127 @@
+"""Failing fast while the database cannot be reached."""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import namedtuple
+import threading
+from time import time
+
+from faunadb.errors import CircuitOpenError
+
+CLOSED = "closed"
+"""Requests are sent normally."""
+OPEN = "open"
+"""Requests fail fast with a :any:`CircuitOpenError`."""
+HALF_OPEN = "half-open"
+"""A probe is checking whether the database has recovered."""
+
+CircuitStateChange = namedtuple("CircuitStateChange", ["previous", "state", "failures", "time"])
+"""
+Passed to a :py:class:`CircuitBreaker`'s observer when its state changes.
+``failures`` is the number of consecutive failures seen at that point.
+"""
+
+
+class CircuitBreaker(object):
+  """
+  Stops a :any:`FaunaClient` from sending requests to a database it cannot reach.
+
+  The breaker is *closed* at first. After ``failure_threshold`` consecutive failures
+  (connection errors, timeouts or 503 responses) it *opens*, and requests fail at once with
+  a :any:`CircuitOpenError` instead of each waiting for the client's timeout.
+
+  Once ``reset_timeout`` seconds have passed, the next request makes the breaker *half-open*
+  and first sends a ``ping``. If the ping succeeds the breaker closes and the request goes
+  ahead; otherwise it opens again for another ``reset_timeout``. Other requests keep failing
+  fast while the ping is in flight.
+
+  A breaker may be shared by several clients talking to the same endpoint.
+  """
+
+  def __init__(self, failure_threshold=5, reset_timeout=30.0, observer=None):
+    """
+    :param failure_threshold: Number of consecutive failures that open the breaker.
+    :param reset_timeout: Seconds the breaker stays open before probing the database.
+    :param observer: Callback passed a :py:class:`CircuitStateChange` on every change of state.
+    """
+    if failure_threshold < 1:
+      raise ValueError("failure_threshold must be at least 1.")
+    self.failure_threshold = failure_threshold
+    self.reset_timeout = reset_timeout
+    self.observer = observer
+
+    self._lock = threading.Lock()
+    self._state = CLOSED
+    self._failures = 0
+    self._opened_at = None
+
+  @property
+  def state(self):
+    """:py:data:`CLOSED`, :py:data:`OPEN` or :py:data:`HALF_OPEN`."""
+    with self._lock:
+      return self._state
+
+  @property
+  def failures(self):
+    """Number of consecutive failures."""
+    with self._lock:
+      return self._failures
+
+  def before_request(self, probe):
+    """
+    Checks that a request may be sent, probing the database first if it is time to.
+
+    :param probe: Callable returning whether the database is healthy.
+    :raises CircuitOpenError: If the breaker is open, or the probe failed.
+    """
+    if self._state == CLOSED:
+      return
+    with self._lock:
+      if self._state == CLOSED:
+        return
+      if self._state == HALF_OPEN or time() < self._opened_at + self.reset_timeout:
+        raise CircuitOpenError("Circuit breaker is %s; request not sent." % self._state)
+      change = self._set_state(HALF_OPEN)
+    self._notify(change)
+
+    healthy = False
+    try:
+      healthy = probe()
+    finally:
+      with self._lock:
+        if healthy:
+          self._failures = 0
+          change = self._set_state(CLOSED)
+        else:
+          self._opened_at = time()
+          change = self._set_state(OPEN)
+      self._notify(change)
+    if not healthy:
+      raise CircuitOpenError("Circuit breaker probe failed; request not sent.")
+
+  def record_success(self):
+    """Records a request that reached the database."""
+    if self._failures:
+      with self._lock:
+        self._failures = 0
+
+  def record_failure(self):
+    """Records a request that failed because the database could not be reached."""
+    with self._lock:
+      self._failures += 1
+      if self._state != CLOSED or self._failures < self.failure_threshold:
+        return
+      self._opened_at = time()
+      change = self._set_state(OPEN)
+    self._notify(change)
+
+  def _set_state(self, state):
+    change = CircuitStateChange(self._state, state, self._failures, time())
+    self._state = state
+    return change
+
+  def _notify(self, change):
+    if self.observer is not None:
+      self.observer(change)
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
@@ -1,18 +1,32 @@
 from time import time
 # pylint: disable=redefined-builtin
 from builtins import object
+from collections import OrderedDict
+import os
 import threading
+import weakref
 
-from requests import Request, Session
+from future.utils import raise_from
+from requests import codes, Session
 from requests.auth import HTTPBasicAuth
-from requests.adapters import HTTPAdapter
-
-from faunadb.errors import _get_or_raise, FaunaError, UnexpectedError
-from faunadb.query import _wrap
+from requests.exceptions import ConnectionError as RequestsConnectionError, \
+  Timeout as RequestsTimeout
+
+from faunadb.cache import query_key
+from faunadb.deadline import current_deadline
+from faunadb.errors import _get_or_raise, BatchError, DeadlineExceededError, FaunaError, \
+  HttpError, UnexpectedError
+from faunadb.parallel import _WorkerPool, query_many
+from faunadb.pool import ManagedHTTPAdapter
+from faunadb.query import _is_deterministic, _is_read_only, _wrap, at
 from faunadb.request_result import RequestResult
+from faunadb.retry import _is_connect_error, NO_RETRY
+from faunadb.streams import EventStream
+from faunadb.transport import RequestsTransport, _basic_auth_header
 from faunadb._json import parse_json_or_none, to_json
 
 API_VERSION = "3"
+DEFAULT_MAX_BATCH_BYTES = 1024 * 1024
 
 class _LastTxnTime(object):
   """Wraps tracking the last transaction time supplied from the database."""
@@ -35,6 +49,9 @@ class _LastTxnTime(object):
       return {}
     return { "X-Last-Txn-Time" : str(t) }
 
+  def _after_fork(self):
+    self._lock = threading.Lock()
+
   def update_txn_time(self, new_txn_time):
       """Updates the internal transaction time.
       In order to maintain a monotonically-increasing value, `newTxnTime`
@@ -64,6 +81,9 @@ class _Counter(object):
       self.counter -= 1
       return self.counter
 
+  def _after_fork(self):
+    self.lock = threading.Lock()
+
 class FaunaClient(object):
   """
   Directly communicates with FaunaDB via JSON.
@@ -71,6 +91,10 @@ class FaunaClient(object):
   For data sent to the server, the ``to_fauna_json`` method will be called on any values.
   It is encouraged to pass e.g. :any:`Ref` objects instead of raw JSON data.
 
+  Clients can be created before forking, for instance by pre-fork servers or
+  ``multiprocessing`` pools: a child process opens connections of its own
+  and keeps the last transaction time seen by its parent.
+
   All methods return a converted JSON response.
   This is a dict containing lists, ints, floats, strings, and other dicts.
   Any :any:`Ref`, :any:`SetRef`, :any:`FaunaTime`, or :class:`datetime.date`
@@ -90,6 +114,21 @@ class FaunaClient(object):
       observer=None,
       pool_connections=10,
       pool_maxsize=10,
+      retry_policy=None,
+      hedging_policy=None,
+      concurrency_limiter=None,
+      rate_limiter=None,
+      transport=None,
+      compression_policy=None,
+      circuit_breaker=None,
+      endpoints=None,
+      prewarm=0,
+      idle_timeout=None,
+      max_connection_age=None,
+      max_session_clients=1000,
+      session_client_ttl=None,
+      query_cache=None,
+      single_flight=None,
       **kwargs):
     """
     :param secret:
@@ -108,44 +147,135 @@ class FaunaClient(object):
       The number of connection pools to cache.
     :param pool_maxsize:
       The maximum number of connections to save in the pool.
+    :param retry_policy:
+      A :any:`RetryPolicy` for requests that fail for transient reasons.
+      By default, nothing is retried.
+    :param hedging_policy:
+      A :any:`HedgingPolicy` for duplicating slow read-only queries. By default, nothing is hedged.
+    :param concurrency_limiter:
+      An :any:`AdaptiveLimiter` bounding the number of requests in flight.
+    :param rate_limiter:
+      A :any:`RateLimiter` bounding the rate of requests, and optionally of read and write ops.
+    :param transport:
+      The :any:`Transport` requests are sent with. Defaults to a :any:`RequestsTransport`
+      using this client's ``session``; :any:`Urllib3Transport` costs less CPU per request.
+      A transport created without a timeout of its own uses ``timeout``.
+    :param compression_policy:
+      A :any:`CompressionPolicy` for compressing large request bodies.
+      By default, nothing is compressed.
+    :param circuit_breaker:
+      A :any:`CircuitBreaker` failing requests fast while the database cannot be reached.
+    :param endpoints:
+      An :any:`EndpointPool` to spread requests over several endpoints, with failover.
+      If given, ``domain``, ``scheme`` and ``port`` are ignored.
+    :param prewarm:
+      Number of connections to open to each endpoint when the client is created, so that
+      the first requests do not pay for TCP and TLS handshakes. Capped at ``pool_maxsize``.
+    :param idle_timeout:
+      Seconds after which an idle pooled connection is closed rather than reused.
+      Set it below the idle timeout of any load balancer in front of the database.
+    :param max_connection_age:
+      Seconds after which a pooled connection is closed rather than reused.
+    :param max_session_clients:
+      Maximum number of session clients cached by :py:meth:`for_secret`.
+    :param session_client_ttl:
+      Seconds after which :py:meth:`for_secret` replaces a cached session client,
+      or None to keep it.
+    :param query_cache:
+      A :any:`QueryCache` for the results of read-only queries. By default, nothing is cached.
+    :param single_flight:
+      A :any:`SingleFlight` sending identical read-only queries in flight at once only once.
+      By default, every query is sent.
     """
 
     self.domain = domain
     self.scheme = scheme
     self.port = (443 if scheme == "https" else 80) if port is None else port
 
-    self.auth = HTTPBasicAuth(secret, "")
+    self._secret = secret
     self.base_url = "%s://%s:%s" % (self.scheme, self.domain, self.port)
     self.observer = observer
+    self.timeout = timeout
 
     self.pool_connections = pool_connections
     self.pool_maxsize = pool_maxsize
-
+    self.retry_policy = retry_policy
+    self.hedging_policy = hedging_policy
+    self.concurrency_limiter = concurrency_limiter
+    self.rate_limiter = rate_limiter
+    self.compression_policy = compression_policy
+    self.query_cache = query_cache
+    self.single_flight = single_flight
+    self.circuit_breaker = circuit_breaker
+    self.endpoints = endpoints
+
+    self._session = None
     self._last_txn_time = kwargs.get('last_txn_time') or _LastTxnTime()
     self._query_timeout_ms = kwargs.get('query_timeout_ms')
     if self._query_timeout_ms is not None:
       self._query_timeout_ms = int(self._query_timeout_ms)
 
-    if ('session' not in kwargs) or ('counter' not in kwargs):
+    is_root = ('session' not in kwargs) or ('counter' not in kwargs)
+    if is_root:
       self.session = Session()
-      self.session.mount('https://', HTTPAdapter(pool_connections=pool_connections,
-                                                 pool_maxsize=pool_maxsize))
-      self.session.mount('http://', HTTPAdapter(pool_connections=pool_connections,
-                                                pool_maxsize=pool_maxsize))
+      adapter_kwargs = {"idle_timeout": idle_timeout, "max_age": max_connection_age,
+                        "pool_maxsize": pool_maxsize}
+      self.session.mount('https://', ManagedHTTPAdapter(pool_connections=pool_connections,
+                                                        **adapter_kwargs))
+      self.session.mount('http://', ManagedHTTPAdapter(pool_connections=pool_connections,
+                                                       **adapter_kwargs))
+      for endpoint in endpoints.endpoints if endpoints is not None else ():
+        self.session.mount(endpoint.base_url + "/", ManagedHTTPAdapter(pool_connections=1,
+                                                                       **adapter_kwargs))
       self.counter = _Counter(1)
+      self._workers = _WorkerPool(pool_maxsize)
 
-      self.session.headers.update({
-        "Accept-Encoding": "gzip",
-        "Content-Type": "application/json;charset=utf-8",
-        "X-Fauna-Driver": "python",
-        "X-FaunaDB-API-Version": API_VERSION
-      })
-      if self._query_timeout_ms is not None:
-        self.session.headers["X-Query-Timeout"] = str(self._query_timeout_ms)
+      self.session.headers.update(_default_headers(self._query_timeout_ms))
       self.session.timeout = timeout
     else:
       self.session = kwargs['session']
       self.counter = kwargs['counter']
+      self._workers = kwargs.get('workers') or _WorkerPool(pool_maxsize)
+
+    if transport is None:
+      transport = RequestsTransport(self.session, timeout)
+    else:
+      transport.use_client_timeout(timeout)
+    self.transport = transport
+    self._headers = _default_headers(self._query_timeout_ms)
+    self._headers["Authorization"] = _basic_auth_header(secret)
+    if endpoints is not None:
+      endpoints.start_health_checks(_endpoint_check(self.transport, self._headers))
+    self.max_session_clients = max_session_clients
+    self.session_client_ttl = session_client_ttl
+    self._session_clients = _SessionClientCache(max_session_clients, session_client_ttl)
+
+    self._pid = os.getpid()
+    _CLIENTS.add(self)
+
+    if is_root and prewarm:
+      for endpoint in endpoints.endpoints if endpoints is not None else (self,):
+        self.transport.prewarm(endpoint.base_url, prewarm)
+
+  @property
+  def auth(self):
+    """The ``requests`` basic auth for this client's secret."""
+    return HTTPBasicAuth(self._secret, "")
+
+  @property
+  def session(self):
+    """
+    The ``requests`` :class:`Session` of this client. Setting it also makes the client's
+    :any:`RequestsTransport` send requests through the new session.
+    """
+    return self._session
+
+  @session.setter
+  def session(self, session):
+    transport = getattr(self, "transport", None)
+    if isinstance(transport, RequestsTransport) and transport.session is self._session:
+      transport.session = session
+    self._session = session
 
   def sync_last_txn_time(self, new_txn_time):
     """
@@ -175,17 +305,148 @@ class FaunaClient(object):
 
   def __del__(self):
     if self.counter.decrement() == 0:
+      if self.endpoints is not None:
+        self.endpoints.close()
+      self.transport.close()
       self.session.close()
+      self._workers.shutdown()
 
-  def query(self, expression, timeout_millis=None):
+  def query(self, expression, timeout_millis=None, read_only=None, cache=None):
     """
     Use the FaunaDB query API.
 
     :param expression: A query. See :doc:`query` for information on queries.
     :param timeout_millis: Query timeout in milliseconds.
+    :param read_only:
+      Whether the query only reads. Read-only queries may be retried after any transient
+      failure, see ``retry_policy``, hedged, see ``hedging_policy``, cached, see
+      ``query_cache``, and coalesced, see ``single_flight``.
+      If None, this is detected from the query: it must not contain writes or function calls.
+      Queries reading the clock or generating ids, such as ``now()`` or ``new_id()``, are
+      never cached nor coalesced.
+    :param cache:
+      Whether a read-only query may be answered from, and stored in, the ``query_cache``.
+      Defaults to the cache's ``default``.
     :return: Converted JSON response.
     """
-    return self._execute("POST", "", _wrap(expression), with_txn_time=True, query_timeout_ms=timeout_millis)
+    expression = _wrap(expression)
+    query_cache = self.query_cache
+    if query_cache is not None and not (query_cache.default if cache is None else cache):
+      query_cache = None
+    if read_only is None and (query_cache is not None or self.single_flight is not None or
+                              self.hedging_policy is not None):
+      read_only = _is_read_only(expression)
+    if not read_only:
+      return self._execute("POST", "", expression, with_txn_time=True,
+                           query_timeout_ms=timeout_millis, read_only=read_only)
+
+    single_flight = self.single_flight
+    if (query_cache is not None or single_flight is not None) and \
+        not _is_deterministic(expression):
+      # Another run would return another result, so it cannot be shared.
+      query_cache = single_flight = None
+    key = None
+    on_success = None
+    if query_cache is not None and query_cache.snapshot:
+      snapshot_ts = query_cache.pin(self._last_txn_time.time)
+      if snapshot_ts is None:
+        query_cache = None
+      else:
+        expression = at(snapshot_ts, expression)
+    if query_cache is not None:
+      # In snapshot mode, the key includes the snapshot through the at() wrapper.
+      key = query_cache.key(self._headers["Authorization"], expression)
+      raw = query_cache.get(key)
+      if raw is not None:
+        return parse_json_or_none(raw)["resource"]
+      on_success = lambda response: query_cache.set(key, response.content)
+    if single_flight is not None:
+      if key is None:
+        key = query_key(self._headers["Authorization"], expression)
+      return self._query_coalesced(key, expression, timeout_millis, on_success)
+    return self._execute("POST", "", expression, with_txn_time=True,
+                         query_timeout_ms=timeout_millis, hedge=self.hedging_policy is not None,
+                         on_success=on_success, read_only=True)
+
+  def _query_coalesced(self, key, expression, timeout_millis, on_success):
+    """Runs a read-only query through the ``single_flight``."""
+    start_time = time()
+
+    def send(land):
+      def landed(response):
+        if on_success is not None:
+          on_success(response)
+        land(response)
+      return self._execute("POST", "", expression, with_txn_time=True,
+                           query_timeout_ms=timeout_millis, hedge=self.hedging_policy is not None,
+                           on_success=landed, read_only=True)
+
+    sent, value = self.single_flight.run(key, send)
+    if sent:
+      return value
+    content = parse_json_or_none(value.content)
+    if self.observer is not None:
+      self.observer(RequestResult(
+        "POST", "", None, expression, value.content, content, value.status_code, value.headers,
+        start_time, time(), coalesced=True))
+    return content["resource"]
+
+  def query_batch(self, expressions, timeout_millis=None, max_batch_bytes=DEFAULT_MAX_BATCH_BYTES):
+    """
+    Run several independent queries in as few round trips as possible.
+
+    The expressions are sent together as one array expression, so all expressions
+    in a request run in a single transaction. If the serialized array would be larger
+    than ``max_batch_bytes``, the expressions are split over several requests.
+
+    :param expressions: Iterable of queries.
+    :param timeout_millis: Query timeout in milliseconds, applied to each request.
+    :param max_batch_bytes: Maximum size in bytes of a request body.
+    :return: List of converted JSON responses, one per expression.
+    :raises BatchError: If an expression fails. It identifies the failing expression.
+    """
+    expressions = [_wrap(expression) for expression in expressions]
+    results = []
+    for start, end in _batch_bounds(expressions, max_batch_bytes):
+      batch = expressions[start:end]
+      try:
+        results.extend(self.query(batch, timeout_millis))
+      except HttpError as error:
+        index = _batch_error_index(error, len(batch))
+        if index is None:
+          raise
+        raise_from(BatchError(start + index, batch[index], error, results), error)
+    return results
+
+  def query_many(self, expressions, max_concurrency=None, ordered=True, timeout_millis=None):
+    """
+    Run independent queries concurrently, each in its own transaction.
+
+    Queries run on a worker pool shared with this client's session clients. The pool
+    has ``pool_maxsize`` workers, so queries never need more connections than the
+    connection pool keeps open.
+
+    :param expressions: Iterable of queries. It is consumed lazily.
+    :param max_concurrency:
+      Maximum number of these queries in flight at once.
+      Defaults to, and is capped at, ``pool_maxsize``.
+    :param ordered:
+      If true, outcomes are yielded in the order of ``expressions``; otherwise as queries complete.
+    :param timeout_millis: Query timeout in milliseconds.
+    :return:
+      Generator of :any:`QueryOutcome`, one per expression. Errors are captured in
+      the outcome instead of being raised.
+    """
+    return query_many(self, self._workers, expressions, max_concurrency, ordered, timeout_millis,
+                      current_deadline())
+
+  def pool_stats(self):
+    """
+    Statistics of the connection pools shared by this client and its session clients.
+
+    :return: A :any:`PoolStats`, or None if the transport does not keep statistics.
+    """
+    return self.transport.pool_stats()
 
   def ping(self, scope=None, timeout=None):
     """
@@ -193,7 +454,17 @@ class FaunaClient(object):
     """
     return self._execute("GET", "ping", query={"scope": scope, "timeout": timeout})
 
-  def new_session_client(self, secret, observer=None):
+  def stream(self, expression, **kwargs):
+    """
+    Receive the change events of a document, or of a set, as they happen.
+
+    :param expression: A document ref, or a set.
+    :param kwargs: Options of :any:`EventStream`, e.g. ``on_event`` or ``mode``.
+    :return: An :any:`EventStream`, started by iterating over it or by its ``start``.
+    """
+    return EventStream(self, expression, **kwargs)
+
+  def new_session_client(self, secret, observer=None, rate_limiter=None):
     """
     Create a new client from the existing config with a given secret.
     The returned client share its parent underlying resources.
@@ -202,6 +473,8 @@ class FaunaClient(object):
       Credentials to use when sending requests.
     :param observer:
       Callback that will be passed a :any:`RequestResult` after every completed request.
+    :param rate_limiter:
+      A :any:`RateLimiter` for this secret only. Defaults to the parent's.
     :return:
     """
     if self.counter.get_and_increment() > 0:
@@ -209,23 +482,59 @@ class FaunaClient(object):
                          domain=self.domain,
                          scheme=self.scheme,
                          port=self.port,
-                         timeout=self.session.timeout,
+                         timeout=self.timeout,
                          observer=observer or self.observer,
                          session=self.session,
                          counter=self.counter,
+                         workers=self._workers,
                          pool_connections=self.pool_connections,
                          pool_maxsize=self.pool_maxsize,
+                         retry_policy=self.retry_policy,
+                         hedging_policy=self.hedging_policy,
+                         concurrency_limiter=self.concurrency_limiter,
+                         rate_limiter=rate_limiter or self.rate_limiter,
+                         transport=self.transport,
+                         compression_policy=self.compression_policy,
+                         query_cache=self.query_cache,
+                         single_flight=self.single_flight,
+                         max_session_clients=self.max_session_clients,
+                         session_client_ttl=self.session_client_ttl,
+                         circuit_breaker=self.circuit_breaker,
+                         endpoints=self.endpoints,
                          last_txn_time=self._last_txn_time,
                          query_timeout_ms=self._query_timeout_ms)
     else:
       raise UnexpectedError("Cannnot create a session client from a closed session", None)
 
-  def _execute(self, action, path, data=None, query=None, with_txn_time=False, query_timeout_ms=None):
-    """Performs an HTTP action, logs it, and looks for errors."""
+  def for_secret(self, secret):
+    """
+    Like :py:meth:`new_session_client`, but returns a cached session client for ``secret``
+    when there is one. Use it when serving many secrets, e.g. one per end user.
+
+    Up to ``max_session_clients`` clients are cached, the least recently used being evicted
+    first. A cached client is replaced once it is older than ``session_client_ttl``.
+    Evicted clients release their hold on the shared connection pool as soon as
+    their callers are done with them.
+
+    :param secret: Credentials to use when sending requests.
+    :return: A session client sharing this client's connection pool.
+    """
+    return self._session_clients.get(secret, self.new_session_client)
+
+  def _execute(self, action, path, data=None, query=None, with_txn_time=False,
+               query_timeout_ms=None, hedge=False, on_success=None, read_only=None):
+    """
+    Performs an HTTP action, logs it, and looks for errors.
+    ``on_success``, if given, is called with a successful HTTP response before it is returned.
+    ``read_only`` is whether ``data`` is a read-only query; if None, it is detected when needed.
+    """
+    if not _AT_FORK and self._pid != os.getpid():
+      _after_fork_in_child()
+
     if query is not None:
       query = {k: v for k, v in query.items() if v is not None}
 
-    headers = {}
+    headers = dict(self._headers)
 
     if query_timeout_ms is not None:
       headers["X-Query-Timeout"] = str(query_timeout_ms)
@@ -233,34 +542,288 @@ class FaunaClient(object):
     if with_txn_time:
         headers.update(self._last_txn_time.request_header)
 
+    body, request_bytes, compressed_bytes = self._encode_body(data, headers)
+    policy = self.retry_policy or NO_RETRY
+    if read_only is None and policy.max_attempts > 1:
+      read_only = action == "GET" or _is_read_only(data)
+    # Whether sending the request again cannot run a write twice.
+    resend = read_only or policy.retry_writes
+    backoff = policy.backoff()
+    breaker = self.circuit_breaker
+    deadline = current_deadline()
+    while True:
+      if breaker is not None:
+        breaker.before_request(self._probe)
+      rate_limit_wait = self.rate_limiter.acquire() if self.rate_limiter is not None else 0
+      timeout = self._request_timeout(deadline, headers, query_timeout_ms)
+      try:
+        attempt = self._send_limited(action, path, body, query, headers, timeout, with_txn_time,
+                                     hedge)
+      except (RequestsConnectionError, RequestsTimeout) as error:
+        if breaker is not None:
+          breaker.record_failure()
+        if isinstance(error, RequestsConnectionError) and \
+            (resend or _is_connect_error(error)) and backoff.retry(deadline):
+          continue
+        if deadline is not None and deadline.expired:
+          raise_from(DeadlineExceededError(
+            "Deadline of %ss exceeded: %s" % (deadline.timeout, error)), error)
+        raise
+
+      response = attempt.response
+      if breaker is not None:
+        if response.status_code == codes.unavailable:
+          breaker.record_failure()
+        else:
+          breaker.record_success()
+      if self.rate_limiter is not None:
+        self.rate_limiter.record(response.headers)
+
+      content = attempt.content
+      succeeded = 200 <= response.status_code <= 299 and \
+        isinstance(content, dict) and "resource" in content
+      if succeeded and on_success is not None:
+        on_success(response)
+      if succeeded and self.observer is None:
+        # Nothing would look at a RequestResult, so don't build one.
+        return content["resource"]
+
+      request_result = RequestResult(
+        action, path, query, data,
+        response.content, content, response.status_code, response.headers,
+        attempt.start_time, attempt.end_time, backoff.attempt, attempt.hedged, attempt.hedge_won,
+        rate_limit_wait, request_bytes, compressed_bytes)
+      if self.observer is not None:
+        self.observer(request_result)
+
+      if not resend or request_result.status_code not in policy.retry_on_status or \
+          not backoff.retry(deadline):
+        break
+
+    if request_result.response_content is None:
+      raise UnexpectedError("Invalid JSON.", request_result)
+
+    FaunaError.raise_for_status_code(request_result)
+    return _get_or_raise(request_result, request_result.response_content, "resource")
+
+  def _after_fork(self, reset):
+    """
+    Replaces the resources this client inherited from its parent process: connections,
+    threads and locks. ``reset`` holds the ids of shared resources already replaced
+    through another client.
+    """
+    self._pid = os.getpid()
+    resources = [self.counter, self._last_txn_time, self._workers, self.endpoints,
+                 self._session_clients, self.query_cache, self.single_flight, self.hedging_policy,
+                 self.concurrency_limiter, self.rate_limiter, self.circuit_breaker]
+    for resource in resources:
+      if resource is not None and id(resource) not in reset:
+        reset.add(id(resource))
+        resource._after_fork()
+    if id(self.transport) not in reset:
+      reset.add(id(self.transport))
+      self.transport.after_fork()
+
+  def _request_timeout(self, deadline, headers, query_timeout_ms):
+    """
+    ``(connect, read)`` timeouts for the next attempt of a request, or None for the transport's
+    own. Under a :any:`Deadline`, they and the request's ``X-Query-Timeout`` are bounded by
+    the time left.
+
+    :raises DeadlineExceededError: If the deadline has passed.
+    """
+    if deadline is None:
+      return None
+    timeout = deadline.request_timeout()
+    if timeout is None:
+      raise DeadlineExceededError("Deadline of %ss exceeded; request not sent." % deadline.timeout)
+    budget_ms = max(1, int(timeout[1] * 1000))
+    query_timeout_ms = query_timeout_ms or self._query_timeout_ms
+    headers["X-Query-Timeout"] = str(budget_ms if query_timeout_ms is None
+                                     else min(query_timeout_ms, budget_ms))
+    return timeout
+
+  def _encode_body(self, data, headers):
+    """
+    Serializes ``data``, compressing it according to the ``compression_policy``.
+
+    :return: The body, its uncompressed size, and its compressed size or None.
+    """
+    body = to_json(data)
+    if self.compression_policy is None:
+      return body, len(body), None
+
+    body = body.encode("utf-8")
+    compressed = self.compression_policy.compress(body)
+    if compressed is None:
+      return body, len(body), None
+    headers["Content-Encoding"] = self.compression_policy.encoding
+    return compressed, len(body), len(compressed)
+
+  def _probe(self):
+    """Pings the database on behalf of the ``circuit_breaker``, bypassing it."""
+    try:
+      response = self._perform_request("GET", "ping", to_json(None), None, self._headers, None)
+    except (RequestsConnectionError, RequestsTimeout):
+      return False
+    return response.status_code == codes.ok
+
+  def _send_limited(self, *args):
+    """Calls :py:meth:`_send` within a slot of the ``concurrency_limiter``, if there is one."""
+    limiter = self.concurrency_limiter
+    if limiter is None:
+      return self._send(*args)
+
+    limiter.acquire()
+    start_time = time()
+    latency, dropped, succeeded = None, True, False
+    try:
+      attempt = self._send(*args)
+      latency = attempt.end_time - attempt.start_time
+      status_code = attempt.response.status_code
+      dropped = status_code == codes.unavailable
+      succeeded = 200 <= status_code <= 299
+      return attempt
+    finally:
+      limiter.release(time() - start_time if latency is None else latency, dropped, succeeded)
+
+  def _send(self, action, path, body, query, headers, timeout, with_txn_time, hedge):
+    """Performs one attempt of an HTTP action and parses its response."""
     start_time = time()
-    response = self._perform_request(action, path, data, query, headers)
-    end_time = time()
+    if hedge:
+      response, hedged, hedge_won = self.hedging_policy.run(
+        lambda: self._perform_request(action, path, body, query, headers, timeout))
+      end_time = time()
+      self.hedging_policy.record(end_time - start_time)
+    else:
+      response = self._perform_request(action, path, body, query, headers, timeout)
+      hedged = hedge_won = False
+      end_time = time()
 
     if with_txn_time:
       if "X-Txn-Time" in response.headers:
         new_txn_time = int(response.headers["X-Txn-Time"])
         self.sync_last_txn_time(new_txn_time)
 
-    response_raw = response.text
-    response_content = parse_json_or_none(response_raw)
+    return _Attempt(response, parse_json_or_none(response.content), start_time, end_time,
+                    hedged, hedge_won)
 
-    request_result = RequestResult(
-      action, path, query, data,
-      response_raw, response_content, response.status_code, response.headers,
-      start_time, end_time)
+  def _perform_request(self, action, path, body, query, headers, timeout):
+    """Performs an HTTP action."""
+    if self.endpoints is not None:
+      return self.endpoints.perform(self.transport, action, path, query, body, headers, timeout)
+    return self.transport.perform(action, self.base_url + "/" + path, query, body, headers, timeout)
 
-    if self.observer is not None:
-      self.observer(request_result)
 
-    if response_content is None:
-      raise UnexpectedError("Invalid JSON.", request_result)
+class _SessionClientCache(object):
+  """Session clients by secret, for :any:`FaunaClient.for_secret`. Least recently used first."""
 
-    FaunaError.raise_for_status_code(request_result)
-    return _get_or_raise(request_result, response_content, "resource")
+  def __init__(self, max_size, ttl):
+    self.max_size = max_size
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self._clients = OrderedDict()
 
-  def _perform_request(self, action, path, data, query, headers):
-    """Performs an HTTP action."""
-    url = self.base_url + "/" + path
-    req = Request(action, url, params=query, data=to_json(data), auth=self.auth, headers=headers)
-    return self.session.send(self.session.prepare_request(req))
+  def __len__(self):
+    with self._lock:
+      return len(self._clients)
+
+  def get(self, secret, create):
+    """The cached client for ``secret``, or a new one from ``create(secret)``."""
+    evicted = []
+    now = time()
+    with self._lock:
+      entry = self._clients.pop(secret, None)
+      if entry is not None and self.ttl is not None and now - entry[1] >= self.ttl:
+        evicted.append(entry)
+        entry = None
+      if entry is None:
+        entry = (create(secret), now)
+      self._clients[secret] = entry
+      while len(self._clients) > self.max_size:
+        evicted.append(self._clients.popitem(last=False)[1])
+    # Evicted clients are released here, outside the lock, unless a caller still uses them.
+    del evicted
+    return entry[0]
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+
+
+_CLIENTS = weakref.WeakSet()
+"""Live clients, whose resources must be replaced in a child process after fork."""
+
+_AT_FORK = hasattr(os, "register_at_fork")
+"""Whether fork is detected by a hook, rather than by checking the process id on each request."""
+
+
+def _after_fork_in_child():
+  reset = set()
+  for client in list(_CLIENTS):
+    client._after_fork(reset) # pylint: disable=protected-access
+
+if _AT_FORK:
+  os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class _Attempt(object):
+  """One attempt of a request. Turned into a :any:`RequestResult` only if something needs one."""
+  __slots__ = ("response", "content", "start_time", "end_time", "hedged", "hedge_won")
+
+  # pylint: disable=too-many-arguments
+  def __init__(self, response, content, start_time, end_time, hedged, hedge_won):
+    self.response = response
+    self.content = content
+    self.start_time = start_time
+    self.end_time = end_time
+    self.hedged = hedged
+    self.hedge_won = hedge_won
+
+
+def _default_headers(query_timeout_ms):
+  """Headers sent with every request of a client."""
+  headers = {
+    "Accept-Encoding": "gzip",
+    "Content-Type": "application/json;charset=utf-8",
+    "X-Fauna-Driver": "python",
+    "X-FaunaDB-API-Version": API_VERSION
+  }
+  if query_timeout_ms is not None:
+    headers["X-Query-Timeout"] = str(query_timeout_ms)
+  return headers
+
+
+def _endpoint_check(transport, headers):
+  """
+  Health check for an :any:`EndpointPool`: a ping sent straight to the endpoint.
+  It holds no reference to the client, so that the client can still be collected.
+  """
+  body = to_json(None)
+  def check(endpoint):
+    response = transport.perform("GET", endpoint.base_url + "/ping", None, body, headers)
+    return response.status_code == codes.ok
+  return check
+
+
+def _batch_bounds(expressions, max_bytes):
+  """
+  Splits ``expressions`` into ``(start, end)`` ranges whose serialized arrays fit in ``max_bytes``.
+  An expression larger than ``max_bytes`` gets a range of its own.
+  """
+  start, size = 0, 2
+  for i, expression in enumerate(expressions):
+    expression_size = len(to_json(expression).encode("utf-8")) + 1
+    if i > start and size + expression_size > max_bytes:
+      yield start, i
+      start, size = i, 2
+    size += expression_size
+  if start < len(expressions):
+    yield start, len(expressions)
+
+
+def _batch_error_index(error, batch_size):
+  """Index of the array element an error's ``position`` points at, or None."""
+  position = error.errors[0].position if error.errors else None
+  if position and isinstance(position[0], int) and 0 <= position[0] < batch_size:
+    return position[0]
+  return None
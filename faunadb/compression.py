@@ -0,0 +1,52 @@
+"""Compression of request bodies."""
+# pylint: disable=redefined-builtin
+from builtins import object
+import zlib
+
+from future.utils import raise_from
+
+
+class CompressionPolicy(object):
+  """
+  Configures compression of large request bodies by :any:`FaunaClient`.
+
+  Bodies of at least ``threshold`` bytes are compressed and sent with a ``Content-Encoding``
+  header. ``"gzip"`` is always available; ``"zstd"`` needs the ``zstandard`` package and an
+  endpoint that accepts it. :any:`RequestResult.request_bytes` and
+  :any:`RequestResult.request_compressed_bytes` record the effect of compression.
+  """
+
+  def __init__(self, encoding="gzip", threshold=16 * 1024, level=6):
+    """
+    :param encoding: ``"gzip"`` or ``"zstd"``.
+    :param threshold: Minimum size in bytes of a body to compress.
+    :param level: Compression level. 1-9 for gzip, 1-22 for zstd.
+    """
+    if encoding == "gzip":
+      self._compress = lambda data: _gzip(data, level)
+    elif encoding == "zstd":
+      try:
+        import zstandard
+      except ImportError as error:
+        raise_from(ImportError("zstd compression requires the zstandard package."), error)
+      self._compress = zstandard.ZstdCompressor(level=level).compress
+    else:
+      raise ValueError("Unsupported encoding %r; use \"gzip\" or \"zstd\"." % encoding)
+    self.encoding = encoding
+    self.threshold = threshold
+    self.level = level
+
+  def compress(self, data):
+    """
+    Compresses ``data`` if it is at least ``threshold`` bytes long.
+
+    :return: The compressed bytes, or None if ``data`` should be sent as is.
+    """
+    if len(data) < self.threshold:
+      return None
+    return self._compress(data)
+
+
+def _gzip(data, level):
+  compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+  return compressor.compress(data) + compressor.flush()
@@ -0,0 +1,93 @@
+"""Bounding the total time spent on a unit of work, across requests."""
+# pylint: disable=redefined-builtin
+from builtins import object
+import threading
+from time import time
+
+_local = threading.local()
+
+
+class Deadline(object):
+  """
+  A time by which a unit of work must be done, however many requests it takes.
+
+  Within a ``with`` block, :any:`FaunaClient.query`, :any:`FaunaClient.ping`,
+  :any:`FaunaClient.query_batch`, :any:`FaunaClient.query_many` and
+  :any:`Page.set_iterator` share the budget::
+
+    with Deadline(2.0):
+      instance = client.query(q.get(ref))
+      for ref in Page.set_iterator(client, q.match(index, term)):
+        ...
+
+  Each request gets a read timeout and an ``X-Query-Timeout`` bounded by the time left,
+  and a connect timeout bounded by ``connect_timeout`` too. Retries and further pages
+  stop once the time is up. A request cut short by the deadline, or started after it,
+  raises a :any:`DeadlineExceededError`.
+
+  Deadlines apply to the thread that entered them. When they are nested,
+  the earliest one applies.
+  """
+
+  def __init__(self, timeout, connect_timeout=None):
+    """
+    :param timeout: Seconds from now until the deadline.
+    :param connect_timeout: Maximum seconds to wait for each new connection.
+    """
+    self.timeout = timeout
+    self.connect_timeout = connect_timeout
+    self.expires_at = time() + timeout
+
+  def remaining(self):
+    """Seconds left until the deadline. Negative once it has passed."""
+    return self.expires_at - time()
+
+  @property
+  def expired(self):
+    return self.remaining() <= 0
+
+  def request_timeout(self):
+    """
+    ``(connect, read)`` timeouts in seconds for a request sent now, or None once expired.
+    """
+    remaining = self.remaining()
+    if remaining <= 0:
+      return None
+    connect = remaining if self.connect_timeout is None else min(self.connect_timeout, remaining)
+    return connect, remaining
+
+  def __enter__(self):
+    stack = _stack()
+    outer = stack[-1] if stack else None
+    stack.append(self if outer is None or self.expires_at <= outer.expires_at else outer)
+    return self
+
+  def __exit__(self, *args):
+    _stack().pop()
+
+
+def current_deadline():
+  """The :py:class:`Deadline` applying to the current thread, or None."""
+  stack = getattr(_local, "stack", None)
+  return stack[-1] if stack else None
+
+
+def _stack():
+  stack = getattr(_local, "stack", None)
+  if stack is None:
+    stack = _local.stack = []
+  return stack
+
+
+class _Within(object):
+  """Runs a callable within a deadline, e.g. on another thread."""
+
+  def __init__(self, deadline, func):
+    self.deadline = deadline
+    self.func = func
+
+  def __call__(self, *args, **kwargs):
+    if self.deadline is None:
+      return self.func(*args, **kwargs)
+    with self.deadline:
+      return self.func(*args, **kwargs)
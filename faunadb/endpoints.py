@@ -0,0 +1,214 @@
+"""Spreading the requests of a client over several endpoints."""
+# pylint: disable=redefined-builtin
+from builtins import object
+import random
+import threading
+from time import time
+try:
+  from urllib.parse import urlparse
+except ImportError:
+  from urlparse import urlparse
+
+from requests import codes
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from faunadb.retry import _is_connect_error
+
+LEAST_OUTSTANDING = "least_outstanding"
+"""Pick the endpoint with the fewest requests in flight."""
+EWMA = "ewma"
+"""Pick the endpoint with the lowest moving average latency, weighted by its requests in flight."""
+
+
+class Endpoint(object):
+  """One FaunaDB endpoint of an :py:class:`EndpointPool`, with its load and health."""
+
+  def __init__(self, domain, scheme="https", port=None):
+    """
+    :param domain: Host name of the endpoint.
+    :param scheme: ``"http"`` or ``"https"``.
+    :param port: Port of the endpoint.
+    """
+    self.domain = domain
+    self.scheme = scheme
+    self.port = (443 if scheme == "https" else 80) if port is None else port
+    self.base_url = "%s://%s:%s" % (self.scheme, self.domain, self.port)
+
+    self.outstanding = 0
+    """Number of requests in flight."""
+    self.latency = None
+    """Moving average of response times in seconds, or None before the first response."""
+    self.healthy = True
+    """Whether requests are sent to this endpoint."""
+    self.requests = 0
+    """Number of requests sent."""
+    self.failures = 0
+    """Number of requests that failed with a connection error or a 503 response."""
+
+  @staticmethod
+  def from_url(url):
+    """An endpoint for a URL such as ``"https://db.fauna.com:443"``."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+      raise ValueError("Invalid endpoint URL %r." % url)
+    return Endpoint(parsed.hostname, parsed.scheme, parsed.port)
+
+  def __repr__(self):
+    return "Endpoint(%r)" % self.base_url
+
+
+class EndpointPool(object):
+  """
+  Spreads the requests of a :any:`FaunaClient` over several endpoints, such as regional
+  endpoints or local proxies, each with a connection pool of its own.
+
+  Each request goes to the healthy endpoint preferred by ``strategy``:
+  :py:data:`LEAST_OUTSTANDING` or :py:data:`EWMA`. If it cannot connect, the endpoint is
+  ejected and the request fails over to the next one; it only fails when every endpoint
+  has been tried. A request whose connection fails once it was sent is not resent, since
+  the server may have run it. Every ``health_check_interval`` seconds, a background thread pings all
+  endpoints, ejecting those that do not answer and bringing back those that recover.
+
+  Transaction times are tracked across all endpoints, so reads never go back in time
+  when a request lands on another endpoint.
+  """
+
+  def __init__(self, endpoints, strategy=LEAST_OUTSTANDING, health_check_interval=5.0,
+               latency_weight=0.3):
+    """
+    :param endpoints:
+      List of :py:class:`Endpoint` or of URLs such as ``"https://db.fauna.com"``.
+    :param strategy:
+      :py:data:`LEAST_OUTSTANDING` or :py:data:`EWMA`.
+    :param health_check_interval:
+      Seconds between background pings, or None not to check health.
+      Without health checks, endpoints are never ejected.
+    :param latency_weight:
+      Weight of each new response time in an endpoint's moving average latency.
+    """
+    if strategy not in (LEAST_OUTSTANDING, EWMA):
+      raise ValueError("Unknown strategy %r." % strategy)
+    self.endpoints = [e if isinstance(e, Endpoint) else Endpoint.from_url(e) for e in endpoints]
+    if not self.endpoints:
+      raise ValueError("At least one endpoint is required.")
+    self.strategy = strategy
+    self.health_check_interval = health_check_interval
+    self.latency_weight = latency_weight
+
+    self._lock = threading.Lock()
+    self._check = None
+    self._checker = None
+    self._stopped = threading.Event()
+
+  @property
+  def healthy(self):
+    """Endpoints requests are currently sent to."""
+    with self._lock:
+      return [endpoint for endpoint in self.endpoints if endpoint.healthy]
+
+  def choose(self, exclude=()):
+    """
+    The endpoint the next request should go to, excluding those in ``exclude``.
+    Ejected endpoints are only chosen when no healthy endpoint is left.
+    """
+    with self._lock:
+      candidates = [e for e in self.endpoints if e not in exclude]
+      healthy = [e for e in candidates if e.healthy]
+      candidates = healthy or candidates
+      if self.strategy == LEAST_OUTSTANDING:
+        score = lambda endpoint: endpoint.outstanding
+      else:
+        score = lambda endpoint: (endpoint.latency or 0) * (endpoint.outstanding + 1)
+      best = min(score(endpoint) for endpoint in candidates)
+      return random.choice([endpoint for endpoint in candidates if score(endpoint) == best])
+
+  # pylint: disable=too-many-arguments
+  def perform(self, transport, method, path, params, body, headers, timeout=None):
+    """
+    Sends a request with ``transport`` to the preferred endpoint, failing over to the others
+    if it cannot connect. See :any:`Transport.perform`.
+    """
+    tried = []
+    while True:
+      endpoint = self.choose(tried)
+      tried.append(endpoint)
+      self._start(endpoint)
+      start_time = time()
+      try:
+        response = transport.perform(method, endpoint.base_url + "/" + path, params, body, headers,
+                                     timeout)
+      except RequestsConnectionError as error:
+        connect_error = _is_connect_error(error)
+        self._finish(endpoint, None, connect_error)
+        if connect_error and len(tried) < len(self.endpoints):
+          continue
+        raise
+      except Exception:
+        self._finish(endpoint, None, False)
+        raise
+      self._finish(endpoint, time() - start_time, response.status_code == codes.unavailable)
+      return response
+
+  def start_health_checks(self, check):
+    """
+    Starts the background thread calling ``check(endpoint)`` for every endpoint once per
+    ``health_check_interval``. ``check`` returns whether the endpoint is healthy.
+    """
+    with self._lock:
+      if self.health_check_interval is None or self._checker is not None:
+        return
+      self._check = check
+      self._start_checker()
+
+  def close(self):
+    """Stops the health checks."""
+    with self._lock:
+      checker, self._checker = self._checker, None
+    if checker is not None:
+      self._stopped.set()
+      if checker is not threading.current_thread():
+        checker.join()
+
+  def _start_checker(self):
+    self._stopped.clear()
+    self._checker = threading.Thread(target=self._check_health, args=(self._check,))
+    self._checker.daemon = True
+    self._checker.start()
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+    self._stopped = threading.Event()
+    for endpoint in self.endpoints:
+      endpoint.outstanding = 0
+    if self._checker is not None:
+      self._start_checker()
+
+  def _start(self, endpoint):
+    with self._lock:
+      endpoint.outstanding += 1
+      endpoint.requests += 1
+
+  def _finish(self, endpoint, latency, failed):
+    with self._lock:
+      endpoint.outstanding -= 1
+      if latency is not None:
+        if endpoint.latency is None:
+          endpoint.latency = latency
+        else:
+          endpoint.latency += self.latency_weight * (latency - endpoint.latency)
+      if failed:
+        endpoint.failures += 1
+        # Only eject endpoints that could not be reached, and only if a health check
+        # will bring them back.
+        if latency is None and self._checker is not None:
+          endpoint.healthy = False
+
+  def _check_health(self, check):
+    while not self._stopped.wait(self.health_check_interval):
+      for endpoint in self.endpoints:
+        try:
+          healthy = check(endpoint)
+        except Exception: # pylint: disable=broad-except
+          healthy = False
+        with self._lock:
+          endpoint.healthy = healthy
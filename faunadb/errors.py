@@ -98,6 +98,61 @@ class UnavailableError(HttpError):
 
 #endregion
 
+class BatchError(FaunaError):
+  """
+  Raised by :any:`FaunaClient.query_batch` when one of the batched expressions fails.
+  """
+
+  def __init__(self, index, expression, cause, results):
+    super(BatchError, self).__init__(
+      "Expression %s of the batch failed: %s" % (index, cause), cause.request_result)
+    self.index = index
+    """Index of the failed expression in the batch."""
+    self.expression = expression
+    """The failed expression."""
+    self.cause = cause
+    """The :py:class:`HttpError` returned for the request containing the failed expression."""
+    self.results = results
+    """
+    Results of the expressions sent in earlier requests of the batch.
+    These were committed before the failing request was sent.
+    """
+
+
+class LimitExceededError(FaunaError):
+  """Raised when a client-side limit does not allow a request to be sent."""
+
+  def __init__(self, description):
+    super(LimitExceededError, self).__init__(description, None)
+
+
+class CircuitOpenError(FaunaError):
+  """Raised instead of sending a request while a :any:`CircuitBreaker` is open."""
+
+  def __init__(self, description):
+    super(CircuitOpenError, self).__init__(description, None)
+
+
+class DeadlineExceededError(FaunaError):
+  """Raised instead of sending a request once its :any:`Deadline` has passed."""
+
+  def __init__(self, description):
+    super(DeadlineExceededError, self).__init__(description, None)
+
+
+class StreamError(FaunaError):
+  """Raised when the server ends an event stream with an error event."""
+
+  def __init__(self, event):
+    details = event.event if isinstance(event.event, dict) else {}
+    super(StreamError, self).__init__(
+      "Stream failed: %s" % details.get("description", event.event), None)
+    self.event = event
+    """The error :any:`StreamEvent`."""
+    self.code = details.get("code")
+    """The error code, e.g. ``"permission denied"``."""
+
+
 class ErrorData(object):
   """
   Data for one error returned by the server.
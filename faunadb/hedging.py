@@ -0,0 +1,241 @@
+"""Hedged requests: duplicating slow read-only queries to cut tail latency."""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import deque
+import heapq
+from itertools import count
+import threading
+from time import time
+
+from faunadb.parallel import _WorkerPool
+from faunadb.pool import _CancelScope
+
+
+class HedgingPolicy(object):
+  """
+  Configures hedging of read-only queries by :any:`FaunaClient`.
+
+  A query is sent on the caller's thread. If no response arrives within ``delay``, the
+  ``percentile`` of recently observed latencies, a duplicate is sent from a worker thread on
+  another pooled connection, and whichever response comes first is used. The slower request
+  is cancelled by shutting down its connection, which frees it at once. This needs the
+  connection pools of the client's own transports; with another transport, the slower
+  request runs to completion, and the caller waits for its own request even if the
+  duplicate answered first.
+
+  Hedges are paid for from a budget: every request adds ``max_extra_load`` to it and every
+  hedge spends 1, so hedges add at most that fraction of extra requests.
+
+  Writes are never hedged. :any:`RequestResult.hedged` and :any:`RequestResult.hedge_won`
+  report hedging to the observer, and :py:attr:`hedge_rate` and :py:attr:`win_rate`
+  summarize it.
+  """
+
+  # pylint: disable=too-many-arguments, too-many-instance-attributes
+  def __init__(self, percentile=95, max_extra_load=0.05, initial_delay=0.1, min_delay=0.005,
+               window=1000, min_samples=20, max_workers=32):
+    """
+    :param percentile:
+      Percentile of recent latencies after which a hedge is sent.
+    :param max_extra_load:
+      Maximum fraction of extra requests hedging may add.
+    :param initial_delay:
+      Delay in seconds used until ``min_samples`` latencies have been observed.
+    :param min_delay:
+      Lower bound in seconds for the delay.
+    :param window:
+      Number of recent latencies the percentile is computed from.
+    :param min_samples:
+      Number of latencies needed before the percentile is used.
+    :param max_workers:
+      Maximum number of threads sending hedges.
+    """
+    if not 0 < percentile < 100:
+      raise ValueError("percentile must be between 0 and 100.")
+    self.percentile = percentile
+    self.max_extra_load = max_extra_load
+    self.initial_delay = initial_delay
+    self.min_delay = min_delay
+    self.min_samples = min_samples
+
+    self._lock = threading.Lock()
+    self._latencies = deque(maxlen=window)
+    self._recompute_every = max(1, window // 20)
+    self._since_recompute = 0
+    self._delay = initial_delay
+    self._budget = 0.0
+    self._workers = _WorkerPool(max_workers)
+    self._timer = _Timer()
+
+    self.requests = 0
+    """Number of hedgeable requests sent."""
+    self.hedges = 0
+    """Number of hedges sent."""
+    self.wins = 0
+    """Number of hedges whose response arrived first."""
+
+  @property
+  def delay(self):
+    """Seconds to wait for a response before hedging."""
+    with self._lock:
+      return self._delay
+
+  @property
+  def hedge_rate(self):
+    """Fraction of hedgeable requests that were hedged."""
+    with self._lock:
+      return float(self.hedges) / self.requests if self.requests else 0.0
+
+  @property
+  def win_rate(self):
+    """Fraction of hedges whose response arrived first."""
+    with self._lock:
+      return float(self.wins) / self.hedges if self.hedges else 0.0
+
+  def record(self, latency):
+    """Adds the latency in seconds of a hedgeable request to the window."""
+    with self._lock:
+      self._latencies.append(latency)
+      self._since_recompute += 1
+      if len(self._latencies) >= self.min_samples and \
+          self._since_recompute >= self._recompute_every:
+        self._since_recompute = 0
+        ordered = sorted(self._latencies)
+        index = int(len(ordered) * self.percentile / 100.0)
+        self._delay = ordered[index if index < len(ordered) else -1]
+        if self._delay < self.min_delay:
+          self._delay = self.min_delay
+
+  def run(self, send):
+    """
+    Calls ``send`` and, if it is slow, a second time concurrently.
+
+    :return: ``(response, hedged, hedge_won)``.
+    """
+    with self._lock:
+      self.requests += 1
+      self._budget = min(self._budget + self.max_extra_load, 10.0)
+      delay = self._delay
+
+    hedge = _Hedge()
+    self._timer.schedule(time() + delay, lambda: self._start_hedge(hedge, send))
+    response = error = None
+    try:
+      with hedge.primary:
+        response = send()
+    except Exception as primary_error: # pylint: disable=broad-except
+      error = primary_error
+
+    with hedge.lock:
+      hedge.primary_done = True
+      if hedge.winner is None and error is None:
+        hedge.winner = _PRIMARY
+      hedged = hedge.scope is not None
+    if hedge.winner is _PRIMARY:
+      if hedged:
+        hedge.scope.cancel()
+      return response, hedged, False
+    if hedged:
+      hedge.done.wait()
+      if hedge.winner is _HEDGE:
+        return hedge.response, True, True
+    raise error
+
+  def _start_hedge(self, hedge, send):
+    """Called by the timer once the primary request is slow."""
+    with hedge.lock:
+      if hedge.primary_done or not self._spend():
+        return
+      hedge.scope = _CancelScope()
+    self._workers.get().submit(self._send_hedge, hedge, send)
+
+  def _send_hedge(self, hedge, send):
+    response = None
+    try:
+      if hedge.winner is None:
+        with hedge.scope:
+          response = send()
+    except Exception: # pylint: disable=broad-except
+      pass
+    with hedge.lock:
+      won = response is not None and hedge.winner is None
+      if won:
+        hedge.winner = _HEDGE
+        hedge.response = response
+    hedge.done.set()
+    if won:
+      with self._lock:
+        self.wins += 1
+      hedge.primary.cancel()
+
+  def _spend(self):
+    with self._lock:
+      if self._budget < 1:
+        return False
+      self._budget -= 1
+      self.hedges += 1
+      return True
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+    self._workers._after_fork()
+    self._timer._after_fork()
+
+
+_PRIMARY = "primary"
+_HEDGE = "hedge"
+
+
+class _Hedge(object):
+  """A hedgeable request: its primary request, and its hedge once one is sent."""
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.primary = _CancelScope()
+    self.primary_done = False
+    self.scope = None
+    """The hedge's :py:class:`_CancelScope`, once the hedge is sent."""
+    self.done = threading.Event()
+    """Set once the hedge completed."""
+    self.winner = None
+    self.response = None
+    """The hedge's response, if it won."""
+
+
+class _Timer(object):
+  """Calls functions at given times, on one background thread started when first needed."""
+
+  def __init__(self):
+    self._condition = threading.Condition()
+    self._scheduled = []
+    self._sequence = count()
+    self._thread = None
+
+  def schedule(self, when, function):
+    with self._condition:
+      heapq.heappush(self._scheduled, (when, next(self._sequence), function))
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="HedgingTimer")
+        self._thread.daemon = True
+        self._thread.start()
+      self._condition.notify()
+
+  def _run(self):
+    while True:
+      with self._condition:
+        while True:
+          if not self._scheduled:
+            self._condition.wait()
+            continue
+          remaining = self._scheduled[0][0] - time()
+          if remaining <= 0:
+            break
+          self._condition.wait(remaining)
+        _, _, function = heapq.heappop(self._scheduled)
+      function()
+
+  def _after_fork(self):
+    # The timer thread did not survive the fork.
+    self._condition = threading.Condition()
+    self._scheduled = []
+    self._thread = None
@@ -0,0 +1,330 @@
+"""Client-side limits on the load a client puts on the database."""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import deque
+import threading
+from time import sleep, time
+
+from faunadb.errors import LimitExceededError
+
+
+class AdaptiveLimiter(object):
+  """
+  Limits the number of requests a :any:`FaunaClient` has in flight, adapting the limit
+  to how the database is coping (additive increase, multiplicative decrease).
+
+  After each request the limit:
+
+  * shrinks by ``backoff_ratio`` if the request was dropped (a 503 response, a
+    connection error or a timeout), or if its latency exceeded ``latency_tolerance``
+    times the lowest latency of the requests that succeeded recently;
+  * grows by ``1 / limit`` if the request succeeded while at least half of the limit was
+    in use, i.e. by about 1 per round trip of a busy client.
+
+  Callers over the limit wait in a first-come, first-served queue, or fail fast with
+  a :any:`LimitExceededError` if ``max_wait`` is 0.
+  """
+
+  # pylint: disable=too-many-arguments, too-many-instance-attributes
+  def __init__(self, initial_limit=20, min_limit=1, max_limit=200, backoff_ratio=0.9,
+               latency_tolerance=2.0, max_wait=None, baseline_window=1000):
+    """
+    :param initial_limit:
+      Number of requests allowed in flight at first.
+    :param min_limit:
+      Lower bound for the limit.
+    :param max_limit:
+      Upper bound for the limit.
+    :param backoff_ratio:
+      Factor applied to the limit when the database shows congestion.
+    :param latency_tolerance:
+      Latency, as a multiple of the baseline latency, above which a request counts as congested.
+    :param max_wait:
+      Seconds a caller may wait for a free slot before :any:`LimitExceededError` is raised.
+      None to wait indefinitely, 0 to fail fast.
+    :param baseline_window:
+      Number of requests after which the baseline latency is measured again.
+    """
+    if not 1 <= min_limit <= initial_limit <= max_limit:
+      raise ValueError("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit.")
+    self.min_limit = min_limit
+    self.max_limit = max_limit
+    self.backoff_ratio = backoff_ratio
+    self.latency_tolerance = latency_tolerance
+    self.max_wait = max_wait
+    self.baseline_window = baseline_window
+
+    self._lock = threading.Lock()
+    self._limit = float(initial_limit)
+    self._in_flight = 0
+    self._waiters = deque()
+    self._baseline = None
+    self._next_baseline = None
+    self._samples = 0
+
+    self.rejected = 0
+    """Number of callers that gave up waiting for a slot."""
+
+  @property
+  def limit(self):
+    """Current number of requests allowed in flight."""
+    with self._lock:
+      return int(self._limit)
+
+  @property
+  def in_flight(self):
+    """Number of requests in flight."""
+    with self._lock:
+      return self._in_flight
+
+  @property
+  def queued(self):
+    """Number of callers waiting for a slot."""
+    with self._lock:
+      return len(self._waiters)
+
+  def acquire(self):
+    """
+    Takes a slot for one request, waiting for one to free up if needed.
+    Must be followed by :py:meth:`release`.
+
+    :raises LimitExceededError: If no slot was available within ``max_wait``.
+    """
+    with self._lock:
+      if not self._waiters and self._in_flight < int(self._limit):
+        self._in_flight += 1
+        return
+      if self.max_wait == 0:
+        self.rejected += 1
+        raise LimitExceededError("Concurrency limit of %d reached." % int(self._limit))
+      waiter = threading.Event()
+      self._waiters.append(waiter)
+
+    if waiter.wait(self.max_wait):
+      return
+    with self._lock:
+      if waiter.is_set():
+        return
+      self._waiters.remove(waiter)
+      self.rejected += 1
+    raise LimitExceededError("Timed out waiting for a request slot.")
+
+  def release(self, latency, dropped=False, succeeded=None):
+    """
+    Frees the slot of a completed request and adapts the limit.
+
+    :param latency: Seconds the request took.
+    :param dropped: Whether the database failed to handle the request.
+    :param succeeded:
+      Whether the request succeeded. Defaults to ``not dropped``. The latency of other
+      requests, which may fail fast, is not taken as the baseline.
+    """
+    if succeeded is None:
+      succeeded = not dropped
+    with self._lock:
+      in_flight = self._in_flight
+      self._in_flight -= 1
+
+      if succeeded and not dropped:
+        self._samples += 1
+        if self._next_baseline is None or latency < self._next_baseline:
+          self._next_baseline = latency
+        if self._baseline is None or self._next_baseline < self._baseline:
+          self._baseline = self._next_baseline
+        if self._samples >= self.baseline_window:
+          self._baseline, self._next_baseline, self._samples = self._next_baseline, None, 0
+
+      if dropped or (self._baseline is not None and
+                     latency > self._baseline * self.latency_tolerance):
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+      elif succeeded and in_flight * 2 >= self._limit:
+        self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+      while self._waiters and self._in_flight < int(self._limit):
+        self._in_flight += 1
+        self._waiters.popleft().set()
+
+  def _after_fork(self):
+    # Requests in flight and waiting callers belonged to threads of the parent process.
+    self._lock = threading.Lock()
+    self._in_flight = 0
+    self._waiters = deque()
+
+
+class TokenBucket(object):
+  """
+  Token bucket refilled at ``rate`` tokens per second, holding at most ``capacity`` tokens.
+
+  Acquiring reserves tokens straight away, letting the balance go negative, and tells the
+  caller how long to wait until the reservation is paid for. Callers are therefore served
+  in the order they asked, and no lock is held while waiting.
+  """
+
+  def __init__(self, rate, capacity=None):
+    """
+    :param rate: Tokens added per second.
+    :param capacity: Maximum number of tokens, i.e. the allowed burst. Defaults to ``rate``.
+    """
+    if rate <= 0:
+      raise ValueError("rate must be positive.")
+    self.rate = float(rate)
+    self.capacity = float(rate if capacity is None else capacity)
+    self._lock = threading.Lock()
+    self._tokens = self.capacity
+    self._updated = time()
+
+  @property
+  def tokens(self):
+    """Tokens currently available. Negative while reservations are being paid for."""
+    with self._lock:
+      self._refill()
+      return self._tokens
+
+  def try_acquire(self, tokens=1):
+    """Takes ``tokens`` if they are available right now. Returns whether they were taken."""
+    with self._lock:
+      self._refill()
+      if self._tokens < tokens:
+        return False
+      self._tokens -= tokens
+      return True
+
+  def reserve(self, tokens=1, max_wait=None):
+    """
+    Reserves ``tokens`` without waiting.
+
+    :return: Seconds to wait before using the tokens.
+    :raises LimitExceededError: If that would be longer than ``max_wait``.
+    """
+    with self._lock:
+      self._refill()
+      wait = max(0.0, (tokens - self._tokens) / self.rate)
+      if max_wait is not None and wait > max_wait:
+        raise LimitExceededError("Rate limit exceeded; %.3fs wait needed." % wait)
+      self._tokens -= tokens
+      return wait
+
+  def acquire(self, tokens=1, max_wait=None):
+    """
+    Takes ``tokens``, sleeping until they are available.
+
+    :return: Seconds waited.
+    :raises LimitExceededError: If the wait would be longer than ``max_wait``.
+    """
+    wait = self.reserve(tokens, max_wait)
+    if wait > 0:
+      sleep(wait)
+    return wait
+
+  def acquire_async(self, tokens=1, max_wait=None):
+    """
+    Like :py:meth:`acquire`, but returns an awaitable that asyncio callers wait on instead.
+    """
+    import asyncio
+    wait = self.reserve(tokens, max_wait)
+    return asyncio.sleep(wait, result=wait)
+
+  def charge(self, tokens):
+    """Takes ``tokens`` regardless of the balance, for costs only known after the fact."""
+    with self._lock:
+      self._refill()
+      self._tokens -= tokens
+
+  def _refill(self):
+    now = time()
+    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+
+
+DEFAULT_OPS_HEADERS = ("X-Read-Ops", "X-Write-Ops")
+"""Response headers whose values count towards a :py:class:`RateLimiter`'s ops rate."""
+
+
+class RateLimiter(object):
+  """
+  Bounds the rate of requests of a :any:`FaunaClient`, or of one secret when passed to
+  :any:`FaunaClient.new_session_client`.
+
+  Requests are limited by a :py:class:`TokenBucket` of ``requests_per_second``. Optionally,
+  the read and write ops the database reports for each response are drawn from a second
+  bucket of ``ops_per_second``; as they are only known afterwards, they delay later requests.
+
+  The client waits for a token before each request, or fails with a
+  :any:`LimitExceededError` if it would have to wait longer than ``max_wait``.
+  The time waited is reported to the observer as :any:`RequestResult.rate_limit_wait`.
+  """
+
+  # pylint: disable=too-many-arguments
+  def __init__(self, requests_per_second, burst=None, ops_per_second=None, ops_burst=None,
+               max_wait=None, ops_headers=DEFAULT_OPS_HEADERS):
+    """
+    :param requests_per_second: Sustained rate of requests.
+    :param burst: Number of requests that may be sent at once. Defaults to ``requests_per_second``.
+    :param ops_per_second: Sustained rate of reported ops, or None not to limit ops.
+    :param ops_burst: Number of ops that may be used at once. Defaults to ``ops_per_second``.
+    :param max_wait: Seconds a request may wait. None to wait as long as needed, 0 to fail fast.
+    :param ops_headers: Response headers whose values are counted as ops.
+    """
+    self.requests = TokenBucket(requests_per_second, burst)
+    """Bucket of requests."""
+    self.ops = TokenBucket(ops_per_second, ops_burst) if ops_per_second is not None else None
+    """Bucket of ops, or None."""
+    self.max_wait = max_wait
+    self.ops_headers = ops_headers
+
+  def try_acquire(self):
+    """Takes a request token if one is available right now. Returns whether it was taken."""
+    if not self.requests.try_acquire():
+      return False
+    if self.ops is not None and not self.ops.try_acquire(0):
+      self.requests.charge(-1)
+      return False
+    return True
+
+  def acquire(self):
+    """
+    Waits until a request may be sent.
+
+    :return: Seconds waited.
+    :raises LimitExceededError: If that would take longer than ``max_wait``.
+    """
+    wait = self._reserve()
+    if wait > 0:
+      sleep(wait)
+    return wait
+
+  def acquire_async(self):
+    """Like :py:meth:`acquire`, but returns an awaitable that asyncio callers wait on instead."""
+    import asyncio
+    wait = self._reserve()
+    return asyncio.sleep(wait, result=wait)
+
+  def record(self, response_headers):
+    """Charges the ops reported in ``response_headers`` to the ops bucket."""
+    if self.ops is None:
+      return
+    ops = 0
+    for header in self.ops_headers:
+      value = response_headers.get(header)
+      if value is not None:
+        ops += int(value)
+    if ops:
+      self.ops.charge(ops)
+
+  def _reserve(self):
+    wait = self.requests.reserve(1, self.max_wait)
+    if self.ops is not None:
+      try:
+        wait = max(wait, self.ops.reserve(0, self.max_wait))
+      except LimitExceededError:
+        self.requests.charge(-1)
+        raise
+    return wait
+
+  def _after_fork(self):
+    self.requests._after_fork() # pylint: disable=protected-access
+    if self.ops is not None:
+      self.ops._after_fork() # pylint: disable=protected-access
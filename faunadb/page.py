@@ -1,4 +1,5 @@
 from faunadb import query
+from faunadb.deadline import _Within, current_deadline
 
 class Page(object):
   """
@@ -34,7 +35,7 @@ class Page(object):
       self.after == other.after
 
   @staticmethod
-  def set_iterator(client, set_query, map_lambda=None, mapper=None, page_size=None):
+  def set_iterator(client, set_query, map_lambda=None, mapper=None, page_size=None, deadline=None):
     """
     Iterator that keeps getting new pages of a set.
 
@@ -44,15 +45,22 @@ class Page(object):
       Mapping Python function used on each page element.
     :param page_size:
       Number of instances to be fetched at a time.
+    :param deadline:
+      A :any:`Deadline` for getting all pages. Defaults to the one in effect when this is called.
+      Once it has passed, getting the next page raises :any:`DeadlineExceededError`.
     :return:
       Iterator through all elements in the set.
     """
+    run_query = _Within(deadline if deadline is not None else current_deadline(), client.query)
+    return Page._iterate(run_query, set_query, map_lambda, mapper, page_size)
 
+  @staticmethod
+  def _iterate(run_query, set_query, map_lambda, mapper, page_size):
     def get_page(**kwargs):
       queried = query.paginate(set_query, **kwargs)
       if map_lambda is not None:
         queried = query.map_(map_lambda, queried)
-      return Page.from_raw(client.query(queried))
+      return Page.from_raw(run_query(queried))
 
     page = get_page(size=page_size)
     for val in page.data:
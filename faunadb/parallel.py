@@ -0,0 +1,103 @@
+"""Runs many queries concurrently on a worker pool shared by a client and its session clients."""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+import threading
+
+from faunadb.deadline import _Within
+
+
+class QueryOutcome(object):
+  """The outcome of one query run by :any:`FaunaClient.query_many`."""
+
+  def __init__(self, index, expression, result=None, error=None):
+    self.index = index
+    """Position of the expression in the iterable passed to ``query_many``."""
+    self.expression = expression
+    """The query that was run."""
+    self.result = result
+    """Converted JSON response, or None if the query failed."""
+    self.error = error
+    """Exception raised by the query, or None if it succeeded."""
+
+  @property
+  def ok(self):
+    """Whether the query succeeded."""
+    return self.error is None
+
+  def get(self):
+    """Returns the result, or raises the error if the query failed."""
+    if self.error is not None:
+      raise self.error
+    return self.result
+
+  def __repr__(self):
+    return "QueryOutcome(index=%s, result=%r, error=%r)" % (self.index, self.result, self.error)
+
+
+class _WorkerPool(object):
+  """
+  Lazily starts a thread pool sized to the client's connection pool, so that
+  concurrent queries never need more connections than ``pool_maxsize``.
+  """
+
+  def __init__(self, max_workers):
+    self.max_workers = max_workers
+    self._lock = threading.Lock()
+    self._executor = None
+
+  def get(self):
+    with self._lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+      return self._executor
+
+  def shutdown(self):
+    with self._lock:
+      if self._executor is not None:
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+  def _after_fork(self):
+    # The executor's threads did not survive the fork; start a new one when needed.
+    self._lock = threading.Lock()
+    self._executor = None
+
+
+# pylint: disable=too-many-arguments
+def query_many(client, workers, expressions, max_concurrency, ordered, timeout_millis, deadline):
+  """Generator behind :any:`FaunaClient.query_many`. Queries run within ``deadline``, if any."""
+  max_concurrency = max(1, min(max_concurrency or workers.max_workers, workers.max_workers))
+  executor = workers.get()
+  run_query = _Within(deadline, client.query)
+  items = enumerate(expressions)
+  in_flight = OrderedDict()
+
+  def fill():
+    for index, expression in islice(items, max_concurrency - len(in_flight)):
+      in_flight[executor.submit(run_query, expression, timeout_millis)] = (index, expression)
+
+  try:
+    fill()
+    while in_flight:
+      if ordered:
+        done = [next(iter(in_flight))]
+      else:
+        finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        done = [f for f in in_flight if f in finished]
+      for future in done:
+        index, expression = in_flight.pop(future)
+        yield _outcome(index, expression, future)
+      fill()
+  finally:
+    for future in in_flight:
+      future.cancel()
+
+
+def _outcome(index, expression, future):
+  error = future.exception()
+  if error is not None:
+    return QueryOutcome(index, expression, error=error)
+  return QueryOutcome(index, expression, result=future.result())
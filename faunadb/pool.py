@@ -0,0 +1,221 @@
+"""
+Connection pools that keep track of their connections, used by the transports of
+:any:`FaunaClient`.
+
+They close connections that sat idle or stayed open for too long before they are used,
+instead of letting a request fail on a connection a load balancer has silently dropped.
+"""
+# pylint: disable=redefined-builtin
+from builtins import object
+from collections import namedtuple
+import socket
+import threading
+from time import time
+
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, PoolManager
+
+PoolStats = namedtuple("PoolStats", ["open", "idle", "in_use", "wait_time", "reaped"])
+"""
+Statistics of a client's connection pools:
+
+* ``open``: connections open, whether idle or in use.
+* ``idle``: open connections waiting in a pool for a request.
+* ``in_use``: connections taken by requests in flight.
+* ``wait_time``: total seconds requests spent getting a connection from a pool.
+* ``reaped``: connections closed because of ``idle_timeout`` or ``max_connection_age``.
+"""
+
+EMPTY_STATS = PoolStats(0, 0, 0, 0.0, 0)
+
+_local = threading.local()
+
+
+class _CancelScope(object):
+  """
+  Lets another thread abort the request sent by the thread inside this scope, by shutting
+  down the socket of the connection the request took from a managed pool. The request then
+  fails with a connection error. A request still connecting is not aborted.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._conn = None
+    self._outer = None
+    self.cancelled = False
+
+  def cancel(self):
+    with self._lock:
+      self.cancelled = True
+      if self._conn is not None:
+        _shutdown(self._conn)
+
+  def __enter__(self):
+    self._outer = getattr(_local, "scope", None)
+    _local.scope = self
+    return self
+
+  def __exit__(self, *args):
+    _local.scope = self._outer
+    self._detach()
+
+  def _attach(self, conn):
+    with self._lock:
+      self._conn = conn
+      if self.cancelled:
+        _shutdown(conn)
+
+  def _detach(self):
+    # Once back in the pool, the connection may be taken by another request.
+    with self._lock:
+      self._conn = None
+
+
+class _ManagedPool(object):
+  """Mixin for urllib3 connection pools that reaps expired connections and keeps statistics."""
+  # The members used come from the urllib3 pool class this is mixed into.
+  # pylint: disable=no-member
+  idle_timeout = None
+  max_age = None
+
+  def __init__(self, *args, **kwargs):
+    super(_ManagedPool, self).__init__(*args, **kwargs)
+    self._stats_lock = threading.Lock()
+    self._in_use = 0
+    self._wait_time = 0.0
+    self._reaped = 0
+
+  def _get_conn(self, timeout=None):
+    start_time = time()
+    conn = super(_ManagedPool, self)._get_conn(timeout)
+    now = time()
+    reaped = 0
+    if conn.sock is not None and self._expired(conn, now):
+      conn.close()
+      reaped = 1
+    if conn.sock is None:
+      # The connection opens as soon as it is used.
+      conn._pool_opened_at = now
+    with self._stats_lock:
+      self._in_use += 1
+      self._wait_time += now - start_time
+      self._reaped += reaped
+    scope = getattr(_local, "scope", None)
+    if scope is not None:
+      scope._attach(conn)
+    return conn
+
+  def _put_conn(self, conn):
+    scope = getattr(_local, "scope", None)
+    if scope is not None:
+      scope._detach()
+    with self._stats_lock:
+      self._in_use -= 1
+    if conn is not None:
+      conn._pool_used_at = time()
+    super(_ManagedPool, self)._put_conn(conn)
+
+  def _expired(self, conn, now):
+    idle_timeout = self.idle_timeout
+    if idle_timeout is not None and now - getattr(conn, "_pool_used_at", now) > idle_timeout:
+      return True
+    return self.max_age is not None and now - getattr(conn, "_pool_opened_at", now) > self.max_age
+
+  def stats(self):
+    queue = self.pool
+    queued = list(queue.queue) if queue is not None else []
+    idle = sum(1 for conn in queued if conn is not None and conn.sock is not None)
+    with self._stats_lock:
+      return PoolStats(idle + self._in_use, idle, self._in_use, self._wait_time, self._reaped)
+
+  def prewarm(self, connections):
+    """Opens up to ``connections`` connections at once and leaves them idle in the pool."""
+    conns = [self._get_conn() for _ in range(min(connections, self.pool.maxsize))]
+    threads = [threading.Thread(target=_connect, args=(conn,))
+               for conn in conns if conn.sock is None]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    for conn in conns:
+      self._put_conn(conn)
+
+
+class _HTTPPool(_ManagedPool, HTTPConnectionPool):
+  pass
+
+
+class _HTTPSPool(_ManagedPool, HTTPSConnectionPool):
+  pass
+
+
+class ManagedPoolManager(PoolManager):
+  """
+  A urllib3 :class:`PoolManager` whose pools close connections idle for more than
+  ``idle_timeout`` seconds, or open for more than ``max_age`` seconds, before reusing them.
+  """
+
+  def __init__(self, idle_timeout=None, max_age=None, **kwargs):
+    super(ManagedPoolManager, self).__init__(**kwargs)
+    self.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+    self.idle_timeout = idle_timeout
+    self.max_age = max_age
+
+  def _new_pool(self, scheme, host, port, request_context=None):
+    pool = super(ManagedPoolManager, self)._new_pool(scheme, host, port, request_context)
+    pool.idle_timeout = self.idle_timeout
+    pool.max_age = self.max_age
+    return pool
+
+  def prewarm(self, url, connections):
+    """Opens up to ``connections`` connections to ``url`` at once."""
+    self.connection_from_url(url).prewarm(connections)
+
+  def stats(self):
+    """:py:class:`PoolStats` summed over all pools."""
+    totals = EMPTY_STATS
+    for key in self.pools.keys():
+      pool = self.pools.get(key)
+      if pool is not None:
+        totals = _add(totals, pool.stats())
+    return totals
+
+
+class ManagedHTTPAdapter(HTTPAdapter):
+  """An :class:`HTTPAdapter` using a :py:class:`ManagedPoolManager`."""
+  __attrs__ = HTTPAdapter.__attrs__ + ["idle_timeout", "max_age"]
+
+  def __init__(self, idle_timeout=None, max_age=None, **kwargs):
+    self.idle_timeout = idle_timeout
+    self.max_age = max_age
+    super(ManagedHTTPAdapter, self).__init__(**kwargs)
+
+  def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+    # pylint: disable=attribute-defined-outside-init
+    self._pool_connections = connections
+    self._pool_maxsize = maxsize
+    self._pool_block = block
+    self.poolmanager = ManagedPoolManager(
+      idle_timeout=self.idle_timeout, max_age=self.max_age,
+      num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs)
+
+
+def _add(a, b):
+  return PoolStats(*[x + y for x, y in zip(a, b)])
+
+
+def _connect(conn):
+  try:
+    conn.connect()
+  except Exception: # pylint: disable=broad-except
+    # Pre-warming is best effort: the connection opens when it is first used instead.
+    conn.close()
+
+
+def _shutdown(conn):
+  sock = conn.sock
+  if sock is not None:
+    try:
+      sock.shutdown(socket.SHUT_RDWR)
+    except (IOError, OSError):
+      pass
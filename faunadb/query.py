@@ -1050,6 +1050,59 @@ def _params(main_params, optional_params):
   return _fn(main_params)
 
 
+_WRITE_FUNCTIONS = frozenset([
+  "create", "update", "replace", "delete", "insert", "remove",
+  "create_class", "create_collection", "create_database", "create_index",
+  "create_function", "create_role", "create_key", "move_database",
+  "login", "logout", "call",
+])
+
+
+def _is_read_only(expression):
+  """
+  Whether a wrapped expression contains no function that can write.
+  Calls to user-defined functions count as writes, since their bodies are not known.
+  This errs on the side of caution: an object key named like a write function also counts.
+  """
+  pending = [expression]
+  while pending:
+    value = pending.pop()
+    if isinstance(value, _Expr):
+      pending.append(value.value)
+    elif isinstance(value, dict):
+      for key, sub_value in value.items():
+        if key in _WRITE_FUNCTIONS:
+          return False
+        pending.append(sub_value)
+    elif isinstance(value, (list, tuple)):
+      pending.extend(value)
+  return True
+
+
+_NON_DETERMINISTIC_FUNCTIONS = frozenset(["now", "new_id", "next_id"])
+
+
+def _is_deterministic(expression):
+  """
+  Whether a wrapped expression returns the same result each time it runs against the same
+  data: it must not read the clock, as ``now()`` and ``time("now")`` do, nor generate ids.
+  Like :py:func:`_is_read_only`, this errs on the side of caution.
+  """
+  pending = [expression]
+  while pending:
+    value = pending.pop()
+    if isinstance(value, _Expr):
+      pending.append(value.value)
+    elif isinstance(value, dict):
+      for key, sub_value in value.items():
+        if key in _NON_DETERMINISTIC_FUNCTIONS or (key == "time" and sub_value == "now"):
+          return False
+        pending.append(sub_value)
+    elif isinstance(value, (list, tuple)):
+      pending.extend(value)
+  return True
+
+
 def _varargs(values):
   """
   Called on ``*args`` arguments.
@@ -3,13 +3,22 @@ from builtins import object
 
 
 class RequestResult(object):
-  """Stores information about a single request and response."""
+  """
+  Stores information about a single request and response.
+
+  Clients only build one when an observer or an error needs it.
+  """
   # pylint: disable=too-many-instance-attributes
+  __slots__ = (
+    "method", "path", "query", "request_content", "_response_raw", "response_content",
+    "status_code", "response_headers", "start_time", "end_time", "attempt", "hedged",
+    "hedge_won", "rate_limit_wait", "request_bytes", "request_compressed_bytes", "coalesced")
 
   def __init__(
       self, method, path, query, request_content,
       response_raw, response_content, status_code, response_headers,
-      start_time, end_time):
+      start_time, end_time, attempt=1, hedged=False, hedge_won=False, rate_limit_wait=0,
+      request_bytes=None, request_compressed_bytes=None, coalesced=False):
     self.method = method
     """"GET" or "POST"."""
     self.path = path
@@ -18,8 +27,7 @@ class RequestResult(object):
     """URL query. ``None`` unless ``method == GET``. *Not* related to :any:`FaunaClient.query`."""
     self.request_content = request_content
     """Request data."""
-    self.response_raw = response_raw
-    """String value returned by the server."""
+    self._response_raw = response_raw
     self.response_content = response_content
     """
     Parsed value returned by the server.
@@ -34,6 +42,33 @@ class RequestResult(object):
     """Time the request started."""
     self.end_time = end_time
     """Time the response was received."""
+    self.attempt = attempt
+    """1 for the first attempt of a request, incremented for each retry."""
+    self.hedged = hedged
+    """
+    Whether a duplicate request was sent because the response was slow.
+    See :any:`HedgingPolicy`.
+    """
+    self.hedge_won = hedge_won
+    """Whether the response came from the duplicate request."""
+    self.rate_limit_wait = rate_limit_wait
+    """Seconds the request waited for the client's :any:`RateLimiter`."""
+    self.request_bytes = request_bytes
+    """Size in bytes of the serialized request body."""
+    self.request_compressed_bytes = request_compressed_bytes
+    """Size in bytes of the request body as sent, if it was compressed; otherwise None."""
+    self.coalesced = coalesced
+    """
+    Whether the query was answered by an identical request another caller had in flight.
+    See :any:`SingleFlight`.
+    """
+
+  @property
+  def response_raw(self):
+    """String value returned by the server. Decoded from the response bytes on first access."""
+    if isinstance(self._response_raw, bytes):
+      self._response_raw = self._response_raw.decode("utf-8", "replace")
+    return self._response_raw
 
   @property
   def time_taken(self):
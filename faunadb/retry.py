@@ -0,0 +1,109 @@
+"""Retrying of requests that failed for transient reasons."""
+# pylint: disable=redefined-builtin
+from builtins import object
+import random
+from time import sleep, time
+
+from requests import codes
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+TRANSIENT_STATUS_CODES = frozenset([
+  codes.internal_server_error,
+  codes.bad_gateway,
+  codes.unavailable,
+  codes.gateway_timeout,
+])
+"""Status codes retried by default: 500, 502, 503 and 504."""
+
+
+class RetryPolicy(object):
+  """
+  Configures how :any:`FaunaClient` retries requests that failed for transient reasons:
+  a status code in ``retry_on_status``, or a connection error. Read timeouts are never
+  retried, since the query may have run.
+
+  A connection can drop after the server received a request, and a 5xx status does not
+  prove a write was not committed. So read-only queries and pings are retried after any of
+  these failures, but other queries only when no connection to the server could be opened,
+  unless ``retry_writes`` is set. See the ``read_only`` parameter of :any:`FaunaClient.query`.
+
+  Delays between attempts use "decorrelated jitter": each delay is drawn uniformly
+  from ``[base_delay, 3 * previous_delay]`` and capped at ``max_delay``.
+  """
+
+  # pylint: disable=too-many-arguments
+  def __init__(self, max_attempts=3, base_delay=0.1, max_delay=2.0, deadline=None,
+               retry_on_status=TRANSIENT_STATUS_CODES, retry_writes=False):
+    """
+    :param max_attempts:
+      Maximum number of attempts, including the first one.
+    :param base_delay:
+      Minimum delay in seconds before a retry.
+    :param max_delay:
+      Maximum delay in seconds before a retry.
+    :param deadline:
+      Seconds after the first attempt started past which no retry is started. None for no limit.
+    :param retry_on_status:
+      HTTP status codes that are retried.
+    :param retry_writes:
+      Whether queries that may write are retried like read-only ones. Only set it when
+      running them twice is harmless.
+    """
+    if max_attempts < 1:
+      raise ValueError("max_attempts must be at least 1.")
+    self.max_attempts = max_attempts
+    self.base_delay = base_delay
+    self.max_delay = max_delay
+    self.deadline = deadline
+    self.retry_on_status = frozenset(retry_on_status)
+    self.retry_writes = retry_writes
+
+  def backoff(self):
+    """Starts tracking the attempts of one request."""
+    return _Backoff(self)
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+"""Policy that never retries. Used when a client has no ``retry_policy``."""
+
+
+class _Backoff(object):
+  """Attempts made so far for one request under a :py:class:`RetryPolicy`."""
+
+  def __init__(self, policy):
+    self.policy = policy
+    self.attempt = 1
+    self._start = time()
+    self._delay = policy.base_delay
+
+  def retry(self, deadline=None):
+    """
+    If another attempt is allowed, sleeps until it should start and returns True.
+    Returns False once attempts, the policy's deadline or the :any:`Deadline` given are exhausted.
+    """
+    policy = self.policy
+    if self.attempt >= policy.max_attempts:
+      return False
+
+    self._delay = min(policy.max_delay, random.uniform(policy.base_delay, self._delay * 3))
+    if policy.deadline is not None and time() + self._delay - self._start > policy.deadline:
+      return False
+    if deadline is not None and self._delay >= deadline.remaining():
+      return False
+
+    sleep(self._delay)
+    self.attempt += 1
+    return True
+
+
+def _is_connect_error(error):
+  """Whether ``error``, raised by a transport, means the request could not reach the server."""
+  if isinstance(error, ConnectTimeout):
+    return True
+  if not isinstance(error, RequestsConnectionError) or not error.args:
+    return False
+  reason = error.args[0]
+  if isinstance(reason, MaxRetryError):
+    reason = reason.reason
+  return isinstance(reason, NewConnectionError)
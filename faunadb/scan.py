@@ -0,0 +1,164 @@
+"""Scanning index sets in parallel, split into disjoint ranges."""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+try:
+  from queue import Full, Queue
+except ImportError:
+  from Queue import Full, Queue
+
+from faunadb.deadline import _Within, current_deadline
+from faunadb.page import Page
+from faunadb.query import difference, let, map_, paginate, range as range_, select_with_default, var
+
+
+def sample_split_points(client, set_query, partitions, page_size=100000, samples_per_page=100):
+  """
+  Chooses ``partitions - 1`` entries of an index set that split it into ranges of roughly
+  equal size, for :py:func:`partitioned_scan`.
+
+  The set is paginated in pages of ``page_size`` entries, but only ``samples_per_page``
+  evenly spaced entries of each page are returned, so this reads every entry of the index
+  on the server while sending few of them over the network.
+
+  :param client: The :any:`FaunaClient` to query with.
+  :param set_query: An index set, e.g. ``match(index("things_by_name"))``.
+  :param partitions: Number of ranges wanted.
+  :param page_size: Number of entries read by each query.
+  :param samples_per_page: Number of entries returned by each query.
+  :return: Sorted list of distinct split points; shorter if the set has few distinct entries.
+  """
+  stride = max(1, page_size // samples_per_page)
+  samples = []
+  cursor = None
+  while True:
+    result = client.query(let({"page": paginate(set_query, size=page_size, after=cursor)}, {
+      "samples": [select_with_default(["data", i], var("page"), None)
+                  for i in range(0, page_size, stride)],
+      "after": select_with_default(["after"], var("page"), None)}))
+    samples.extend(sample for sample in result["samples"] if sample is not None)
+    cursor = result["after"]
+    if cursor is None:
+      break
+
+  split_points = []
+  for i in range(1, partitions):
+    if not samples:
+      break
+    point = samples[len(samples) * i // partitions]
+    if not split_points or split_points[-1] != point:
+      split_points.append(point)
+  return split_points
+
+
+def partition_sets(set_query, split_points):
+  """
+  Splits an index set into disjoint ranges at ``split_points``, which must be sorted.
+  Entries equal to a split point belong to the range that starts with it.
+  """
+  bounds = [[]] + list(split_points) + [[]]
+  sets = []
+  for i in range(len(bounds) - 1):
+    low, high = bounds[i], bounds[i + 1]
+    partition = range_(set_query, low, high)
+    if i < len(bounds) - 2:
+      # Range includes its upper bound; leave entries equal to it to the next range.
+      partition = difference(partition, range_(set_query, high, high))
+    sets.append(partition)
+  return sets
+
+
+# pylint: disable=too-many-arguments
+def partitioned_scan(client, set_query, split_points=None, partitions=None, map_lambda=None,
+                     page_size=None, workers=None, ordered=False, max_buffered_pages=2,
+                     deadline=None):
+  """
+  Iterates over an index set by paginating disjoint ranges of it concurrently, see
+  :py:func:`partition_sets`, instead of following a single chain of ``after`` cursors.
+
+  Elements come in no particular order unless ``ordered``, in which case they come in the
+  set's order, at the cost of buffering ranges that finish ahead of it. Each range buffers
+  at most ``max_buffered_pages`` pages that have not been iterated over yet.
+
+  :param client: The :any:`FaunaClient` to query with.
+  :param set_query: An index set, e.g. ``match(index("things_by_name"))``.
+  :param split_points:
+    Sorted index entries to split the set at. Defaults to ones chosen by
+    :py:func:`sample_split_points`.
+  :param partitions: Number of ranges to sample split points for. Defaults to ``workers``.
+  :param map_lambda: If present, a :any:`lambda_` for mapping set elements.
+  :param page_size: Number of elements fetched at a time.
+  :param workers:
+    Maximum number of ranges paginated at once. Defaults to the client's ``pool_maxsize``.
+  :param ordered: Whether to keep the set's order.
+  :param max_buffered_pages: Pages each range fetches ahead of iteration.
+  :param deadline:
+    A :any:`Deadline` for the whole scan. Defaults to the one in effect when this is called.
+  :return: Iterator through all elements in the set.
+  """
+  workers = workers or client.pool_maxsize
+  deadline = deadline if deadline is not None else current_deadline()
+  if split_points is None:
+    split_points = _Within(deadline, sample_split_points)(client, set_query, partitions or workers)
+  sets = partition_sets(set_query, split_points)
+  run_query = _Within(deadline, client.query)
+  return _scan(run_query, sets, map_lambda, page_size, workers, ordered, max_buffered_pages)
+
+
+def _scan(run_query, sets, map_lambda, page_size, workers, ordered, max_buffered_pages):
+  stop = threading.Event()
+  if ordered:
+    queues = [Queue(max_buffered_pages) for _ in sets]
+  else:
+    queues = [Queue(max_buffered_pages * min(workers, len(sets)))] * len(sets)
+
+  def paginate_range(index):
+    out = queues[index]
+    try:
+      cursor = None
+      while True:
+        queried = paginate(sets[index], size=page_size, after=cursor)
+        if map_lambda is not None:
+          queried = map_(map_lambda, queried)
+        page = Page.from_raw(run_query(queried))
+        if not _put(out, (page.data, None), stop):
+          return
+        cursor = page.after
+        if cursor is None:
+          break
+      _put(out, (None, None), stop)
+    except Exception as error: # pylint: disable=broad-except
+      _put(out, (None, error), stop)
+
+  # Ranges start in order, so in ordered mode the one being iterated over has always started.
+  executor = ThreadPoolExecutor(max_workers=workers)
+  try:
+    for index in range(len(sets)):
+      executor.submit(paginate_range, index)
+    remaining = len(sets)
+    current = 0
+    while remaining:
+      data, error = queues[current].get()
+      if error is not None:
+        raise error
+      if data is None:
+        remaining -= 1
+        if ordered:
+          current += 1
+        continue
+      for element in data:
+        yield element
+  finally:
+    stop.set()
+    executor.shutdown(wait=False)
+
+
+def _put(out, item, stop):
+  """Puts ``item`` in ``out`` once there is room, unless the scan stopped first."""
+  while not stop.is_set():
+    try:
+      out.put(item, timeout=0.1)
+      return True
+    except Full:
+      pass
+  return False
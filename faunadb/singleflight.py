@@ -0,0 +1,99 @@
+"""Coalescing identical read-only queries that are in flight at the same time."""
+# pylint: disable=redefined-builtin
+from builtins import object
+import threading
+
+from faunadb.deadline import current_deadline
+from faunadb.errors import DeadlineExceededError
+
+
+class SingleFlight(object):
+  """
+  Sends only one of several identical read-only queries that are in flight at once.
+
+  While a query is waiting for its response, callers running the same query with the
+  same secret wait for that response instead of sending their own. Queries are identical
+  when they serialize to the same JSON once object keys are sorted. Writes and function
+  calls are never coalesced.
+
+  Every caller parses the shared response itself, so each gets its own copy of the result.
+  If the request fails, every waiting caller gets its error. Callers that were coalesced
+  get a :any:`RequestResult` with ``coalesced`` set to True for the observer, and
+  :py:attr:`coalesced` counts them. A caller within a :any:`Deadline` waits no longer than
+  the time it has left, and then raises a :any:`DeadlineExceededError`.
+
+  One instance may be shared by several clients, e.g. by all session clients of a parent.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._flights = {}
+    self.coalesced = 0
+    """Number of queries answered by a request another caller sent."""
+
+  @property
+  def in_flight(self):
+    """Number of distinct queries waiting for their response."""
+    with self._lock:
+      return len(self._flights)
+
+  def run(self, key, send):
+    """
+    Calls ``send(land)`` unless a query with ``key`` is already in flight. ``send`` must
+    call ``land(response)`` with the successful HTTP response before returning.
+
+    :return:
+      ``(True, value)`` with ``send``'s return value, or ``(False, response)`` with
+      the response of the query that was already in flight.
+    :raises DeadlineExceededError:
+      If the current deadline passes while waiting for a query already in flight.
+    """
+    with self._lock:
+      flight = self._flights.get(key)
+      leader = flight is None
+      if leader:
+        flight = self._flights[key] = _Flight()
+      else:
+        self.coalesced += 1
+    if not leader:
+      deadline = current_deadline()
+      if deadline is None:
+        flight.done.wait()
+      elif not flight.done.wait(max(deadline.remaining(), 0)):
+        raise DeadlineExceededError(
+          "Deadline of %ss exceeded waiting for an identical query." % deadline.timeout)
+      if flight.error is not None:
+        raise flight.error
+      return False, flight.response
+
+    try:
+      return True, send(lambda response: self._land(key, flight, response, None))
+    except BaseException as error:
+      self._land(key, flight, None, error)
+      raise
+    finally:
+      self._land(key, flight, None, None)
+
+  def _land(self, key, flight, response, error):
+    with self._lock:
+      if self._flights.get(key) is flight:
+        del self._flights[key]
+      if flight.done.is_set():
+        return
+      flight.response = response
+      flight.error = error
+      flight.done.set()
+
+  def _after_fork(self):
+    self._lock = threading.Lock()
+    self._flights = {}
+
+
+class _Flight(object):
+  """A request in flight, and the callers waiting for it."""
+  __slots__ = ("done", "response", "error")
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.response = None
+    self.error = None
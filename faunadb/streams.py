@@ -0,0 +1,378 @@
+"""Consuming the change events of documents and sets."""
+# pylint: disable=redefined-builtin
+from builtins import object
+import socket
+import threading
+from time import time
+
+try:
+  from queue import Empty, Full, Queue
+except ImportError:
+  from Queue import Empty, Full, Queue
+
+from requests import codes
+from requests.exceptions import RequestException
+
+from faunadb.errors import CircuitOpenError, FaunaError, StreamError
+from faunadb.query import _wrap, events, now, paginate, to_micros
+from faunadb.request_result import RequestResult
+from faunadb.retry import _is_connect_error
+from faunadb.transport import RequestsTransport
+from faunadb._json import parse_json, parse_json_or_none, to_json
+
+START = "start"
+"""Type of the first event of each connection. Its ``txn`` is when the stream started."""
+VERSION = "version"
+"""Type of events for a new version of a document."""
+SET = "set"
+"""Type of events for a document added to or removed from a set."""
+HISTORY_REWRITE = "history_rewrite"
+"""Type of events for a change to the past history of a document."""
+ERROR = "error"
+"""Type of the event the server ends a stream with when it fails."""
+
+STREAM = "stream"
+"""Mode receiving events from the server's stream endpoint as they happen."""
+POLL = "poll"
+"""Mode paginating ``events()`` every ``poll_interval``, for servers without streaming."""
+
+
+class StreamEvent(object):
+  """An event of an :py:class:`EventStream`."""
+  __slots__ = ("type", "txn", "event")
+
+  def __init__(self, type, txn, event):
+    self.type = type
+    """
+    :py:data:`START`, :py:data:`VERSION`, :py:data:`SET`, :py:data:`HISTORY_REWRITE`
+    or :py:data:`ERROR`.
+    """
+    self.txn = txn
+    """Transaction time of the event, in microseconds."""
+    self.event = event
+    """
+    The event: for :py:data:`START`, the transaction time again; for changes, a dict with the
+    ``action`` and the ``document``, itself with its ``ref``, ``ts`` and ``data``; for
+    :py:data:`ERROR`, a dict with the error ``code`` and ``description``.
+    """
+
+  def __repr__(self):
+    return "StreamEvent(type=%r, txn=%r, event=%r)" % (self.type, self.txn, self.event)
+
+  def __eq__(self, other):
+    return isinstance(other, StreamEvent) and \
+      (self.type, self.txn, self.event) == (other.type, other.txn, other.event)
+
+  def __ne__(self, other):
+    # pylint: disable=unneeded-not
+    return not self == other
+
+
+class EventStream(object):
+  """
+  Receives the change events of a document, or of a set, on a background thread::
+
+    with client.stream(q.ref(q.collection("things"), "1")) as stream:
+      for event in stream:
+        ...
+
+  Events are passed to ``on_event`` if given; otherwise they are buffered for iteration.
+  Once ``max_buffered`` events are waiting, the stream stops reading until there is room.
+  Breaking out of iteration closes the stream.
+
+  When the connection drops, or the server fails with a 5xx status, the stream reconnects
+  after a delay that doubles from ``reconnect_delay`` up to ``max_reconnect_delay``. It then
+  catches up on the events between the last one it received and the new :py:data:`START`,
+  by paginating ``events()``, so none are missed. Other errors, and :py:data:`ERROR` events,
+  end the stream: they are raised by iteration, or passed to ``on_error``.
+
+  In :py:data:`POLL` mode, ``events()`` is paginated from the last transaction time seen
+  instead, immediately while there are more pages and every ``poll_interval`` seconds
+  otherwise. Events then have the same shape as in :py:data:`STREAM` mode.
+
+  The stream endpoint is requested at the client's ``base_url``, through the session of its
+  :any:`RequestsTransport`, and subject to its ``circuit_breaker``: while the breaker is open,
+  the stream waits to reconnect. :py:data:`STREAM` mode does not support clients with
+  ``endpoints`` or another transport; :py:data:`POLL` mode, which only runs queries, does.
+  """
+
+  # pylint: disable=too-many-arguments, too-many-instance-attributes
+  def __init__(self, client, expression, on_event=None, on_error=None, fields=None, mode=STREAM,
+               start_ts=None, max_buffered=1000, poll_interval=1.0, page_size=100,
+               reconnect_delay=0.1, max_reconnect_delay=10.0):
+    """
+    :param client: The :any:`FaunaClient` to stream with.
+    :param expression: A document ref, or a set.
+    :param on_event: Callback passed each :py:class:`StreamEvent`, on the stream's thread.
+    :param on_error: Callback passed the error that ended the stream, if any.
+    :param fields:
+      Fields of change events to request from the stream endpoint, e.g.
+      ``["action", "document", "diff"]``. Defaults to the server's.
+    :param mode: :py:data:`STREAM` or :py:data:`POLL`.
+    :param start_ts: Transaction time to receive events after. Defaults to when the stream starts.
+    :param max_buffered: Maximum number of events waiting to be iterated over.
+    :param poll_interval: Seconds between polls once caught up, in :py:data:`POLL` mode.
+    :param page_size: Number of events per page when paginating ``events()``.
+    :param reconnect_delay: Seconds before the first reconnection attempt.
+    :param max_reconnect_delay: Maximum seconds between reconnection attempts.
+    """
+    if mode not in (STREAM, POLL):
+      raise ValueError("mode must be STREAM or POLL.")
+    if mode == STREAM and client.endpoints is not None:
+      raise ValueError("STREAM mode does not support a client with endpoints; use POLL.")
+    if mode == STREAM and not isinstance(client.transport, RequestsTransport):
+      raise ValueError("STREAM mode requires a client with a RequestsTransport; use POLL.")
+    self.client = client
+    self.expression = _wrap(expression)
+    self.on_event = on_event
+    self.on_error = on_error
+    self.fields = fields
+    self.mode = mode
+    self.poll_interval = poll_interval
+    self.page_size = page_size
+    self.reconnect_delay = reconnect_delay
+    self.max_reconnect_delay = max_reconnect_delay
+    self.last_txn = start_ts
+    """Transaction time of the last event received, or of the last :py:data:`START`."""
+    self.reconnects = 0
+    """Number of times the stream reconnected."""
+    self.error = None
+    """The error that ended the stream, if any."""
+
+    self._queue = Queue(max_buffered) if on_event is None else None
+    self._closed = threading.Event()
+    self._lock = threading.Lock()
+    self._response = None
+    self._thread = None
+    self._delay = reconnect_delay
+
+  def start(self):
+    """Starts receiving events, if not already started. Iteration starts the stream too."""
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="EventStream")
+        self._thread.daemon = True
+        self._thread.start()
+    return self
+
+  def close(self):
+    """Stops receiving events and closes the connection."""
+    self._closed.set()
+    with self._lock:
+      response, thread = self._response, self._thread
+    if response is not None:
+      _shutdown(response)
+    if thread is not None and thread is not threading.current_thread():
+      thread.join()
+
+  @property
+  def closed(self):
+    return self._closed.is_set()
+
+  def __iter__(self):
+    if self._queue is None:
+      raise TypeError("Events are passed to on_event; the stream cannot be iterated over.")
+    self.start()
+    try:
+      while True:
+        try:
+          event = self._queue.get(timeout=0.1)
+        except Empty:
+          # Once closed, the end of the stream may not have found room in the buffer.
+          if not self._closed.is_set():
+            continue
+          event = None
+        if event is None:
+          if self.error is not None:
+            raise self.error
+          return
+        yield event
+    finally:
+      self.close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _run(self):
+    try:
+      while not self._closed.is_set():
+        try:
+          if self.mode == STREAM:
+            self._stream()
+          else:
+            self._poll()
+        except Exception as error: # pylint: disable=broad-except
+          if self._closed.is_set():
+            break
+          if not _is_transient(error):
+            raise
+        if self._closed.wait(self._delay):
+          break
+        self._delay = min(self._delay * 2, self.max_reconnect_delay)
+        self.reconnects += 1
+    except Exception as error: # pylint: disable=broad-except
+      self.error = error
+      if self.on_error is not None:
+        self.on_error(error)
+    finally:
+      if self._queue is not None:
+        self._put(None)
+
+  def _stream(self):
+    # pylint: disable=protected-access
+    client = self.client
+    breaker = client.circuit_breaker
+    if breaker is not None:
+      breaker.before_request(client._probe)
+    start_time = time()
+    try:
+      response = client.transport.session.post(
+        client.base_url + "/stream", data=to_json(self.expression),
+        params={"fields": ",".join(self.fields)} if self.fields else None,
+        headers=client._headers, stream=True, timeout=(client.timeout, None))
+    except RequestException as error:
+      if breaker is not None and _is_connect_error(error):
+        breaker.record_failure()
+      raise
+    if breaker is not None:
+      if response.status_code == codes.unavailable:
+        breaker.record_failure()
+      else:
+        breaker.record_success()
+    with self._lock:
+      self._response = response
+    try:
+      if response.status_code != codes.ok:
+        _raise_for_response(self.expression, response.status_code, response.headers,
+                            response.content, start_time)
+      for line in response.iter_lines():
+        if self._closed.is_set():
+          return
+        if line:
+          self._receive(_stream_event(parse_json(line.decode("utf-8"))))
+    finally:
+      with self._lock:
+        self._response = None
+      response.close()
+
+  def _receive(self, event):
+    if event.type == ERROR:
+      raise StreamError(event)
+    if event.type != START:
+      self._emit(event)
+      return
+    self._delay = self.reconnect_delay
+    self._emit(event)
+    if self.last_txn is not None:
+      for missed in _history(self.client.query, self.expression, self.last_txn, event.txn,
+                             self.page_size):
+        self._emit(missed)
+    self.last_txn = max(self.last_txn or 0, event.txn)
+
+  def _poll(self):
+    if self.last_txn is None:
+      self.last_txn = self.client.query(to_micros(now()), cache=False, read_only=False)
+    self._emit(StreamEvent(START, self.last_txn, self.last_txn))
+    self._delay = self.reconnect_delay
+    while not self._closed.is_set():
+      caught_up = True
+      for event in _history(self.client.query, self.expression, self.last_txn, None,
+                            self.page_size):
+        self._emit(event)
+        caught_up = False
+      if caught_up and self._closed.wait(self.poll_interval):
+        return
+
+  def _emit(self, event):
+    if event.type != START:
+      self.last_txn = event.txn
+    if self.on_event is not None:
+      self.on_event(event)
+    else:
+      self._put(event)
+
+  def _put(self, item):
+    """Buffers ``item`` once there is room, unless the stream is closed first."""
+    while True:
+      try:
+        self._queue.put(item, timeout=0.1)
+        return
+      except Full:
+        if self._closed.is_set():
+          return
+
+
+def _shutdown(response):
+  """Closes a streamed response, interrupting a read blocked on it in another thread."""
+  sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+  if sock is not None:
+    try:
+      sock.shutdown(socket.SHUT_RDWR)
+    except (IOError, OSError):
+      pass
+  response.close()
+
+
+def _stream_event(content):
+  """A :py:class:`StreamEvent` from an event sent by the stream endpoint."""
+  return StreamEvent(content["type"], content.get("txn"), content.get("event"))
+
+
+def _history_event(element):
+  """A :py:class:`StreamEvent` from an element of ``events()``."""
+  action = element["action"]
+  document = {"ref": element["document"], "ts": element["ts"], "data": element.get("data")}
+  return StreamEvent(SET if action in ("add", "remove") else VERSION, element["ts"],
+                     {"action": action, "document": document})
+
+
+def _history(run_query, expression, after_txn, until_txn, page_size):
+  """
+  Yields the events of ``expression`` after ``after_txn``, up to ``until_txn`` if given,
+  as :py:class:`StreamEvent`. ``run_query`` is the client's ``query``.
+  """
+  cursor = after_txn + 1
+  while cursor is not None:
+    page = run_query(_history_query(expression, cursor, page_size))
+    missed, cursor = _history_page(page, until_txn)
+    for event in missed:
+      yield event
+
+
+def _history_query(expression, cursor, page_size):
+  """The query for the page of ``events()`` of ``expression`` starting at ``cursor``."""
+  return paginate(events(expression), after=cursor, size=page_size)
+
+
+def _history_page(page, until_txn):
+  """
+  The :py:class:`StreamEvent` of a page of ``events()``, up to ``until_txn`` if given,
+  and the cursor of the next page, or None once there are no more.
+  """
+  history = []
+  for element in page["data"]:
+    if until_txn is not None and element["ts"] > until_txn:
+      return history, None
+    history.append(_history_event(element))
+  return history, page.get("after")
+
+
+def _raise_for_response(expression, status_code, headers, raw, start_time):
+  """Raises the error for a failed request to the stream endpoint."""
+  request_result = RequestResult("POST", "stream", None, expression, raw, parse_json_or_none(raw),
+                                 status_code, headers, start_time, time())
+  FaunaError.raise_for_status_code(request_result)
+  raise FaunaError("Unexpected status code.", request_result)
+
+
+def _is_transient(error):
+  """Whether the stream should reconnect after ``error``."""
+  if isinstance(error, CircuitOpenError):
+    return True
+  if isinstance(error, FaunaError):
+    request_result = error.request_result
+    return request_result is not None and request_result.status_code >= 500
+  return isinstance(error, (RequestException, IOError, ValueError))
@@ -12,17 +12,21 @@ requires = [
   "iso8601",
   "requests",
   "future",
+  "futures; python_version < '3.2'",
 ]
 
 tests_requires = [
   "nose2",
   "nose2[coverage_plugin]",
+  "aiohttp; python_version >= '3.6'",
 ]
 
 extras_require = {
   "doc": ["sphinx", "sphinx_rtd_theme"],
   "test": tests_requires,
   "lint": ["pylint"],
+  "async": ["aiohttp; python_version >= '3.6'"],
+  "zstd": ["zstandard"],
 }
 
 setup(
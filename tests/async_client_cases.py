@@ -0,0 +1,142 @@
+"""
+Tests of :any:`AsyncFaunaClient`. They use syntax older Pythons cannot parse, so they are
+only imported by ``test_async_client`` where they can run.
+"""
+import asyncio
+import json
+from unittest import TestCase
+
+from faunadb.async_client import AsyncFaunaClient
+from faunadb.errors import UnavailableError, UnexpectedError
+from faunadb.query import add
+from tests.stub_server import StubResponse, StubServer
+
+
+def _run(coro):
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coro)
+  finally:
+    loop.close()
+
+
+class AsyncClientTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def _client(self, **kwargs):
+    return AsyncFaunaClient(secret="secret", domain="127.0.0.1", scheme="http",
+                            port=self.server.port, **kwargs)
+
+  def test_query(self):
+    async def run():
+      async with self._client() as client:
+        return await client.query(add(1, 2))
+
+    self.assertEqual(_run(run()), {"add": [1, 2]})
+    request = self.server.requests[0]
+    self.assertEqual(request.method, "POST")
+    self.assertEqual(request.headers["Authorization"], "Basic c2VjcmV0Og==")
+    self.assertEqual(request.headers["X-FaunaDB-API-Version"], "3")
+
+  def test_ping(self):
+    async def run():
+      async with self._client() as client:
+        result = await client.ping("node")
+        return result, client.get_last_txn_time()
+
+    self.assertEqual(_run(run()), ("Scope write is OK", None))
+    self.assertEqual(self.server.requests[0].path, "/ping?scope=node")
+
+  def test_last_txn_time(self):
+    async def run():
+      async with self._client() as client:
+        await client.query(1)
+        await client.query(2)
+        return client.get_last_txn_time()
+
+    self.assertEqual(_run(run()), 2)
+    self.assertNotIn("X-Last-Txn-Time", self.server.requests[0].headers)
+    self.assertEqual(self.server.requests[1].headers["X-Last-Txn-Time"], "1")
+
+  def test_query_timeout(self):
+    async def run():
+      async with self._client(query_timeout_ms=5000) as client:
+        await client.query(1)
+        await client.query(1, timeout_millis=10)
+        return client.get_query_timeout()
+
+    self.assertEqual(_run(run()), 5000)
+    self.assertEqual(self.server.requests[0].headers["X-Query-Timeout"], "5000")
+    self.assertEqual(self.server.requests[1].headers["X-Query-Timeout"], "10")
+
+  def test_closed(self):
+    async def run():
+      client = self._client()
+      await client.query(1)
+      await client.close()
+      await client.query(2)
+
+    self.assertRaises(UnexpectedError, lambda: _run(run()))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_concurrent_queries(self):
+    async def run():
+      async with self._client() as client:
+        return await asyncio.gather(*[client.query(i) for i in range(50)])
+
+    self.assertEqual(_run(run()), list(range(50)))
+
+  def test_session_client(self):
+    observed = []
+
+    async def run():
+      client = self._client()
+      session_client = client.new_session_client(secret="other", observer=observed.append)
+      await session_client.query(1)
+      await session_client.close()
+      await client.query(1)
+      await client.close()
+      self.assertIs(session_client.session, client.session)
+      self.assertEqual(session_client.get_last_txn_time(), 2)
+
+    _run(run())
+    self.assertEqual(self.server.requests[0].headers["Authorization"], "Basic b3RoZXI6")
+    self.assertEqual(len(observed), 1)
+    self.assertEqual(observed[0].status_code, 200)
+
+  def test_error_on_closed_client(self):
+    client = self._client()
+    _run(client.close())
+    self.assertRaises(UnexpectedError, lambda: client.new_session_client(secret="new_secret"))
+
+  def test_http_error(self):
+    self.server.handler = lambda request: StubResponse(
+      503, {"errors": [{"code": "unavailable", "description": "on vacation"}]}, {})
+
+    async def run():
+      async with self._client() as client:
+        await client.query(1)
+
+    self.assertRaises(UnavailableError, lambda: _run(run()))
+
+  def test_invalid_json(self):
+    self.server.handler = lambda request: StubResponse(200, b"I like fine wine", {})
+
+    async def run():
+      async with self._client() as client:
+        await client.query(1)
+
+    with self.assertRaises(UnexpectedError) as cm:
+      _run(run())
+    self.assertEqual(cm.exception.request_result.response_raw, "I like fine wine")
+
+  def test_request_body(self):
+    async def run():
+      async with self._client() as client:
+        await client.query({"a": 1})
+
+    _run(run())
+    self.assertEqual(json.loads(self.server.requests[0].body.decode("utf-8")),
+                     {"object": {"a": 1}})
@@ -0,0 +1,59 @@
+"""
+Tests of :any:`AsyncEventStream`. They use syntax older Pythons cannot parse, so they are
+only imported by ``test_async_streams`` where they can run.
+"""
+import asyncio
+
+from faunadb.async_client import AsyncFaunaClient
+from faunadb.errors import StreamError, Unauthorized
+from faunadb.streams import POLL
+from tests.stub_server import StubResponse
+from tests.test_streams import _DOC, _expected, _start, _StreamsTest, _version
+
+
+def _run(coro):
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coro)
+  finally:
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+
+
+class AsyncEventStreamTest(_StreamsTest):
+  def take(self, count, **kwargs):
+    async def run():
+      events = []
+      async with AsyncFaunaClient(secret="secret", domain="127.0.0.1", scheme="http",
+                                  port=self.server.port) as client:
+        async with client.stream(_DOC, **kwargs) as stream:
+          async for event in stream:
+            events.append(event)
+            if len(events) == count:
+              break
+      return events, stream
+    return _run(run())
+
+  def test_reconnects_and_catches_up(self):
+    self.serve([[_start(10), _version(11)], [_start(20), _version(21)]], history=[11, 13, 21])
+    events, stream = self.take(5, reconnect_delay=0.01)
+    self.assertEqual(events, [_expected(txn) for txn in [10, 11, 20, 13, 21]])
+    self.assertEqual((stream.reconnects, stream.last_txn), (1, 21))
+    self.assertTrue(stream.closed)
+
+  def test_error_event(self):
+    self.serve([[_start(10), {"type": "error", "txn": 11, "event": {
+      "code": "permission denied", "description": "Insufficient privileges."}}]])
+    with self.assertRaises(StreamError) as raised:
+      self.take(2)
+    self.assertEqual(raised.exception.code, "permission denied")
+
+  def test_unauthorized(self):
+    self.serve([StubResponse(401, {"errors": [{"code": "unauthorized", "description": "no"}]},
+                             {})])
+    self.assertRaises(Unauthorized, lambda: self.take(1))
+
+  def test_poll(self):
+    self.serve([], history=[11, 12])
+    events, _ = self.take(3, mode=POLL, poll_interval=0.01)
+    self.assertEqual(events, [_expected(txn) for txn in [5, 11, 12]])
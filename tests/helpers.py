@@ -112,9 +112,9 @@ class _MockSession(object):
   def prepare_request(self, *args):
     pass
 
-  def send(self, *args):
+  def send(self, *args, **kwargs):
     # pylint: disable=unused-argument
-    return _MockResponse(self.status_code, self.response_text, {})
+    return _MockResponse(self.status_code, self.response_text, {}, self.response_text.encode())
 
 
-_MockResponse = namedtuple('MockResponse', ['status_code', 'text', 'headers'])
+_MockResponse = namedtuple('MockResponse', ['status_code', 'text', 'headers', 'content'])
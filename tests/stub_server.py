@@ -0,0 +1,170 @@
+"""
+A tiny local HTTP server that stands in for FaunaDB.
+
+It is used by tests that exercise the client's HTTP behaviour without a real
+database, and by the scripts in ``benchmarks/``.
+"""
+import json
+import threading
+import zlib
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from time import sleep
+from types import GeneratorType
+
+from faunadb.client import FaunaClient
+
+StubRequest = namedtuple("StubRequest", ["method", "path", "headers", "body"])
+"""A request received by a :py:class:`StubServer`. Gzipped bodies are decompressed."""
+
+StubResponse = namedtuple("StubResponse", ["status", "body", "headers"])
+"""A response a :py:class:`StubServer` handler can return."""
+
+
+def default_handler(request):
+  """Answers pings with a status message and echoes query bodies back as the resource."""
+  if request.path.startswith("/ping"):
+    return StubResponse(200, {"resource": "Scope write is OK"}, {})
+  resource = json.loads(request.body.decode("utf-8")) if request.body else None
+  return StubResponse(200, {"resource": resource}, {})
+
+
+class StubServer(object):
+  """
+  Serves ``handler(request)`` on a random local port.
+
+  The handler receives a :py:class:`StubRequest` and returns a :py:class:`StubResponse`.
+  A dict or list body is encoded as JSON. Every response carries an increasing ``X-Txn-Time``.
+  A generator body is streamed with chunked encoding, one line of JSON per item, and the
+  connection is closed once it is exhausted.
+
+  Use it as a context manager::
+
+    with StubServer() as server:
+      client = server.client()
+      client.query(...)
+  """
+
+  def __init__(self, handler=default_handler, latency=0):
+    self.handler = handler
+    self.latency = latency
+    self.requests = []
+    self._lock = threading.Lock()
+    self._txn_time = 0
+    self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _make_request_handler(self))
+    self._thread = None
+
+  @property
+  def port(self):
+    return self._server.server_address[1]
+
+  @property
+  def url(self):
+    return "http://127.0.0.1:%s" % self.port
+
+  def client(self, secret="secret", **kwargs):
+    """A :any:`FaunaClient` pointed at this server."""
+    return FaunaClient(secret=secret, domain="127.0.0.1", scheme="http", port=self.port, **kwargs)
+
+  def start(self):
+    self._thread = threading.Thread(target=self._server.serve_forever)
+    self._thread.daemon = True
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._server.shutdown()
+    self._server.server_close()
+    self._thread.join()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()
+
+  def _next_txn_time(self):
+    with self._lock:
+      self._txn_time += 1
+      return self._txn_time
+
+  def _record(self, request):
+    with self._lock:
+      self.requests.append(request)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+  request_queue_size = 1024
+
+  def handle_error(self, request, client_address):
+    # Clients in tests routinely drop connections, e.g. on timeouts.
+    pass
+
+
+def _make_request_handler(stub):
+  class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    # pylint: disable=invalid-name
+    def do_GET(self):
+      self._respond()
+
+    def do_POST(self):
+      self._respond()
+
+    def _respond(self):
+      length = int(self.headers.get("Content-Length") or 0)
+      body = self.rfile.read(length) if length else b""
+      if self.headers.get("Content-Encoding") == "gzip":
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+      request = StubRequest(self.command, self.path, dict(self.headers), body)
+      stub._record(request)
+
+      if stub.latency:
+        sleep(stub.latency)
+
+      response = stub.handler(request)
+      if isinstance(response.body, GeneratorType):
+        self._respond_chunked(response)
+        return
+      payload = response.body
+      if not isinstance(payload, bytes):
+        payload = json.dumps(payload).encode("utf-8")
+
+      self.send_response(response.status)
+      self.send_header("Content-Type", "application/json;charset=utf-8")
+      self.send_header("Content-Length", str(len(payload)))
+      self.send_header("X-Txn-Time", str(stub._next_txn_time()))
+      for key, value in response.headers.items():
+        self.send_header(key, value)
+      self.end_headers()
+      self.wfile.write(payload)
+
+    def _respond_chunked(self, response):
+      """Sends each item of a generator body as a line of JSON, as soon as it is produced."""
+      self.send_response(response.status)
+      self.send_header("Content-Type", "application/json;charset=utf-8")
+      self.send_header("Transfer-Encoding", "chunked")
+      for key, value in response.headers.items():
+        self.send_header(key, value)
+      self.end_headers()
+      try:
+        for item in response.body:
+          line = json.dumps(item).encode("utf-8") + b"\n"
+          self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+          self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+      except (IOError, OSError):
+        pass
+      finally:
+        response.body.close()
+      self.close_connection = True
+
+    def log_message(self, *args):
+      # pylint: disable=arguments-differ
+      pass
+
+  return _Handler
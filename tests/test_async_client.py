@@ -0,0 +1,13 @@
+import sys
+
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+ASYNC_SUPPORTED = sys.version_info >= (3, 6) and aiohttp is not None
+"""Whether :any:`AsyncFaunaClient` is available, and its tests can be imported."""
+
+if ASYNC_SUPPORTED:
+  # pylint: disable=unused-import
+  from tests.async_client_cases import AsyncClientTest
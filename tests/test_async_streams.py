@@ -0,0 +1,5 @@
+from tests.test_async_client import ASYNC_SUPPORTED
+
+if ASYNC_SUPPORTED:
+  # pylint: disable=unused-import
+  from tests.async_stream_cases import AsyncEventStreamTest
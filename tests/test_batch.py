@@ -0,0 +1,117 @@
+import json
+from threading import Thread
+from time import time
+from unittest import TestCase
+
+from faunadb import query as q
+from faunadb.batch import BatchWriter
+from faunadb.errors import BadRequest, NotFound, UnavailableError, UnexpectedError
+from tests.stub_server import StubResponse, StubServer
+
+
+def _batches(server):
+  return [json.loads(request.body.decode("utf-8")) for request in server.requests]
+
+
+def _reject(status, code, positioned):
+  """Fails batches containing "bad", giving its position if ``positioned``."""
+  def handler(request):
+    batch = json.loads(request.body.decode("utf-8"))
+    if "bad" in batch:
+      error = {"code": code, "description": "bad"}
+      if positioned:
+        error["position"] = [batch.index("bad")]
+      return StubResponse(status, {"errors": [error]}, {})
+    return StubResponse(200, {"resource": batch}, {})
+  return handler
+
+
+class BatchWriterTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_batches_by_count(self):
+    with BatchWriter(self.server.client(), max_ops=3, max_latency_ms=10000) as writer:
+      futures = [writer.write(i) for i in range(7)]
+      self.assertEqual([future.result(1) for future in futures[:6]], list(range(6)))
+    self.assertEqual(futures[6].result(), 6)
+    self.assertEqual(_batches(self.server), [[0, 1, 2], [3, 4, 5], [6]])
+
+  def test_batches_by_bytes(self):
+    with BatchWriter(self.server.client(), max_bytes=30, max_latency_ms=10000) as writer:
+      futures = [writer.write("x" * 10) for _ in range(5)]
+    self.assertEqual([future.result() for future in futures], ["x" * 10] * 5)
+    self.assertTrue(all(len(request.body) <= 30 for request in self.server.requests))
+    self.assertEqual(len(self.server.requests), 3)
+
+  def test_flushes_after_max_latency(self):
+    writer = BatchWriter(self.server.client(), max_latency_ms=50)
+    self.addCleanup(writer.close)
+    start = time()
+    futures = [writer.write(1), writer.write(2)]
+    self.assertEqual([future.result(1) for future in futures], [1, 2])
+    self.assertGreaterEqual(time() - start, 0.05)
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_flush(self):
+    writer = BatchWriter(self.server.client(), max_latency_ms=10000)
+    self.addCleanup(writer.close)
+    future = writer.write(1)
+    writer.flush()
+    self.assertTrue(future.done())
+    self.assertEqual(writer.pending, 0)
+
+  def test_write_helpers(self):
+    ref = q.ref(q.collection("things"), "1")
+    with BatchWriter(self.server.client()) as writer:
+      writer.create(q.collection("things"), {"data": {"a": 1}})
+      writer.update(ref, {"data": {"a": 2}})
+      writer.replace(ref, {"data": {"a": 3}})
+      writer.delete(ref)
+    self.assertEqual([list(op) for op in _batches(self.server)[0]],
+                     [["create", "params"], ["update", "params"], ["replace", "params"], ["delete"]])
+
+  def test_backpressure(self):
+    self.server.latency = 0.1
+    writer = BatchWriter(self.server.client(), max_ops=2, max_pending=2, max_latency_ms=10000)
+    self.addCleanup(writer.close)
+    for value in range(4):
+      writer.write(value)
+    blocked = Thread(target=writer.write, args=(5,))
+    blocked.start()
+    blocked.join(0.05)
+    self.assertTrue(blocked.is_alive())
+    blocked.join(1)
+    self.assertFalse(blocked.is_alive())
+
+  def test_isolates_positioned_error(self):
+    self.server.handler = _reject(400, "invalid argument", positioned=True)
+    with BatchWriter(self.server.client(), max_latency_ms=10000) as writer:
+      futures = [writer.write(value) for value in ["a", "bad", "b"]]
+    self.assertIsInstance(futures[1].exception(), BadRequest)
+    self.assertEqual([futures[0].result(), futures[2].result()], ["a", "b"])
+    self.assertEqual(_batches(self.server), [["a", "bad", "b"], ["a", "b"]])
+
+  def test_bisects_unpositioned_error(self):
+    self.server.handler = _reject(404, "instance not found", positioned=False)
+    values = ["a", "b", "c", "bad", "d", "e"]
+    with BatchWriter(self.server.client(), max_latency_ms=10000) as writer:
+      futures = [writer.write(value) for value in values]
+    self.assertIsInstance(futures[3].exception(), NotFound)
+    self.assertEqual([future.result() for i, future in enumerate(futures) if i != 3],
+                     ["a", "b", "c", "d", "e"])
+    self.assertLessEqual(len(self.server.requests), 7)
+
+  def test_other_errors_fail_the_batch(self):
+    self.server.handler = lambda request: StubResponse(
+      503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+    with BatchWriter(self.server.client(), max_latency_ms=10000) as writer:
+      futures = [writer.write(i) for i in range(4)]
+    self.assertTrue(all(isinstance(future.exception(), UnavailableError) for future in futures))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_closed(self):
+    writer = BatchWriter(self.server.client())
+    writer.close()
+    self.assertRaises(UnexpectedError, lambda: writer.write(1))
@@ -0,0 +1,217 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from faunadb import bulk
+from faunadb.bulk import export_set, import_file, LatencyHistogram, read_records
+from faunadb.errors import BadRequest, UnavailableError
+from faunadb.query import collection, documents, get, lambda_, var
+from tests.stub_server import StubResponse, StubServer
+
+
+def _created(server):
+  """The data of every document the server was asked to create."""
+  created = []
+  for request in server.requests:
+    body = json.loads(request.body.decode("utf-8"))
+    created.extend(record["object"] for record in body["collection"])
+  return created
+
+
+class _FilesTest(TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.dir)
+
+  def write(self, name, content):
+    path = os.path.join(self.dir, name)
+    with open(path, "wb") as target:
+      target.write(content.encode("utf-8"))
+    return path
+
+
+class ReadRecordsTest(_FilesTest):
+  def test_jsonl(self):
+    path = self.write("things.jsonl", '{"a": 1}\n\n{"a": 2}\n{"a": 3}')
+    records = list(read_records(path))
+    self.assertEqual([record for record, _ in records], [{"a": 1}, {"a": 2}, {"a": 3}])
+    self.assertEqual(list(read_records(path, offset=records[0][1])), records[1:])
+
+  def test_csv(self):
+    path = self.write("things.csv", 'a,b\n1,"two\nlines"\n3,4\n')
+    records = list(read_records(path))
+    self.assertEqual([record for record, _ in records],
+                     [{"a": "1", "b": "two\nlines"}, {"a": "3", "b": "4"}])
+    self.assertEqual(list(read_records(path, offset=records[0][1])), records[1:])
+
+  def test_csv_non_ascii(self):
+    path = self.write("things.csv", u'name,city\nJos\u00e9,S\u00e3o Paulo\n')
+    self.assertEqual([record for record, _ in read_records(path)],
+                     [{u"name": u"Jos\u00e9", u"city": u"S\u00e3o Paulo"}])
+
+  def test_empty(self):
+    self.assertEqual(list(read_records(self.write("empty.jsonl", ""))), [])
+    self.assertEqual(list(read_records(self.write("empty.csv", ""))), [])
+
+  def test_unknown_format(self):
+    self.assertRaises(ValueError, lambda: list(read_records("things.xml", format="xml")))
+
+
+class LatencyHistogramTest(TestCase):
+  def test_percentiles(self):
+    histogram = LatencyHistogram()
+    for ms in [0.5, 1.5, 3, 3, 100]:
+      histogram.record(ms / 1000.0)
+    self.assertEqual(histogram.counts[:3], [1, 1, 2])
+    self.assertEqual(histogram.percentile(50), 0.004)
+    self.assertEqual(histogram.percentile(100), 0.1)
+    self.assertIn("<= 128 ms", str(histogram))
+
+
+class ImportFileTest(_FilesTest):
+  def setUp(self):
+    super(ImportFileTest, self).setUp()
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+    self.path = self.write("things.jsonl", "".join('{"n": %d}\n' % n for n in range(100)))
+
+  def test_import(self):
+    stats = import_file(self.server.client(), "things", self.path, max_batch_records=30, workers=3)
+    self.assertEqual(sorted(record["n"] for record in _created(self.server)), list(range(100)))
+    self.assertEqual(len(self.server.requests), 4)
+    self.assertEqual((stats.records, stats.batches, stats.latencies.count), (100, 4, 4))
+    self.assertEqual(stats.offset, os.path.getsize(self.path))
+    self.assertGreater(stats.docs_per_sec, 0)
+
+    body = json.loads(self.server.requests[0].body.decode("utf-8"))
+    self.assertEqual(body["foreach"]["expr"]["create"], {"collection": "things"})
+
+  def test_batches_by_bytes(self):
+    import_file(self.server.client(), "things", self.path, max_batch_bytes=200)
+    self.assertTrue(all(len(request.body) < 400 for request in self.server.requests))
+    self.assertEqual(len(_created(self.server)), 100)
+
+  def test_resumes_from_checkpoint(self):
+    def handler(request):
+      records = json.loads(request.body.decode("utf-8"))["collection"]
+      if any(record["object"]["n"] == 50 for record in records):
+        return StubResponse(400, {"errors": [{"code": "invalid", "description": "bad"}]}, {})
+      return StubResponse(200, {"resource": records}, {})
+    self.server.handler = handler
+    checkpoint = os.path.join(self.dir, "ckpt")
+
+    self.assertRaises(BadRequest, lambda: import_file(
+      self.server.client(), "things", self.path, max_batch_records=10, workers=1,
+      checkpoint=checkpoint))
+    with open(checkpoint) as source:
+      self.assertEqual(json.load(source)["records"], 50)
+
+    self.server.handler = lambda request: StubResponse(
+      200, {"resource": json.loads(request.body.decode("utf-8"))["collection"]}, {})
+    del self.server.requests[:]
+    stats = import_file(self.server.client(), "things", self.path, max_batch_records=10,
+                        checkpoint=checkpoint)
+    self.assertEqual(stats.records, 50)
+    self.assertEqual(sorted(record["n"] for record in _created(self.server)), list(range(50, 100)))
+
+    stats = import_file(self.server.client(), "things", self.path, checkpoint=checkpoint)
+    self.assertEqual(stats.records, 0)
+
+  def test_checkpoint_for_another_file(self):
+    checkpoint = os.path.join(self.dir, "ckpt")
+    import_file(self.server.client(), "things", self.path, checkpoint=checkpoint)
+    other = self.write("other.jsonl", '{"n": 1}\n')
+    self.assertRaises(ValueError, lambda: import_file(
+      self.server.client(), "things", other, checkpoint=checkpoint))
+
+  def test_main(self):
+    path = self.write("things.csv", "n\n1\n2\n")
+    bulk.main(["import", path, "--collection", "things", "--secret", "secret",
+               "--scheme", "http", "--domain", "127.0.0.1", "--port", str(self.server.port)])
+    self.assertEqual(_created(self.server), [{"n": "1"}, {"n": "2"}])
+
+
+_THINGS = documents(collection("things"))
+_COLLECTION_REF = {"@ref": {"id": "things", "collection": {"@ref": {"id": "collections"}}}}
+
+
+def _pages(total, fail_after=None):
+  """Paginates the numbers up to ``total``, failing the page after ``fail_after`` if given."""
+  def handler(request):
+    body = json.loads(request.body.decode("utf-8"))
+    page = body.get("collection", body)
+    start = page.get("after", [0])[0]
+    if start == fail_after:
+      return StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+    end = min(start + page["size"], total)
+    resource = {"data": [{"n": n, "ref": _COLLECTION_REF} for n in range(start, end)]}
+    if end < total:
+      resource["after"] = [end]
+    return StubResponse(200, {"resource": resource}, {})
+  return handler
+
+
+def _lines(path, compressed=False):
+  with (gzip.open if compressed else open)(path, "rb") as source:
+    return [json.loads(line.decode("utf-8")) for line in source]
+
+
+class ExportSetTest(_FilesTest):
+  def setUp(self):
+    super(ExportSetTest, self).setUp()
+    self.server = StubServer(handler=_pages(25)).start()
+    self.addCleanup(self.server.stop)
+
+  def test_export(self):
+    path = os.path.join(self.dir, "things.jsonl")
+    stats = export_set(self.server.client(), _THINGS, path, size=10)
+    self.assertEqual(_lines(path), [{"n": n, "ref": _COLLECTION_REF} for n in range(25)])
+    self.assertEqual((stats.records, stats.batches, stats.done), (25, 3, True))
+    self.assertEqual(len(self.server.requests), 3)
+
+  def test_map_lambda(self):
+    path = os.path.join(self.dir, "things.jsonl")
+    export_set(self.server.client(), _THINGS, path, map_lambda=lambda_("ref", get(var("ref"))),
+               size=10)
+    body = json.loads(self.server.requests[0].body.decode("utf-8"))
+    self.assertEqual(body["map"], {"lambda": "ref", "expr": {"get": {"var": "ref"}}})
+    self.assertEqual(len(_lines(path)), 25)
+
+  def test_gzip(self):
+    path = os.path.join(self.dir, "things.jsonl.gz")
+    export_set(self.server.client(), _THINGS, path, size=10)
+    self.assertEqual([line["n"] for line in _lines(path, compressed=True)], list(range(25)))
+
+  def test_after(self):
+    path = os.path.join(self.dir, "things.jsonl")
+    export_set(self.server.client(), _THINGS, path, size=10, after=[20])
+    self.assertEqual([line["n"] for line in _lines(path)], list(range(20, 25)))
+
+  def test_resumes_from_checkpoint(self):
+    for compressed in [False, True]:
+      path = os.path.join(self.dir, "things.jsonl" + (".gz" if compressed else ""))
+      checkpoint = path + ".ckpt"
+      self.server.handler = _pages(25, fail_after=20)
+      self.assertRaises(UnavailableError, lambda: export_set(
+        self.server.client(), _THINGS, path, size=10, checkpoint=checkpoint))
+      self.assertEqual(len(_lines(path, compressed)), 20)
+
+      # A page written after the last checkpoint is dropped on resume.
+      with open(path, "ab") as target:
+        target.write(bulk._gzip(b'{"n": 20}\n') if compressed else b'{"n": 20}\n')
+      self.server.handler = _pages(25)
+      stats = export_set(self.server.client(), _THINGS, path, size=10, checkpoint=checkpoint)
+      self.assertEqual((stats.records, stats.done), (5, True))
+      self.assertEqual([line["n"] for line in _lines(path, compressed)], list(range(25)))
+
+      stats = export_set(self.server.client(), _THINGS, path, size=10, checkpoint=checkpoint)
+      self.assertEqual(stats.records, 0)
+
+  def test_main(self):
+    path = os.path.join(self.dir, "things.jsonl")
+    bulk.main(["export", path, "--collection", "things", "--size", "10", "--secret", "secret",
+               "--scheme", "http", "--domain", "127.0.0.1", "--port", str(self.server.port)])
+    self.assertEqual(len(_lines(path)), 25)
@@ -0,0 +1,174 @@
+from multiprocessing import Manager
+from time import sleep
+from unittest import TestCase
+
+from faunadb import query as q
+from faunadb.cache import MappingBackend, MemoryBackend, QueryCache
+from faunadb.errors import NotFound
+from tests.stub_server import StubResponse, StubServer
+
+_READ = q.get(q.ref(q.collection("things"), "1"))
+_WRITE = q.create(q.collection("things"), {"data": {"a": 1}})
+
+
+class MemoryBackendTest(TestCase):
+  def test_lru(self):
+    backend = MemoryBackend(max_size=2)
+    backend.set("a", b"1", None)
+    backend.set("b", b"2", None)
+    backend.get("a")
+    backend.set("c", b"3", None)
+    self.assertEqual((backend.get("a"), backend.get("b"), backend.get("c")), (b"1", None, b"3"))
+    self.assertEqual(backend.evictions, 1)
+
+  def test_ttl(self):
+    backend = MemoryBackend()
+    backend.set("a", b"1", 0.02)
+    self.assertEqual(backend.get("a"), b"1")
+    sleep(0.04)
+    self.assertIsNone(backend.get("a"))
+
+
+class MappingBackendTest(TestCase):
+  def test_bounded(self):
+    backend = MappingBackend({}, max_size=2)
+    backend.set("a", b"1", 0.02)
+    backend.set("b", b"2", None)
+    backend.set("c", b"3", None)
+    self.assertIsNone(backend.get("c"))
+    sleep(0.04)
+    backend.set("c", b"3", None)
+    self.assertEqual((backend.get("a"), backend.get("c")), (None, b"3"))
+    self.assertEqual(len(backend), 2)
+
+
+class QueryCacheTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_key(self):
+    cache = QueryCache()
+    self.assertEqual(cache.key("a", {"b": 1, "c": 2}), cache.key("a", {"c": 2, "b": 1}))
+    self.assertNotEqual(cache.key("a", {"b": 1}), cache.key("b", {"b": 1}))
+
+  def test_read_through(self):
+    cache = QueryCache()
+    client = self.server.client(query_cache=cache)
+    first = client.query(_READ)
+    self.assertEqual(client.query(_READ), first)
+    self.assertEqual(len(self.server.requests), 1)
+    self.assertEqual((cache.hits, cache.misses, cache.hit_rate), (1, 1, 0.5))
+
+  def test_results_are_copies(self):
+    client = self.server.client(query_cache=QueryCache())
+    client.query(_READ)["get"] = "changed"
+    self.assertNotEqual(client.query(_READ)["get"], "changed")
+
+  def test_keyed_by_secret(self):
+    client = self.server.client(query_cache=QueryCache())
+    client.query(_READ)
+    client.for_secret("other").query(_READ)
+    client.for_secret("other").query(_READ)
+    self.assertEqual(len(self.server.requests), 2)
+
+  def test_writes_bypass(self):
+    cache = QueryCache()
+    client = self.server.client(query_cache=cache)
+    client.query(_WRITE)
+    client.query(_WRITE)
+    client.query(q.call(q.function("f"), 1))
+    client.query(q.call(q.function("f"), 1))
+    self.assertEqual(len(self.server.requests), 4)
+    self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+  def test_non_deterministic_bypass(self):
+    cache = QueryCache()
+    client = self.server.client(query_cache=cache)
+    for expression in [q.new_id(), q.to_micros(q.now()), q.time("now"), [_READ, q.next_id()]]:
+      client.query(expression)
+      client.query(expression)
+    self.assertEqual(len(self.server.requests), 8)
+    self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+  def test_opt_in_and_out(self):
+    client = self.server.client(query_cache=QueryCache(default=False))
+    client.query(_READ)
+    client.query(_READ, cache=True)
+    client.query(_READ, cache=True)
+    self.assertEqual(len(self.server.requests), 2)
+
+    client = self.server.client(query_cache=QueryCache())
+    client.query(_READ, cache=False)
+    client.query(_READ, cache=False)
+    self.assertEqual(len(self.server.requests), 4)
+
+  def test_ttl(self):
+    client = self.server.client(query_cache=QueryCache(ttl=0.05))
+    client.query(_READ)
+    client.query(_READ)
+    sleep(0.1)
+    client.query(_READ)
+    self.assertEqual(len(self.server.requests), 2)
+
+  def test_errors_are_not_cached(self):
+    self.server.handler = lambda request: StubResponse(
+      404, {"errors": [{"code": "instance not found", "description": "missing"}]}, {})
+    client = self.server.client(query_cache=QueryCache())
+    self.assertRaises(NotFound, lambda: client.query(_READ))
+    self.assertRaises(NotFound, lambda: client.query(_READ))
+    self.assertEqual(len(self.server.requests), 2)
+
+  def test_with_observer(self):
+    observed = []
+    client = self.server.client(query_cache=QueryCache(), observer=observed.append)
+    client.query(_READ)
+    client.query(_READ)
+    self.assertEqual(len(observed), 1)
+
+  def test_shared_backend(self):
+    manager = Manager()
+    self.addCleanup(manager.shutdown)
+    backend = MappingBackend(manager.dict())
+    first = self.server.client(query_cache=QueryCache(backend))
+    second = self.server.client(query_cache=QueryCache(backend))
+    self.assertEqual(first.query(_READ), second.query(_READ))
+    self.assertEqual(len(self.server.requests), 1)
+
+
+class SnapshotCacheTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_pin(self):
+    cache = QueryCache(snapshot=True, max_staleness=1.0)
+    self.assertIsNone(cache.pin(None))
+    self.assertEqual(cache.pin(1000000), 1000000)
+    self.assertEqual(cache.pin(1500000), 1000000)
+    self.assertEqual(cache.pin(2000001), 2000001)
+    self.assertEqual(cache.snapshot_ts, 2000001)
+
+  def test_runs_at_snapshot(self):
+    cache = QueryCache(snapshot=True, max_staleness=1.0)
+    client = self.server.client(query_cache=cache)
+    self.assertNotIn("at", client.query(_READ))
+    self.assertIsNone(cache.snapshot_ts)
+
+    ts = client.get_last_txn_time()
+    self.assertEqual(client.query(_READ)["at"], ts)
+    self.assertEqual(client.query(_READ)["at"], ts)
+    self.assertEqual(len(self.server.requests), 2)
+    self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+  def test_advances_past_staleness(self):
+    cache = QueryCache(snapshot=True, max_staleness=1.0)
+    client = self.server.client(query_cache=cache)
+    client.sync_last_txn_time(1000000)
+    client.query(_READ)
+    client.sync_last_txn_time(1900000)
+    client.query(_READ)
+    self.assertEqual(len(self.server.requests), 1)
+    client.sync_last_txn_time(2000001)
+    self.assertEqual(client.query(_READ)["at"], 2000001)
+    self.assertEqual(len(self.server.requests), 2)
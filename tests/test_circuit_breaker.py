@@ -0,0 +1,102 @@
+from time import sleep
+from unittest import TestCase
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from faunadb.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from faunadb.client import FaunaClient
+from faunadb.errors import CircuitOpenError, UnavailableError
+from tests.stub_server import StubResponse, StubServer
+
+_UNAVAILABLE = StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+
+
+class CircuitBreakerTest(TestCase):
+  def test_opens_after_consecutive_failures(self):
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=3, observer=changes.append)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    self.assertEqual(breaker.state, CLOSED)
+    breaker.record_failure()
+    self.assertEqual(breaker.state, OPEN)
+    self.assertEqual([(c.previous, c.state, c.failures) for c in changes], [(CLOSED, OPEN, 3)])
+    self.assertRaises(CircuitOpenError, lambda: breaker.before_request(lambda: True))
+
+  def test_probe_closes(self):
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01, observer=changes.append)
+    breaker.record_failure()
+    sleep(0.02)
+    breaker.before_request(lambda: True)
+    self.assertEqual(breaker.state, CLOSED)
+    self.assertEqual(breaker.failures, 0)
+    self.assertEqual([c.state for c in changes], [OPEN, HALF_OPEN, CLOSED])
+
+  def test_failed_probe_reopens(self):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    sleep(0.02)
+    self.assertRaises(CircuitOpenError, lambda: breaker.before_request(lambda: False))
+    self.assertEqual(breaker.state, OPEN)
+    self.assertRaises(CircuitOpenError, lambda: breaker.before_request(lambda: True))
+
+  def test_rejects_while_probing(self):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    def probe():
+      self.assertEqual(breaker.state, HALF_OPEN)
+      self.assertRaises(CircuitOpenError, lambda: breaker.before_request(lambda: True))
+      return True
+    breaker.before_request(probe)
+    self.assertEqual(breaker.state, CLOSED)
+
+  def test_invalid_threshold(self):
+    self.assertRaises(ValueError, lambda: CircuitBreaker(failure_threshold=0))
+
+
+class CircuitBreakerClientTest(TestCase):
+  def test_fails_fast_on_unavailable(self):
+    healthy = []
+
+    def handler(request):
+      if request.path.startswith("/ping") or healthy:
+        return StubResponse(200, {"resource": "ok"}, {})
+      return _UNAVAILABLE
+
+    with StubServer(handler) as server:
+      breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+      client = server.client(circuit_breaker=breaker)
+      self.assertRaises(UnavailableError, lambda: client.query(1))
+      self.assertRaises(UnavailableError, lambda: client.query(1))
+      self.assertEqual(breaker.state, OPEN)
+
+      self.assertRaises(CircuitOpenError, lambda: client.query(1))
+      self.assertEqual(len(server.requests), 2)
+
+      healthy.append(True)
+      sleep(0.1)
+      self.assertEqual(client.query(1), "ok")
+      self.assertEqual(breaker.state, CLOSED)
+      self.assertEqual([request.path for request in server.requests[2:]], ["/ping", "/"])
+
+  def test_opens_on_connection_errors(self):
+    with StubServer() as server:
+      port = server.port
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = FaunaClient(secret="secret", domain="127.0.0.1", scheme="http", port=port,
+                         circuit_breaker=breaker)
+    self.assertRaises(RequestsConnectionError, lambda: client.query(1))
+    self.assertEqual(breaker.state, OPEN)
+    self.assertRaises(CircuitOpenError, lambda: client.query(1))
+
+  def test_shared_by_session_clients(self):
+    with StubServer(lambda request: _UNAVAILABLE) as server:
+      client = server.client(circuit_breaker=CircuitBreaker(failure_threshold=1))
+      self.assertRaises(UnavailableError, lambda: client.query(1))
+      session_client = client.new_session_client(secret="other")
+      self.assertRaises(CircuitOpenError, lambda: session_client.query(1))
@@ -1,6 +1,14 @@
+import json
+import threading
+from time import sleep
+from unittest import TestCase
+
+from faunadb import client as client_module
 from faunadb.client import FaunaClient
-from faunadb.errors import UnexpectedError
+from faunadb.errors import BadRequest, BatchError, UnexpectedError
+from faunadb.query import add
 from tests.helpers import FaunaTestCase
+from tests.stub_server import StubResponse, StubServer
 
 class ClientTest(FaunaTestCase):
 
@@ -33,9 +41,213 @@ class ClientTest(FaunaTestCase):
     self.client.sync_last_txn_time(new_time)
     self.assertEqual(self.client.get_last_txn_time(), new_time) # last-txn can move forward
 
+  def test_query_batch(self):
+    self.assertEqual(self.client.query_batch([add(1, 2), "a", [1]]), [3, "a", [1]])
+
+    error = self.assert_raises(BatchError,
+                               lambda: self.client.query_batch([add(1, 2), add(1, "two")]))
+    self.assertEqual(error.index, 1)
+    self.assertEqual(error.expression, add(1, "two"))
+    self.assertIsInstance(error.cause, BadRequest)
+
   def test_error_on_closed_client(self):
     client = FaunaClient(secret="secret")
     client.__del__()
     self.assertRaisesRegexCompat(UnexpectedError,
                                  "Cannnot create a session client from a closed session",
                                  lambda: client.new_session_client(secret="new_secret"))
+
+
+class ClientStubTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_query_batch_single_request(self):
+    client = self.server.client()
+    self.assertEqual(client.query_batch([1, "two", [3]]), [1, "two", [3]])
+    self.assertEqual(len(self.server.requests), 1)
+    self.assertEqual(self.server.requests[0].body, b'[1,"two",[3]]')
+
+  def test_query_batch_splits_by_size(self):
+    client = self.server.client()
+    expressions = ["x" * 10] * 10
+    self.assertEqual(client.query_batch(expressions, max_batch_bytes=50), expressions)
+    bodies = [request.body for request in self.server.requests]
+    self.assertEqual(len(bodies), 4)
+    self.assertTrue(all(len(body) <= 50 for body in bodies))
+    self.assertEqual(sum(len(json.loads(body.decode("utf-8"))) for body in bodies), 10)
+
+  def test_query_batch_oversized_expression(self):
+    client = self.server.client()
+    self.assertEqual(client.query_batch(["x" * 100, 1], max_batch_bytes=50), ["x" * 100, 1])
+    self.assertEqual(len(self.server.requests), 2)
+
+  def test_query_batch_empty(self):
+    self.assertEqual(self.server.client().query_batch([]), [])
+    self.assertEqual(self.server.requests, [])
+
+  def test_query_batch_error_position(self):
+    def handler(request):
+      batch = json.loads(request.body.decode("utf-8"))
+      if "bad" in batch:
+        error = {"code": "invalid argument", "description": "bad", "position": [batch.index("bad")]}
+        return StubResponse(400, {"errors": [error]}, {})
+      return StubResponse(200, {"resource": batch}, {})
+    self.server.handler = handler
+
+    client = self.server.client()
+    with self.assertRaises(BatchError) as cm:
+      client.query_batch(["a", "b", "c", "bad", "d"], max_batch_bytes=10)
+    error = cm.exception
+    self.assertEqual(error.index, 3)
+    self.assertEqual(error.expression, "bad")
+    self.assertIsInstance(error.cause, BadRequest)
+    self.assertEqual(error.results, ["a", "b", "c"])
+
+  def test_query_batch_unpositioned_error(self):
+    self.server.handler = lambda request: StubResponse(
+      400, {"errors": [{"code": "invalid expression", "description": "nope"}]}, {})
+    self.assertRaises(BadRequest, lambda: self.server.client().query_batch([1, 2]))
+
+  def test_query_many_ordered(self):
+    self.server.handler = _echo_after(lambda value: 0.05 if value == 0 else 0)
+    client = self.server.client()
+    outcomes = list(client.query_many(range(10), max_concurrency=4))
+    self.assertEqual([outcome.index for outcome in outcomes], list(range(10)))
+    self.assertEqual([outcome.get() for outcome in outcomes], list(range(10)))
+
+  def test_query_many_unordered(self):
+    self.server.handler = _echo_after(lambda value: 0.2 if value == 0 else 0)
+    client = self.server.client()
+    outcomes = list(client.query_many(range(5), ordered=False))
+    self.assertEqual(outcomes[-1].index, 0)
+    self.assertEqual(sorted(outcome.result for outcome in outcomes), list(range(5)))
+
+  def test_query_many_captures_errors(self):
+    def handler(request):
+      if request.body == b'"bad"':
+        return StubResponse(400, {"errors": [{"code": "invalid argument", "description": "bad"}]}, {})
+      return StubResponse(200, {"resource": json.loads(request.body.decode("utf-8"))}, {})
+    self.server.handler = handler
+
+    outcomes = list(self.server.client().query_many(["a", "bad", "c"]))
+    self.assertEqual([outcome.ok for outcome in outcomes], [True, False, True])
+    self.assertIsInstance(outcomes[1].error, BadRequest)
+    self.assertIsNone(outcomes[1].result)
+    self.assertRaises(BadRequest, outcomes[1].get)
+
+  def test_query_many_bounds_concurrency(self):
+    lock = threading.Lock()
+    counts = {"current": 0, "max": 0}
+
+    def handler(request):
+      with lock:
+        counts["current"] += 1
+        counts["max"] = max(counts["max"], counts["current"])
+      sleep(0.02)
+      with lock:
+        counts["current"] -= 1
+      return StubResponse(200, {"resource": None}, {})
+    self.server.handler = handler
+
+    client = self.server.client(pool_maxsize=3)
+    self.assertEqual(len(list(client.query_many(range(12), max_concurrency=10))), 12)
+    self.assertEqual(counts["max"], 3)
+
+  def test_query_many_is_lazy(self):
+    client = self.server.client()
+    outcomes = client.query_many(range(100), max_concurrency=2)
+    self.assertEqual(next(outcomes).result, 0)
+    outcomes.close()
+    self.assertLess(len(self.server.requests), 10)
+
+  def test_response_raw_decoded_on_access(self):
+    observed = []
+    self.server.client(observer=observed.append).query(u"é")
+    rr = observed[0]
+    self.assertIsInstance(rr._response_raw, bytes)
+    self.assertEqual(rr.response_raw, u'{"resource": "\\u00e9"}')
+    self.assertEqual(rr.response_content, {"resource": u"é"})
+
+  def test_request_result_only_built_when_needed(self):
+    built = self._count_request_results()
+    self.assertEqual(self.server.client().query(1), 1)
+    self.assertEqual(built, [])
+
+    observed = []
+    self.server.client(observer=observed.append).query(1)
+    self.assertEqual(len(built), 1)
+    self.assertFalse(hasattr(observed[0], "__dict__"))
+
+  def test_request_result_built_for_errors(self):
+    server = StubServer(lambda request: StubResponse(400, {"errors": [
+      {"code": "invalid expression", "description": "bad"}]}, {})).start()
+    self.addCleanup(server.stop)
+    built = self._count_request_results()
+    with self.assertRaises(BadRequest) as cm:
+      server.client().query(1)
+    self.assertEqual(len(built), 1)
+    self.assertEqual(cm.exception.request_result.status_code, 400)
+
+  def test_for_secret_caches(self):
+    client = self.server.client()
+    first = client.for_secret("a")
+    self.assertIs(client.for_secret("a"), first)
+    self.assertIsNot(client.for_secret("b"), first)
+    self.assertEqual(client.counter.counter, 3)
+    self.assertEqual(first.query(1), 1)
+    self.assertEqual(self.server.requests[-1].headers["Authorization"], "Basic YTo=")
+
+  def test_for_secret_evicts_least_recently_used(self):
+    client = self.server.client(max_session_clients=2)
+    a = id(client.for_secret("a"))
+    client.for_secret("b")
+    client.for_secret("a")
+    client.for_secret("c")
+    self.assertEqual(client.counter.counter, 3)
+    self.assertEqual(id(client.for_secret("a")), a)
+    self.assertEqual(len(client._session_clients), 2)
+
+  def test_for_secret_ttl(self):
+    client = self.server.client(session_client_ttl=0.05)
+    first = id(client.for_secret("a"))
+    self.assertEqual(id(client.for_secret("a")), first)
+    sleep(0.1)
+    client.for_secret("a")
+    self.assertEqual(client.counter.counter, 2)
+
+  def test_for_secret_concurrent(self):
+    client = self.server.client(max_session_clients=8)
+    seen = {}
+
+    def worker(n):
+      for i in range(50):
+        secret = "s%d" % ((n + i) % 10)
+        seen.setdefault(secret, set()).add(client.for_secret(secret).query(secret))
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(sorted(seen), ["s%d" % i for i in range(10)])
+    self.assertTrue(all(values == {secret} for secret, values in seen.items()))
+    self.assertEqual(client.counter.counter, 9)
+
+  def _count_request_results(self):
+
+    built = []
+    original = client_module.RequestResult
+    def counting(*args):
+      built.append(args)
+      return original(*args)
+    client_module.RequestResult = counting
+    self.addCleanup(setattr, client_module, "RequestResult", original)
+    return built
+
+def _echo_after(delay_for):
+  def handler(request):
+    value = json.loads(request.body.decode("utf-8"))
+    sleep(delay_for(value))
+    return StubResponse(200, {"resource": value}, {})
+  return handler
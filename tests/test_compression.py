@@ -0,0 +1,59 @@
+import zlib
+from unittest import TestCase
+
+from faunadb.compression import CompressionPolicy
+from faunadb.query import create, collection
+from faunadb.transport import Urllib3Transport
+from tests.stub_server import StubServer
+
+
+class CompressionPolicyTest(TestCase):
+  def test_threshold(self):
+    policy = CompressionPolicy(threshold=10)
+    self.assertIsNone(policy.compress(b"small"))
+    compressed = policy.compress(b"a" * 1000)
+    self.assertLess(len(compressed), 1000)
+    self.assertEqual(zlib.decompress(compressed, 16 + zlib.MAX_WBITS), b"a" * 1000)
+
+  def test_unsupported_encoding(self):
+    self.assertRaises(ValueError, lambda: CompressionPolicy(encoding="brotli"))
+
+
+class ClientCompressionTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+    self.observed = []
+
+  def _query(self, expression, **kwargs):
+    client = self.server.client(compression_policy=CompressionPolicy(threshold=1024),
+                                observer=self.observed.append, **kwargs)
+    return client.query(expression)
+
+  def test_compresses_large_bodies(self):
+    document = {"data": {"text": "lorem ipsum " * 1000}}
+    result = self._query(create(collection("widgets"), document))
+
+    self.assertEqual(result["params"]["object"]["data"]["object"]["text"], "lorem ipsum " * 1000)
+    request = self.server.requests[0]
+    self.assertEqual(request.headers["Content-Encoding"], "gzip")
+    self.assertLess(int(request.headers["Content-Length"]), len(request.body))
+
+    rr = self.observed[0]
+    self.assertEqual(rr.request_bytes, len(request.body))
+    self.assertEqual(rr.request_compressed_bytes, int(request.headers["Content-Length"]))
+
+  def test_small_bodies_are_not_compressed(self):
+    self.assertEqual(self._query(1), 1)
+    self.assertNotIn("Content-Encoding", self.server.requests[0].headers)
+    self.assertEqual(self.observed[0].request_bytes, 1)
+    self.assertIsNone(self.observed[0].request_compressed_bytes)
+
+  def test_urllib3_transport(self):
+    self.assertEqual(self._query(["x" * 2000], transport=Urllib3Transport()), ["x" * 2000])
+    self.assertEqual(self.server.requests[0].headers["Content-Encoding"], "gzip")
+
+  def test_uncompressed_sizes_are_recorded(self):
+    self.server.client(observer=self.observed.append).query("abc")
+    self.assertEqual(self.observed[0].request_bytes, 5)
+    self.assertIsNone(self.observed[0].request_compressed_bytes)
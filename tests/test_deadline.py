@@ -0,0 +1,97 @@
+from time import sleep, time
+from unittest import TestCase
+
+from requests.exceptions import ReadTimeout
+
+from faunadb.deadline import current_deadline, Deadline
+from faunadb.errors import DeadlineExceededError, UnavailableError
+from faunadb.page import Page
+from faunadb.query import match, index
+from faunadb.retry import RetryPolicy
+from faunadb.transport import Urllib3Transport
+from tests.stub_server import StubResponse, StubServer
+
+
+class DeadlineTest(TestCase):
+  def test_nesting(self):
+    self.assertIsNone(current_deadline())
+    with Deadline(10) as outer:
+      with Deadline(20):
+        self.assertIs(current_deadline(), outer)
+      with Deadline(1) as inner:
+        self.assertIs(current_deadline(), inner)
+      self.assertIs(current_deadline(), outer)
+    self.assertIsNone(current_deadline())
+
+  def test_request_timeout(self):
+    connect, read = Deadline(1.0, connect_timeout=0.2).request_timeout()
+    self.assertEqual(connect, 0.2)
+    self.assertTrue(0.9 < read <= 1.0)
+    self.assertIsNone(Deadline(-1).request_timeout())
+
+
+class DeadlineClientTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_query_timeout_header(self):
+    client = self.server.client()
+    with Deadline(2.0):
+      client.query(1)
+      client.query(2, timeout_millis=500)
+    client.query(3)
+    timeouts = [request.headers.get("X-Query-Timeout") for request in self.server.requests]
+    self.assertTrue(1900 < int(timeouts[0]) <= 2000)
+    self.assertEqual(timeouts[1:], ["500", None])
+
+  def test_expired(self):
+    client = self.server.client()
+    with Deadline(0.01):
+      sleep(0.02)
+      self.assertRaises(DeadlineExceededError, lambda: client.query(1))
+      self.assertRaises(DeadlineExceededError, client.ping)
+    self.assertEqual(self.server.requests, [])
+
+  def test_read_timeout(self):
+    self.server.latency = 0.5
+    for client in [self.server.client(), self.server.client(transport=Urllib3Transport())]:
+      start = time()
+      with Deadline(0.1):
+        self.assertRaises(DeadlineExceededError, lambda: client.query(1))
+      self.assertLess(time() - start, 0.4)
+
+  def test_client_timeout_is_applied(self):
+    self.server.latency = 0.5
+    self.assertRaises(ReadTimeout, lambda: self.server.client(timeout=0.1).query(1))
+
+  def test_stops_retrying(self):
+    self.server.handler = lambda request: StubResponse(
+      503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+    client = self.server.client(
+      retry_policy=RetryPolicy(max_attempts=100, base_delay=0.05, max_delay=0.05))
+    start = time()
+    with Deadline(0.3):
+      self.assertRaises(UnavailableError, lambda: client.query(1))
+    self.assertLess(time() - start, 0.35)
+    self.assertLess(len(self.server.requests), 10)
+
+  def test_set_iterator(self):
+    self.server.latency = 0.05
+    self.server.handler = lambda request: StubResponse(
+      200, {"resource": {"data": [1, 2], "after": [3]}}, {})
+    client = self.server.client()
+    with Deadline(0.2):
+      pages = Page.set_iterator(client, match(index("things")))
+    values = []
+    with self.assertRaises(DeadlineExceededError):
+      for value in pages:
+        values.append(value)
+    self.assertTrue(2 <= len(values) <= 8)
+
+  def test_query_many(self):
+    client = self.server.client()
+    with Deadline(0.01):
+      sleep(0.02)
+      outcomes = list(client.query_many(range(3)))
+    self.assertTrue(all(isinstance(o.error, DeadlineExceededError) for o in outcomes))
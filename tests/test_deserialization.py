@@ -2,7 +2,7 @@ from unittest import TestCase
 from iso8601 import parse_date
 
 from faunadb.objects import Ref, SetRef, FaunaTime, Query, Native
-from faunadb._json import parse_json
+from faunadb._json import parse_json, parse_json_or_none
 
 class DeserializationTest(TestCase):
 
@@ -107,5 +107,11 @@ class DeserializationTest(TestCase):
       "number": 1
     })
 
+  def test_parse_bytes(self):
+    self.assertEqual(parse_json_or_none(b'{"@ref":{"id":"collections"}}'), Native.COLLECTIONS)
+    self.assertEqual(parse_json_or_none(u'{"s":"\u00e9"}'.encode("utf-8")), {"s": u"\u00e9"})
+    self.assertIsNone(parse_json_or_none(b"I like fine wine"))
+    self.assertIsNone(parse_json_or_none(b'"\xff"'))
+
   def assertJson(self, json, expected):
     self.assertEqual(parse_json(json), expected)
@@ -0,0 +1,128 @@
+import threading
+from time import sleep
+from unittest import TestCase
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from faunadb.client import FaunaClient
+from faunadb.endpoints import Endpoint, EndpointPool, EWMA
+from faunadb.query import collection, create
+from tests.stub_server import StubResponse, StubServer
+
+
+def _closed_port():
+  with StubServer() as server:
+    return server.port
+
+
+def _client(pool, **kwargs):
+  return FaunaClient(secret="secret", endpoints=pool, **kwargs)
+
+
+class EndpointTest(TestCase):
+  def test_from_url(self):
+    endpoint = Endpoint.from_url("http://localhost:8443")
+    self.assertEqual((endpoint.scheme, endpoint.domain, endpoint.port), ("http", "localhost", 8443))
+    self.assertEqual(Endpoint.from_url("https://db.fauna.com").base_url, "https://db.fauna.com:443")
+    self.assertRaises(ValueError, lambda: Endpoint.from_url("db.fauna.com"))
+
+  def test_invalid_pool(self):
+    self.assertRaises(ValueError, lambda: EndpointPool([]))
+    self.assertRaises(ValueError, lambda: EndpointPool(["http://a"], strategy="random"))
+
+  def test_least_outstanding(self):
+    pool = EndpointPool(["http://a", "http://b"])
+    first = pool.choose()
+    pool._start(first)
+    self.assertIsNot(pool.choose(), first)
+    pool._finish(first, 0.1, False)
+    self.assertEqual(first.outstanding, 0)
+
+  def test_ewma(self):
+    pool = EndpointPool(["http://a", "http://b"], strategy=EWMA, latency_weight=0.5)
+    slow, fast = pool.endpoints
+    pool._start(slow)
+    pool._finish(slow, 1.0, False)
+    pool._start(fast)
+    pool._finish(fast, 0.1, False)
+    self.assertIs(pool.choose(), fast)
+    pool._start(slow)
+    pool._finish(slow, 0.0, False)
+    self.assertEqual(slow.latency, 0.5)
+    for _ in range(5):
+      pool._start(fast)
+    self.assertIs(pool.choose(), slow)
+
+
+class EndpointPoolClientTest(TestCase):
+  def setUp(self):
+    self.servers = [StubServer().start(), StubServer().start()]
+    for server in self.servers:
+      self.addCleanup(server.stop)
+
+  def test_spreads_requests(self):
+    pool = EndpointPool([server.url for server in self.servers], health_check_interval=None)
+    client = _client(pool)
+    for i in range(20):
+      self.assertEqual(client.query(i), i)
+    self.assertTrue(all(server.requests for server in self.servers))
+    self.assertEqual(sum(endpoint.requests for endpoint in pool.endpoints), 20)
+
+  def test_fails_over(self):
+    down = "http://127.0.0.1:%s" % _closed_port()
+    pool = EndpointPool([down, self.servers[0].url], health_check_interval=60)
+    client = _client(pool)
+    for i in range(5):
+      self.assertEqual(client.query(i), i)
+    self.assertEqual(len(self.servers[0].requests), 5)
+    self.assertEqual([endpoint.healthy for endpoint in pool.endpoints], [False, True])
+    self.assertEqual(pool.endpoints[0].failures, 1)
+
+  def test_does_not_resend_after_disconnection(self):
+    def disconnecting(request):
+      raise IOError("dropped")
+
+    with StubServer(disconnecting) as dropping:
+      pool = EndpointPool([dropping.url, self.servers[0].url], health_check_interval=60)
+      pool._start(pool.endpoints[1])
+      self.assertRaises(RequestsConnectionError,
+                        lambda: _client(pool).query(create(collection("things"), {})))
+      self.assertEqual(len(dropping.requests), 1)
+    self.assertEqual(self.servers[0].requests, [])
+    self.assertTrue(pool.endpoints[0].healthy)
+
+  def test_all_down(self):
+    pool = EndpointPool(["http://127.0.0.1:%s" % _closed_port()] * 2, health_check_interval=None)
+    self.assertRaises(RequestsConnectionError, lambda: _client(pool).query(1))
+
+  def test_health_checks(self):
+    healthy = threading.Event()
+
+    def handler(request):
+      if healthy.is_set():
+        return StubResponse(200, {"resource": "ok"}, {})
+      return StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+
+    with StubServer(handler) as flaky:
+      pool = EndpointPool([flaky.url, self.servers[0].url], health_check_interval=0.02)
+      client = _client(pool)
+      sleep(0.1)
+      self.assertEqual(pool.healthy, [pool.endpoints[1]])
+      healthy.set()
+      sleep(0.1)
+      self.assertEqual(len(pool.healthy), 2)
+      self.assertTrue(all("/ping" in request.path for request in flaky.requests))
+      del client
+      self.assertIsNone(pool._checker)
+
+  def test_txn_time_is_monotonic(self):
+    self.servers[0]._txn_time = 1000
+    pool = EndpointPool([server.url for server in self.servers], health_check_interval=None)
+    client = _client(pool)
+    seen = []
+    for i in range(10):
+      client.query(i)
+      seen.append(client.get_last_txn_time())
+    self.assertEqual(seen, sorted(seen))
+    self.assertGreater(seen[-1], 1000)
+    self.assertTrue(self.servers[1].requests)
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+from unittest import skipUnless, TestCase
+
+from faunadb.circuit_breaker import CircuitBreaker
+from faunadb.hedging import HedgingPolicy
+from faunadb.limiter import AdaptiveLimiter, RateLimiter
+from tests.stub_server import StubServer
+
+# Python 2 has no start methods, and always forks where it can.
+_FORK = hasattr(os, "fork") and (not hasattr(multiprocessing, "get_all_start_methods") or
+                                 "fork" in multiprocessing.get_all_start_methods())
+
+_client = None
+
+
+def _hammer(worker):
+  stats = _client.pool_stats()
+  results = [_client.query(worker * 1000 + i) for i in range(50)]
+  many = [outcome.get() for outcome in _client.query_many(range(10))]
+  return stats.open, results, many, _client.get_last_txn_time()
+
+
+@skipUnless(_FORK, "requires fork")
+class ForkTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def tearDown(self):
+    global _client
+    _client = None
+
+  def _run_workers(self, client, workers=4):
+    global _client
+    _client = client
+    pool = multiprocessing.get_context("fork").Pool(workers, maxtasksperchild=1)
+    try:
+      outcomes = pool.map_async(_hammer, range(workers * 2)).get(60)
+    except BaseException:
+      # Workers may be deadlocked.
+      pool.terminate()
+      raise
+    pool.close()
+    pool.join()
+    return outcomes
+
+  def test_process_pool(self):
+    client = self.server.client(hedging_policy=HedgingPolicy(), prewarm=2)
+    client.query(0)
+    list(client.query_many(range(3)))
+    parent_txn_time = client.get_last_txn_time()
+    parent_connections = client.pool_stats().open
+
+    outcomes = self._run_workers(client)
+    for worker, (open_connections, results, many, txn_time) in enumerate(outcomes):
+      self.assertEqual(open_connections, 0)
+      self.assertEqual(results, [worker * 1000 + i for i in range(50)])
+      self.assertEqual(many, list(range(10)))
+      self.assertGreater(txn_time, parent_txn_time)
+
+    self.assertEqual(client.pool_stats().open, parent_connections)
+    self.assertEqual(client.query("parent"), "parent")
+
+  def test_session_clients(self):
+    client = self.server.client()
+    session_client = client.new_session_client(secret="other")
+    session_client.query(1)
+    outcomes = self._run_workers(session_client, workers=2)
+    self.assertEqual([results for _, results, _, _ in outcomes],
+                     [[worker * 1000 + i for i in range(50)] for worker in range(4)])
+    self.assertEqual(session_client.query(2), 2)
+
+  def test_limiters(self):
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1, max_wait=5)
+    breaker = CircuitBreaker()
+    client = self.server.client(concurrency_limiter=limiter, rate_limiter=RateLimiter(10000),
+                                circuit_breaker=breaker)
+    # Another thread of the parent holds a request slot, and the locks, as the workers fork.
+    limiter.acquire()
+    locks = [limiter._lock, breaker._lock, client.rate_limiter.requests._lock]
+    for lock in locks:
+      lock.acquire()
+    try:
+      outcomes = self._run_workers(client, workers=2)
+    finally:
+      for lock in locks:
+        lock.release()
+    self.assertEqual([results for _, results, _, _ in outcomes],
+                     [[worker * 1000 + i for i in range(50)] for worker in range(4)])
+    self.assertEqual(limiter.in_flight, 1)
+    limiter.release(0.01)
+    self.assertEqual(client.query(1), 1)
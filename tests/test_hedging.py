@@ -0,0 +1,137 @@
+import json
+import threading
+from time import sleep, time
+from unittest import TestCase
+
+from faunadb import query
+from faunadb.hedging import HedgingPolicy
+from faunadb.objects import Ref
+from faunadb.query import _is_deterministic, _is_read_only, _wrap
+from tests.stub_server import StubResponse, StubServer
+
+
+class ReadOnlyTest(TestCase):
+  def test_reads(self):
+    ref = Ref("1", query.collection("widgets"))
+    self.assertTrue(_is_read_only(_wrap(query.get(ref))))
+    self.assertTrue(_is_read_only(_wrap(query.paginate(query.match(query.index("i"), "a")))))
+    self.assertTrue(_is_read_only(_wrap([1, {"a": query.add(1, 2)}])))
+    self.assertTrue(_is_read_only(_wrap(query.map_(lambda x: query.get(x), [ref]))))
+
+  def test_writes(self):
+    ref = Ref("1", query.collection("widgets"))
+    self.assertFalse(_is_read_only(_wrap(query.create(query.collection("widgets"), {}))))
+    self.assertFalse(_is_read_only(_wrap(query.if_(True, query.delete(ref), None))))
+    self.assertFalse(_is_read_only(_wrap(query.foreach(lambda x: query.update(x, {}), [ref]))))
+    self.assertFalse(_is_read_only(_wrap([1, query.call(query.function("f"), 1)])))
+    self.assertFalse(_is_read_only(_wrap(query.login(ref, {"password": "p"}))))
+
+  def test_non_deterministic(self):
+    ref = Ref("1", query.collection("widgets"))
+    self.assertTrue(_is_deterministic(_wrap(query.get(ref))))
+    self.assertTrue(_is_deterministic(_wrap(query.time("2020-01-01T00:00:00Z"))))
+    self.assertFalse(_is_deterministic(_wrap(query.to_micros(query.now()))))
+    self.assertFalse(_is_deterministic(_wrap(query.time("now"))))
+    self.assertFalse(_is_deterministic(_wrap([1, {"a": query.new_id()}])))
+    self.assertFalse(_is_deterministic(_wrap(query.let({"id": query.next_id()}, query.var("id")))))
+
+
+class HedgingTest(TestCase):
+  def setUp(self):
+    self.lock = threading.Lock()
+    self.slow = []
+    self.server = StubServer(handler=self._handler).start()
+    self.addCleanup(self.server.stop)
+    self.observed = []
+
+  def _handler(self, request):
+    with self.lock:
+      delay = self.slow.pop(0) if self.slow else 0
+    sleep(delay)
+    return StubResponse(200, {"resource": json.loads(request.body.decode("utf-8"))}, {})
+
+  def _client(self, **kwargs):
+    kwargs.setdefault("initial_delay", 0.05)
+    policy = HedgingPolicy(**kwargs)
+    return self.server.client(hedging_policy=policy, observer=self.observed.append), policy
+
+  def test_hedges_slow_read(self):
+    client, policy = self._client(max_extra_load=1)
+    self.slow = [1.0]
+    self.assertEqual(client.query(query.add(1, 2)), {"add": [1, 2]})
+
+    self.assertEqual(len(self.server.requests), 2)
+    self.assertTrue(self.observed[0].hedged)
+    self.assertTrue(self.observed[0].hedge_won)
+    self.assertLess(self.observed[0].time_taken, 0.5)
+    self.assertEqual((policy.requests, policy.hedges, policy.wins), (1, 1, 1))
+    self.assertEqual(policy.hedge_rate, 1.0)
+
+  def test_fast_read_is_not_hedged(self):
+    client, policy = self._client(max_extra_load=1)
+    client.query(1)
+    self.assertEqual(len(self.server.requests), 1)
+    self.assertFalse(self.observed[0].hedged)
+    self.assertEqual(policy.hedges, 0)
+
+  def test_never_hedges_writes(self):
+    client, policy = self._client(max_extra_load=1)
+    self.slow = [0.2]
+    client.query(query.create(query.collection("widgets"), {}))
+    client.query(1, read_only=False)
+    self.assertEqual(len(self.server.requests), 2)
+    self.assertEqual(policy.requests, 0)
+
+  def test_caller_marks_read_only(self):
+    client, policy = self._client(max_extra_load=1)
+    self.slow = [1.0]
+    client.query(query.call(query.function("f")), read_only=True)
+    self.assertEqual(policy.hedges, 1)
+
+  def test_losing_primary_is_cancelled(self):
+    client, _ = self._client(max_extra_load=1)
+    self.slow = [5.0]
+    client.query(1)
+    self.assertEqual(client.pool_stats().in_use, 0)
+
+  def test_losing_hedge_is_cancelled(self):
+    client, policy = self._client(max_extra_load=1)
+    self.slow = [0.2, 5.0]
+    start = time()
+    client.query(1)
+    self.assertLess(time() - start, 1)
+    self.assertEqual((policy.hedges, policy.wins), (1, 0))
+    for _ in range(100):
+      if client.pool_stats().in_use == 0:
+        break
+      sleep(0.01)
+    self.assertEqual(client.pool_stats().in_use, 0)
+
+  def test_primaries_do_not_wait_for_workers(self):
+    client, _ = self._client(max_workers=1, initial_delay=5)
+    self.server.latency = 0.2
+
+    def query():
+      client.query(1)
+    threads = [threading.Thread(target=query) for _ in range(5)]
+    start = time()
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertLess(time() - start, 0.8)
+
+  def test_extra_load_is_capped(self):
+    client, policy = self._client(max_extra_load=0.5)
+    self.slow = [0.2, 0.2]
+    client.query(1)
+    self.assertEqual(policy.hedges, 0)
+    client.query(1)
+    self.assertEqual(policy.hedges, 1)
+
+  def test_delay_follows_latency_percentile(self):
+    policy = HedgingPolicy(percentile=90, window=100, min_samples=10, min_delay=0)
+    self.assertEqual(policy.delay, 0.1)
+    for i in range(100):
+      policy.record(i / 1000.0)
+    self.assertEqual(policy.delay, 0.09)
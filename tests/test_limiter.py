@@ -0,0 +1,230 @@
+import threading
+from time import sleep, time
+from unittest import TestCase
+
+from faunadb.errors import LimitExceededError, UnavailableError
+from faunadb.limiter import AdaptiveLimiter, RateLimiter, TokenBucket
+from tests.stub_server import StubResponse, StubServer
+
+
+class AdaptiveLimiterTest(TestCase):
+  def test_grows_while_busy(self):
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=3)
+    limiter.acquire()
+    limiter.acquire()
+    for _ in range(3):
+      limiter.release(0.01)
+      limiter.acquire()
+    self.assertEqual(limiter.limit, 3)
+    limiter.release(0.01)
+    self.assertEqual(limiter.limit, 3)
+
+  def test_grows_linearly(self):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    for _ in range(10):
+      limiter.acquire()
+    limits = [limiter.limit]
+    for _ in range(6):
+      # One round trip: every request in flight completes and is replaced.
+      for _ in range(limits[-1]):
+        limiter.release(0.01)
+        while limiter.in_flight < limiter.limit:
+          limiter.acquire()
+      limits.append(limiter.limit)
+    # About 1 per round trip, rather than a share of the limit.
+    self.assertTrue(all(0 <= after - before <= 1 for before, after in zip(limits, limits[1:])))
+    self.assertEqual(limits[-1], 15)
+
+  def test_does_not_grow_while_idle(self):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    limiter.acquire()
+    limiter.release(0.01)
+    self.assertEqual(limiter.limit, 10)
+
+  def test_shrinks_on_drops(self):
+    limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5, min_limit=3)
+    for _ in range(3):
+      limiter.acquire()
+      limiter.release(0.01, dropped=True)
+    self.assertEqual(limiter.limit, 3)
+
+  def test_failures_do_not_set_baseline(self):
+    limiter = AdaptiveLimiter(initial_limit=20)
+    limiter.acquire()
+    limiter.release(0.001, dropped=True)
+    limiter.acquire()
+    limiter.release(0.001, succeeded=False)
+    for _ in range(200):
+      limiter.acquire()
+      limiter.release(0.05)
+    self.assertEqual(limiter.limit, 18)
+
+  def test_shrinks_on_latency(self):
+    limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5, latency_tolerance=2)
+    limiter.acquire()
+    limiter.release(0.01)
+    limiter.acquire()
+    limiter.release(0.05)
+    self.assertEqual(limiter.limit, 5)
+
+  def test_fail_fast(self):
+    limiter = AdaptiveLimiter(initial_limit=1, max_wait=0)
+    limiter.acquire()
+    self.assertRaises(LimitExceededError, limiter.acquire)
+    self.assertEqual(limiter.rejected, 1)
+
+  def test_wait_timeout(self):
+    limiter = AdaptiveLimiter(initial_limit=1, max_wait=0.01)
+    limiter.acquire()
+    self.assertRaises(LimitExceededError, limiter.acquire)
+    self.assertEqual(limiter.queued, 0)
+
+  def test_waiters_are_served_in_order(self):
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    limiter.acquire()
+    served = []
+
+    def wait_for_slot(i):
+      limiter.acquire()
+      served.append(i)
+      limiter.release(0.01)
+
+    threads = []
+    for i in range(5):
+      thread = threading.Thread(target=wait_for_slot, args=(i,))
+      thread.start()
+      threads.append(thread)
+      while limiter.queued <= i:
+        sleep(0.001)
+    limiter.release(0.01)
+    for thread in threads:
+      thread.join()
+    self.assertEqual(served, list(range(5)))
+    self.assertEqual(limiter.in_flight, 0)
+
+  def test_invalid_limits(self):
+    self.assertRaises(ValueError, lambda: AdaptiveLimiter(initial_limit=5, max_limit=2))
+
+
+class ClientLimiterTest(TestCase):
+  def setUp(self):
+    self.lock = threading.Lock()
+    self.current = self.peak = 0
+    self.status = 200
+    self.server = StubServer(handler=self._handler).start()
+    self.addCleanup(self.server.stop)
+
+  def _handler(self, request):
+    with self.lock:
+      self.current += 1
+      self.peak = max(self.peak, self.current)
+    sleep(0.01)
+    with self.lock:
+      self.current -= 1
+    if self.status == 503:
+      return StubResponse(503, {"errors": [{"code": "unavailable", "description": "busy"}]}, {})
+    return StubResponse(200, {"resource": None}, {})
+
+  def test_bounds_requests_in_flight(self):
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    client = self.server.client(concurrency_limiter=limiter, pool_maxsize=10)
+    outcomes = list(client.query_many(range(20)))
+    self.assertTrue(all(outcome.ok for outcome in outcomes))
+    self.assertEqual(self.peak, 2)
+    self.assertEqual(limiter.in_flight, 0)
+
+  def test_unavailable_shrinks_limit(self):
+    limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5)
+    client = self.server.client(concurrency_limiter=limiter)
+    self.status = 503
+    self.assertRaises(UnavailableError, lambda: client.query(1))
+    self.assertEqual(limiter.limit, 5)
+    self.assertEqual(limiter.in_flight, 0)
+
+
+class TokenBucketTest(TestCase):
+  def test_burst_then_rate(self):
+    bucket = TokenBucket(rate=100, capacity=3)
+    self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+    waited = bucket.acquire()
+    self.assertGreater(waited, 0)
+    self.assertLessEqual(waited, 0.01)
+
+  def test_reservations_queue_up(self):
+    bucket = TokenBucket(rate=100, capacity=1)
+    self.assertEqual(bucket.reserve(), 0)
+    first = bucket.reserve()
+    second = bucket.reserve()
+    self.assertAlmostEqual(second - first, 0.01, places=3)
+
+  def test_max_wait(self):
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.acquire()
+    self.assertRaises(LimitExceededError, lambda: bucket.acquire(max_wait=0.1))
+    self.assertLess(bucket.tokens, 1)
+    self.assertGreater(bucket.tokens, -0.1)
+
+  def test_charge(self):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.charge(15)
+    self.assertFalse(bucket.try_acquire(0))
+    self.assertAlmostEqual(bucket.reserve(0), 0.5, places=1)
+
+  def test_acquire_async(self):
+    import asyncio
+    bucket = TokenBucket(rate=100, capacity=1)
+    bucket.acquire()
+    loop = asyncio.new_event_loop()
+    try:
+      waited = loop.run_until_complete(bucket.acquire_async())
+    finally:
+      loop.close()
+    self.assertGreater(waited, 0)
+
+  def test_invalid_rate(self):
+    self.assertRaises(ValueError, lambda: TokenBucket(rate=0))
+
+
+class ClientRateLimiterTest(TestCase):
+  def setUp(self):
+    self.server = StubServer(handler=lambda request: StubResponse(
+      200, {"resource": None}, {"X-Read-Ops": "3", "X-Write-Ops": "1"})).start()
+    self.addCleanup(self.server.stop)
+    self.observed = []
+
+  def test_limits_requests(self):
+    client = self.server.client(rate_limiter=RateLimiter(requests_per_second=50, burst=2),
+                                observer=self.observed.append)
+    start = time()
+    for _ in range(5):
+      client.query(1)
+    self.assertGreaterEqual(time() - start, 0.05)
+    self.assertEqual(self.observed[0].rate_limit_wait, 0)
+    self.assertGreater(self.observed[-1].rate_limit_wait, 0)
+
+  def test_fail_fast(self):
+    client = self.server.client(rate_limiter=RateLimiter(requests_per_second=1, max_wait=0))
+    client.query(1)
+    self.assertRaises(LimitExceededError, lambda: client.query(1))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_limits_ops(self):
+    limiter = RateLimiter(requests_per_second=1000, ops_per_second=100, ops_burst=2)
+    client = self.server.client(rate_limiter=limiter, observer=self.observed.append)
+    client.query(1)
+    self.assertLess(limiter.ops.tokens, 1)
+    self.assertFalse(limiter.try_acquire())
+    client.query(1)
+    self.assertGreater(self.observed[-1].rate_limit_wait, 0)
+
+  def test_per_secret(self):
+    shared = RateLimiter(requests_per_second=1000)
+    tenant = RateLimiter(requests_per_second=1, max_wait=0)
+    client = self.server.client(rate_limiter=shared)
+    tenant_client = client.new_session_client(secret="tenant", rate_limiter=tenant)
+    other_client = client.new_session_client(secret="other")
+
+    tenant_client.query(1)
+    self.assertRaises(LimitExceededError, lambda: tenant_client.query(1))
+    self.assertIs(other_client.rate_limiter, shared)
+    other_client.query(1)
@@ -0,0 +1,74 @@
+from time import sleep
+from unittest import TestCase
+
+from faunadb.pool import PoolStats
+from faunadb.transport import Urllib3Transport
+from tests.stub_server import StubResponse, StubServer
+
+
+class PoolTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_prewarm(self):
+    client = self.server.client(prewarm=3)
+    stats = client.pool_stats()
+    self.assertEqual((stats.open, stats.idle, stats.in_use), (3, 3, 0))
+    self.assertEqual(self.server.requests, [])
+    client.query(1)
+    self.assertEqual(client.pool_stats().open, 3)
+
+  def test_prewarm_capped_at_pool_size(self):
+    client = self.server.client(prewarm=5, pool_maxsize=2)
+    self.assertEqual(client.pool_stats().idle, 2)
+
+  def test_prewarm_unreachable(self):
+    with StubServer() as closed:
+      client = closed.client
+    client = client(prewarm=2)
+    self.assertEqual(client.pool_stats().open, 0)
+
+  def test_in_use(self):
+    seen = []
+
+    def handler(request):
+      seen.append(client.pool_stats())
+      return StubResponse(200, {"resource": 1}, {})
+    self.server.handler = handler
+    client = self.server.client()
+    client.query(1)
+    self.assertEqual(seen[0].in_use, 1)
+    self.assertEqual(client.pool_stats(), PoolStats(1, 1, 0, client.pool_stats().wait_time, 0))
+
+  def test_idle_timeout(self):
+    client = self.server.client(idle_timeout=0.05)
+    client.query(1)
+    client.query(2)
+    self.assertEqual(client.pool_stats().reaped, 0)
+    sleep(0.1)
+    client.query(3)
+    self.assertEqual(client.pool_stats().reaped, 1)
+    self.assertEqual(client.pool_stats().open, 1)
+
+  def test_max_connection_age(self):
+    client = self.server.client(max_connection_age=0.1)
+    for i in range(4):
+      client.query(i)
+      sleep(0.04)
+    self.assertEqual(client.pool_stats().reaped, 1)
+
+  def test_session_clients_share_stats(self):
+    client = self.server.client(prewarm=1)
+    session_client = client.new_session_client(secret="other")
+    session_client.query(1)
+    self.assertEqual(session_client.pool_stats(), client.pool_stats())
+
+  def test_urllib3_transport(self):
+    transport = Urllib3Transport(idle_timeout=0.05)
+    client = self.server.client(transport=transport, prewarm=2)
+    self.assertEqual(client.pool_stats().idle, 2)
+    client.query(1)
+    sleep(0.1)
+    client.query(2)
+    self.assertEqual(client.pool_stats().reaped, 1)
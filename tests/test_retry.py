@@ -0,0 +1,146 @@
+from unittest import TestCase
+
+from requests.exceptions import ConnectionError as RequestsConnectionError, ReadTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from faunadb.errors import BadRequest, UnavailableError
+from faunadb.query import collection, create
+from faunadb.retry import RetryPolicy
+from tests.stub_server import StubResponse, StubServer
+
+_UNAVAILABLE = StubResponse(503, {"errors": [{"code": "unavailable", "description": "busy"}]}, {})
+
+
+def _failing(times, failure):
+  calls = []
+
+  def handler(request):
+    calls.append(request)
+    if len(calls) <= times:
+      return failure
+    return StubResponse(200, {"resource": "ok"}, {})
+  return handler
+
+
+_CREATE = create(collection("things"), {"data": {}})
+
+
+def _disconnecting(request):
+  """Reads the request, then drops the connection without answering."""
+  raise IOError("dropped")
+
+
+class RetryPolicyTest(TestCase):
+  def test_delays_are_bounded(self):
+    backoff = RetryPolicy(max_attempts=5, base_delay=0.001, max_delay=0.004).backoff()
+    delays = []
+    while backoff.retry():
+      delays.append(backoff._delay)
+    self.assertEqual(backoff.attempt, 5)
+    self.assertEqual(len(delays), 4)
+    self.assertTrue(all(0.001 <= delay <= 0.004 for delay in delays))
+
+  def test_deadline(self):
+    backoff = RetryPolicy(max_attempts=100, base_delay=0.05, max_delay=0.05, deadline=0.12).backoff()
+    while backoff.retry():
+      pass
+    self.assertEqual(backoff.attempt, 3)
+
+  def test_invalid_max_attempts(self):
+    self.assertRaises(ValueError, lambda: RetryPolicy(max_attempts=0))
+
+
+class ClientRetryTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+    self.observed = []
+
+  def _client(self, **kwargs):
+    policy = RetryPolicy(base_delay=0.001, max_delay=0.01, **kwargs)
+    return self.server.client(retry_policy=policy, observer=self.observed.append)
+
+  def test_retries_transient_status(self):
+    self.server.handler = _failing(2, _UNAVAILABLE)
+    self.assertEqual(self._client().query({"a": 1}), "ok")
+    self.assertEqual([rr.attempt for rr in self.observed], [1, 2, 3])
+    self.assertEqual([rr.status_code for rr in self.observed], [503, 503, 200])
+    bodies = set(request.body for request in self.server.requests)
+    self.assertEqual(bodies, set([b'{"object":{"a":1}}']))
+
+  def test_gives_up_after_max_attempts(self):
+    self.server.handler = _failing(5, _UNAVAILABLE)
+    self.assertRaises(UnavailableError, lambda: self._client(max_attempts=2).query(1))
+    self.assertEqual(len(self.server.requests), 2)
+
+  def test_does_not_retry_client_errors(self):
+    error = StubResponse(400, {"errors": [{"code": "invalid argument", "description": "no"}]}, {})
+    self.server.handler = _failing(1, error)
+    self.assertRaises(BadRequest, lambda: self._client().query(1))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_no_retry_by_default(self):
+    self.server.handler = _failing(1, _UNAVAILABLE)
+    self.assertRaises(UnavailableError, lambda: self.server.client().query(1))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_retries_connection_errors(self):
+    client = self._client()
+    send = client._perform_request
+    failures = [RequestsConnectionError("refused"), RequestsConnectionError("refused")]
+
+    def perform_request(*args):
+      if failures:
+        raise failures.pop()
+      return send(*args)
+    client._perform_request = perform_request
+
+    self.assertEqual(client.query(1), 1)
+    self.assertEqual([rr.attempt for rr in self.observed], [3])
+
+  def test_does_not_retry_writes_after_transient_status(self):
+    self.server.handler = _failing(1, _UNAVAILABLE)
+    self.assertRaises(UnavailableError, lambda: self._client().query(_CREATE))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_does_not_resend_writes_after_disconnection(self):
+    self.server.handler = _disconnecting
+    self.assertRaises(RequestsConnectionError, lambda: self._client().query(_CREATE))
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_resends_reads_after_disconnection(self):
+    self.server.handler = _disconnecting
+    self.assertRaises(RequestsConnectionError, lambda: self._client().query(1))
+    self.assertEqual(len(self.server.requests), 3)
+
+  def test_retries_writes_that_could_not_connect(self):
+    client = self._client()
+    send = client._perform_request
+    failures = [RequestsConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "no")))]
+
+    def perform_request(*args):
+      if failures:
+        raise failures.pop()
+      return send(*args)
+    client._perform_request = perform_request
+
+    client.query(_CREATE)
+    self.assertEqual([rr.attempt for rr in self.observed], [2])
+
+  def test_retry_writes(self):
+    self.server.handler = _failing(1, _UNAVAILABLE)
+    self.assertEqual(self._client(retry_writes=True).query(_CREATE), "ok")
+    self.assertEqual(len(self.server.requests), 2)
+
+  def test_does_not_retry_read_timeouts(self):
+    client = self._client()
+
+    def perform_request(*args):
+      raise ReadTimeout("slow")
+    client._perform_request = perform_request
+
+    self.assertRaises(ReadTimeout, lambda: client.query(1))
+
+  def test_session_client_inherits_policy(self):
+    client = self._client()
+    self.assertIs(client.new_session_client(secret="other").retry_policy, client.retry_policy)
@@ -0,0 +1,115 @@
+import json
+from time import time
+from unittest import TestCase
+
+from faunadb.errors import UnavailableError
+from faunadb.query import index, lambda_, match, var
+from faunadb.scan import partition_sets, partitioned_scan, sample_split_points
+from faunadb._json import to_json
+from tests.stub_server import StubResponse, StubServer
+
+_SET = match(index("things"))
+
+
+def _in_set(entries, expression):
+  """Evaluates ``range`` and ``difference`` of the index over ``entries``."""
+  if "difference" in expression:
+    first, second = expression["difference"]
+    excluded = set(_in_set(entries, second))
+    return [entry for entry in _in_set(entries, first) if entry not in excluded]
+  if "range" in expression:
+    low, high = expression["from"], expression["to"]
+    return [entry for entry in _in_set(entries, expression["range"])
+            if (low == [] or entry >= low) and (high == [] or entry <= high)]
+  return entries
+
+
+def _index_handler(total, fail_from=None):
+  """Serves an index whose entries are the numbers up to ``total``."""
+  entries = list(range(total))
+
+  def paginate(page):
+    start = page.get("after", [0])[0]
+    if fail_from is not None and start >= fail_from:
+      return None
+    data = [entry for entry in _in_set(entries, page["paginate"]) if entry >= start]
+    resource = {"data": data[:page["size"]]}
+    if len(data) > page["size"]:
+      resource["after"] = [data[page["size"]]]
+    return resource
+
+  def handler(request):
+    body = json.loads(request.body.decode("utf-8"))
+    if "let" in body:
+      page = paginate(body["let"][0]["page"])
+      samples = [page["data"][s["select"][1]] if s["select"][1] < len(page["data"]) else None
+                 for s in body["in"]["object"]["samples"]]
+      return StubResponse(200, {"resource": {"samples": samples, "after": page.get("after")}}, {})
+    if "map" in body:
+      page = paginate(body["collection"])
+      if page is not None:
+        page["data"] = [{"mapped": entry} for entry in page["data"]]
+    else:
+      page = paginate(body)
+    if page is None:
+      return StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+    return StubResponse(200, {"resource": page}, {})
+  return handler
+
+
+class ScanTest(TestCase):
+  def setUp(self):
+    self.server = StubServer(handler=_index_handler(100)).start()
+    self.addCleanup(self.server.stop)
+
+  def test_partition_sets(self):
+    sets = [json.loads(to_json(s)) for s in partition_sets(_SET, [10, 20])]
+    self.assertEqual(sets[0]["difference"][0]["from"], [])
+    self.assertEqual(sets[0]["difference"][1], {"range": sets[0]["difference"][0]["range"],
+                                                "from": 10, "to": 10})
+    self.assertEqual((sets[2]["from"], sets[2]["to"]), (20, []))
+
+  def test_sample_split_points(self):
+    client = self.server.client()
+    self.assertEqual(sample_split_points(client, _SET, 4, page_size=30, samples_per_page=3),
+                     [20, 50, 70])
+    self.assertEqual(len(self.server.requests), 4)
+    self.assertEqual(sample_split_points(client, _SET, 1), [])
+
+  def test_unordered(self):
+    elements = list(partitioned_scan(self.server.client(), _SET, [25, 50, 75], page_size=10))
+    self.assertEqual(sorted(elements), list(range(100)))
+
+  def test_ordered(self):
+    elements = partitioned_scan(self.server.client(), _SET, [10, 30, 31, 90], page_size=7,
+                                workers=2, ordered=True)
+    self.assertEqual(list(elements), list(range(100)))
+
+  def test_sampled(self):
+    elements = partitioned_scan(self.server.client(), _SET, partitions=5, page_size=10,
+                                map_lambda=lambda_("x", var("x")), ordered=True)
+    self.assertEqual(list(elements), [{"mapped": n} for n in range(100)])
+
+  def test_error(self):
+    self.server.handler = _index_handler(100, fail_from=60)
+    scan = partitioned_scan(self.server.client(), _SET, [50], page_size=10)
+    self.assertRaises(UnavailableError, lambda: list(scan))
+
+  def test_stops_early(self):
+    scan = partitioned_scan(self.server.client(), _SET, [25, 50, 75], page_size=5)
+    self.assertEqual(len([next(scan) for _ in range(3)]), 3)
+    scan.close()
+    self.assertLess(len(self.server.requests), 20)
+
+  def test_scales_with_workers(self):
+    self.server.latency = 0.02
+    split_points = list(range(10, 100, 10))
+
+    def timed(workers):
+      start = time()
+      elements = list(partitioned_scan(self.server.client(), _SET, split_points, page_size=5,
+                                       workers=workers))
+      self.assertEqual(len(elements), 100)
+      return time() - start
+
+    self.assertLess(timed(workers=10), timed(workers=1) / 3)
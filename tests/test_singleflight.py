@@ -0,0 +1,118 @@
+from threading import Barrier, Thread
+from time import sleep, time
+from unittest import TestCase
+
+from faunadb import query as q
+from faunadb.cache import QueryCache
+from faunadb.deadline import Deadline
+from faunadb.errors import DeadlineExceededError, NotFound
+from faunadb.singleflight import SingleFlight
+from tests.stub_server import StubResponse, StubServer
+
+_READ = q.get(q.ref(q.collection("things"), "1"))
+_WRITE = q.create(q.collection("things"), {"data": {"a": 1}})
+
+
+def _concurrently(func, count=8):
+  barrier = Barrier(count)
+  results = [None] * count
+
+  def run(i):
+    barrier.wait()
+    try:
+      results[i] = func()
+    except Exception as error: # pylint: disable=broad-except
+      results[i] = error
+
+  threads = [Thread(target=run, args=(i,)) for i in range(count)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return results
+
+
+def _run(client, expression):
+  return client.query(expression)
+
+
+class SingleFlightTest(TestCase):
+  def setUp(self):
+    self.server = StubServer(latency=0.2).start()
+    self.addCleanup(self.server.stop)
+
+  def test_coalesces_reads(self):
+    single_flight = SingleFlight()
+    client = self.server.client(single_flight=single_flight)
+    results = _concurrently(lambda: client.query(_READ))
+    self.assertEqual(len(self.server.requests), 1)
+    self.assertEqual(single_flight.coalesced, 7)
+    self.assertEqual(single_flight.in_flight, 0)
+    self.assertTrue(all(result == results[0] for result in results))
+
+  def test_results_are_copies(self):
+    client = self.server.client(single_flight=SingleFlight())
+    results = _concurrently(lambda: client.query(_READ), count=2)
+    self.assertIsNot(results[0], results[1])
+    results[0]["get"] = "changed"
+    self.assertNotEqual(results[1]["get"], "changed")
+
+  def test_keyed_by_query_and_secret(self):
+    client = self.server.client(single_flight=SingleFlight())
+    other = client.for_secret("other")
+    _concurrently(lambda: client.query(_READ), count=4)
+    self.assertEqual(len(self.server.requests), 1)
+
+    queries = [(client, _READ), (other, _READ), (client, q.get(q.ref(q.collection("things"), "2")))]
+    _concurrently(lambda: _run(*queries.pop()), count=3)
+    self.assertEqual(len(self.server.requests), 4)
+
+  def test_writes_are_not_coalesced(self):
+    single_flight = SingleFlight()
+    client = self.server.client(single_flight=single_flight)
+    _concurrently(lambda: client.query(_WRITE), count=4)
+    self.assertEqual(len(self.server.requests), 4)
+    self.assertEqual(single_flight.coalesced, 0)
+
+  def test_non_deterministic_reads_are_not_coalesced(self):
+    single_flight = SingleFlight()
+    client = self.server.client(single_flight=single_flight)
+    _concurrently(lambda: client.query(q.new_id()), count=4)
+    self.assertEqual(len(self.server.requests), 4)
+    self.assertEqual(single_flight.coalesced, 0)
+
+  def test_followers_wait_within_deadline(self):
+    client = self.server.client(single_flight=SingleFlight())
+    leader = Thread(target=lambda: client.query(_READ))
+    leader.start()
+    self.addCleanup(leader.join)
+    sleep(0.05)
+    start = time()
+    with Deadline(0.05):
+      self.assertRaises(DeadlineExceededError, lambda: client.query(_READ))
+    self.assertLess(time() - start, 0.15)
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_errors_are_shared(self):
+    self.server.handler = lambda request: StubResponse(
+      404, {"errors": [{"code": "instance not found", "description": "missing"}]}, {})
+    client = self.server.client(single_flight=SingleFlight())
+    results = _concurrently(lambda: client.query(_READ), count=4)
+    self.assertTrue(all(isinstance(result, NotFound) for result in results))
+    self.assertEqual(len(self.server.requests), 1)
+    self.assertEqual(client.single_flight.in_flight, 0)
+
+  def test_observer(self):
+    observed = []
+    client = self.server.client(single_flight=SingleFlight(), observer=observed.append)
+    _concurrently(lambda: client.query(_READ), count=4)
+    self.assertEqual(sorted(result.coalesced for result in observed), [False, True, True, True])
+    self.assertTrue(all(result.status_code == 200 for result in observed))
+
+  def test_with_cache(self):
+    cache = QueryCache()
+    client = self.server.client(single_flight=SingleFlight(), query_cache=cache)
+    _concurrently(lambda: client.query(_READ), count=4)
+    client.query(_READ)
+    self.assertEqual(len(self.server.requests), 1)
+    self.assertEqual(cache.hits, 1)
@@ -0,0 +1,236 @@
+import json
+import threading
+from time import sleep, time
+from unittest import TestCase
+
+from faunadb.circuit_breaker import CircuitBreaker, CLOSED
+from faunadb.endpoints import EndpointPool
+from faunadb.errors import StreamError, Unauthorized
+from faunadb.objects import Ref
+from faunadb.query import collection, ref
+from faunadb.streams import POLL, START, VERSION, StreamEvent
+from faunadb.transport import Urllib3Transport
+from tests.stub_server import StubResponse, StubServer
+
+_DOC = ref(collection("things"), "1")
+_REF_JSON = {"@ref": {"id": "1", "collection": {"@ref": {"id": "things", "collection": {
+  "@ref": {"id": "collections"}}}}}}
+_REF = Ref("1", Ref("things", Ref("collections")))
+
+
+def _start(txn):
+  return {"type": "start", "txn": txn, "event": txn}
+
+
+def _version(txn):
+  return {"type": "version", "txn": txn, "event": {
+    "action": "update", "document": {"ref": _REF_JSON, "ts": txn, "data": {"n": txn}}}}
+
+
+def _expected(txn):
+  if txn < 10 or txn % 10 == 0:
+    return StreamEvent(START, txn, txn)
+  return StreamEvent(VERSION, txn, {
+    "action": "update", "document": {"ref": _REF, "ts": txn, "data": {"n": txn}}})
+
+
+class _FakeStreams(object):
+  """
+  Serves a connection to the stream endpoint per item of ``connections``: either the events
+  to send, after which the connection drops unless it is the last one, or a StubResponse.
+  Queries paginating ``events()`` are answered from ``history``.
+  """
+
+  def __init__(self, connections, history=()):
+    self.connections = list(connections)
+    self.history = [{"action": "update", "document": _REF_JSON, "ts": txn, "data": {"n": txn}}
+                    for txn in history]
+    self.hold = threading.Event()
+
+  def __call__(self, request):
+    if request.path.startswith("/stream"):
+      if not self.connections:
+        return StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]}, {})
+      sent = self.connections.pop(0)
+      if isinstance(sent, StubResponse):
+        return sent
+      return StubResponse(200, self._send(sent, last=not self.connections), {})
+    if request.path.startswith("/ping"):
+      return StubResponse(200, {"resource": "Scope write is OK"}, {})
+    body = json.loads(request.body.decode("utf-8"))
+    if "paginate" not in body:
+      return StubResponse(200, {"resource": 5}, {})
+    data = [element for element in self.history if element["ts"] >= body["after"]]
+    resource = {"data": data[:body["size"]]}
+    if len(data) > body["size"]:
+      resource["after"] = data[body["size"]]["ts"]
+    return StubResponse(200, {"resource": resource}, {})
+
+  def _send(self, events, last):
+    for event in events:
+      yield event
+    if last:
+      self.hold.wait(10)
+
+
+class _StreamsTest(TestCase):
+  def serve(self, connections, history=()):
+    self.server = StubServer(handler=_FakeStreams(connections, history)).start()
+    self.addCleanup(self.server.stop)
+    self.addCleanup(self.server.handler.hold.set)
+
+  def paginated(self):
+    bodies = [json.loads(request.body.decode("utf-8")) for request in self.server.requests
+              if not request.path.startswith(("/stream", "/ping"))]
+    return [body for body in bodies if "paginate" in body]
+
+
+class EventStreamTest(_StreamsTest):
+  def take(self, stream, count):
+    events = []
+    with stream:
+      for event in stream:
+        events.append(event)
+        if len(events) == count:
+          break
+    return events
+
+  def test_iterate(self):
+    self.serve([[_start(10), _version(11), _version(12)]])
+    stream = self.server.client().stream(_DOC)
+    self.assertEqual(self.take(stream, 3), [_expected(10), _expected(11), _expected(12)])
+    self.assertTrue(stream.closed)
+    self.assertEqual(stream.last_txn, 12)
+
+    request = self.server.requests[0]
+    self.assertEqual((request.method, request.path), ("POST", "/stream"))
+    self.assertEqual(json.loads(request.body.decode("utf-8")), json.loads(
+      '{"ref": {"collection": "things"}, "id": "1"}'))
+    self.assertEqual(request.headers["Authorization"], "Basic c2VjcmV0Og==")
+
+  def test_fields(self):
+    self.serve([[_start(10)]])
+    self.take(self.server.client().stream(_DOC, fields=["action", "document"]), 1)
+    self.assertEqual(self.server.requests[0].path, "/stream?fields=action%2Cdocument")
+
+  def test_callback(self):
+    self.serve([[_start(10), _version(11)]])
+    events = []
+    received = threading.Event()
+
+    def on_event(event):
+      events.append(event)
+      if len(events) == 2:
+        received.set()
+
+    stream = self.server.client().stream(_DOC, on_event=on_event).start()
+    self.assertTrue(received.wait(5))
+    stream.close()
+    self.assertEqual(events, [_expected(10), _expected(11)])
+    self.assertRaises(TypeError, lambda: list(stream))
+
+  def test_reconnects_and_catches_up(self):
+    self.serve([[_start(10), _version(11)], [_start(20), _version(21)]], history=[11, 13, 15, 21])
+    stream = self.server.client().stream(_DOC, reconnect_delay=0.01, page_size=1)
+    self.assertEqual(self.take(stream, 6), [_expected(txn) for txn in [10, 11, 20, 13, 15, 21]])
+    self.assertEqual(stream.reconnects, 1)
+    self.assertEqual([page["after"] for page in self.paginated()], [12, 15, 21])
+
+  def test_reconnects_after_unavailable(self):
+    self.serve([StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]},
+                             {}), [_start(10)]])
+    stream = self.server.client().stream(_DOC, reconnect_delay=0.01)
+    self.assertEqual(self.take(stream, 1), [_expected(10)])
+    self.assertEqual(stream.reconnects, 1)
+
+  def test_waits_for_circuit_breaker(self):
+    self.serve([StubResponse(503, {"errors": [{"code": "unavailable", "description": "down"}]},
+                             {}), [_start(10)]])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    stream = self.server.client(circuit_breaker=breaker).stream(_DOC, reconnect_delay=0.01)
+    self.assertEqual(self.take(stream, 1), [_expected(10)])
+    self.assertEqual(breaker.state, CLOSED)
+    self.assertGreater(stream.reconnects, 1)
+    self.assertEqual([request.path for request in self.server.requests],
+                     ["/stream", "/ping", "/stream"])
+
+  def test_rejects_unsupported_clients(self):
+    self.serve([])
+    pool = EndpointPool(["http://127.0.0.1:%s" % self.server.port], health_check_interval=None)
+    client = self.server.client(endpoints=pool)
+    self.assertRaises(ValueError, lambda: client.stream(_DOC))
+    client.stream(_DOC, mode=POLL).close()
+    client = self.server.client(transport=Urllib3Transport())
+    self.assertRaises(ValueError, lambda: client.stream(_DOC))
+
+  def test_error_event(self):
+    self.serve([[_start(10), {"type": "error", "txn": 11, "event": {
+      "code": "permission denied", "description": "Insufficient privileges."}}]])
+    stream = self.server.client().stream(_DOC)
+    events = []
+    with self.assertRaises(StreamError) as raised:
+      for event in stream:
+        events.append(event)
+    self.assertEqual(events, [_expected(10)])
+    self.assertEqual(raised.exception.code, "permission denied")
+    self.assertIs(stream.error, raised.exception)
+
+  def test_unauthorized(self):
+    self.serve([StubResponse(401, {"errors": [{"code": "unauthorized", "description": "no"}]},
+                             {})])
+    errors = []
+    ended = threading.Event()
+
+    def on_error(error):
+      errors.append(error)
+      ended.set()
+
+    self.server.client().stream(_DOC, on_event=lambda event: None, on_error=on_error).start()
+    self.assertTrue(ended.wait(5))
+    self.assertIsInstance(errors[0], Unauthorized)
+    self.assertEqual(len(self.server.requests), 1)
+
+  def test_poll(self):
+    self.serve([], history=[11, 12, 13])
+    stream = self.server.client().stream(_DOC, mode=POLL, page_size=2, poll_interval=0.01)
+    self.assertEqual(self.take(stream, 4), [_expected(txn) for txn in [5, 11, 12, 13]])
+    self.assertFalse(any(request.path.startswith("/stream") for request in self.server.requests))
+    self.assertEqual([page["after"] for page in self.paginated()[:3]], [6, 13, 14])
+
+  def test_poll_from_start_ts(self):
+    self.serve([], history=[11, 12, 13])
+    stream = self.server.client().stream(_DOC, mode=POLL, start_ts=11)
+    self.assertEqual(self.take(stream, 3),
+                     [StreamEvent(START, 11, 11), _expected(12), _expected(13)])
+
+  def test_bounded_buffer(self):
+    self.serve([[_start(10)] + [_version(txn) for txn in range(11, 20)]])
+    stream = self.server.client().stream(_DOC, max_buffered=2).start()
+    sleep(0.2)
+    # Two events are buffered, and the third waits for room.
+    self.assertEqual(stream.last_txn, 12)
+    self.assertEqual(self.take(stream, 10), [_expected(txn) for txn in range(10, 20)])
+
+  def test_close_with_full_buffer(self):
+    self.serve([], history=[11, 12, 13, 14])
+    stream = self.server.client().stream(_DOC, mode=POLL, max_buffered=2).start()
+    sleep(0.2)
+    closer = threading.Thread(target=stream.close)
+    closer.start()
+    closer.join(5)
+    events = []
+    consumer = threading.Thread(target=lambda: events.extend(stream))
+    consumer.daemon = True
+    consumer.start()
+    consumer.join(5)
+    self.assertFalse(consumer.is_alive())
+    self.assertEqual(events, [_expected(5), _expected(11)])
+
+  def test_close_interrupts_read(self):
+    self.serve([[_start(10)]])
+    stream = self.server.client().stream(_DOC)
+    self.assertEqual(next(iter(stream)), _expected(10))
+    start = time()
+    stream.close()
+    self.assertLess(time() - start, 1)
+
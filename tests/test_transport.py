@@ -0,0 +1,89 @@
+import socket
+from unittest import TestCase
+
+from requests import Session
+from requests.auth import HTTPBasicAuth
+from requests.exceptions import ConnectionError as RequestsConnectionError, ReadTimeout
+
+from faunadb.client import FaunaClient
+from faunadb.errors import NotFound
+from faunadb.query import add
+from faunadb.transport import RequestsTransport, Urllib3Transport
+from tests.stub_server import StubResponse, StubServer
+
+
+def _unused_port():
+  sock = socket.socket()
+  sock.bind(("127.0.0.1", 0))
+  port = sock.getsockname()[1]
+  sock.close()
+  return port
+
+
+class TransportTest(TestCase):
+  def setUp(self):
+    self.server = StubServer().start()
+    self.addCleanup(self.server.stop)
+
+  def test_default_transport(self):
+    client = self.server.client()
+    self.assertIsInstance(client.transport, RequestsTransport)
+    self.assertIs(client.transport.session, client.session)
+    self.assertIs(client.new_session_client(secret="other").transport, client.transport)
+
+  def test_replacing_session(self):
+    client = self.server.client()
+    session = Session()
+    self.addCleanup(session.close)
+    client.session = session
+    self.assertIs(client.transport.session, session)
+    self.assertEqual(client.query(1), 1)
+
+  def test_auth(self):
+    self.assertEqual(self.server.client(secret="abc").auth, HTTPBasicAuth("abc", ""))
+
+  def test_urllib3_query(self):
+    client = self.server.client(transport=Urllib3Transport())
+    self.assertEqual(client.query(add(1, 2)), {"add": [1, 2]})
+    self.assertEqual(client.get_last_txn_time(), 1)
+
+    headers = self.server.requests[0].headers
+    self.assertEqual(headers["Authorization"], "Basic c2VjcmV0Og==")
+    self.assertEqual(headers["X-FaunaDB-API-Version"], "3")
+    self.assertEqual(headers["Content-Type"], "application/json;charset=utf-8")
+
+  def test_urllib3_ping(self):
+    client = self.server.client(transport=Urllib3Transport(), query_timeout_ms=100)
+    self.assertEqual(client.ping("node", 250), "Scope write is OK")
+    request = self.server.requests[0]
+    self.assertEqual(request.method, "GET")
+    self.assertEqual(request.path, "/ping?scope=node&timeout=250")
+    self.assertEqual(request.headers["X-Query-Timeout"], "100")
+
+  def test_urllib3_session_client(self):
+    client = self.server.client(transport=Urllib3Transport())
+    client.new_session_client(secret="other").query(1)
+    self.assertEqual(self.server.requests[0].headers["Authorization"], "Basic b3RoZXI6")
+
+  def test_urllib3_http_error(self):
+    self.server.handler = lambda request: StubResponse(
+      404, {"errors": [{"code": "instance not found", "description": "missing"}]}, {})
+    client = self.server.client(transport=Urllib3Transport())
+    self.assertRaises(NotFound, lambda: client.query(1))
+
+  def test_urllib3_connection_error(self):
+    client = FaunaClient(secret="secret", domain="127.0.0.1", scheme="http", port=_unused_port(),
+                         transport=Urllib3Transport())
+    self.assertRaises(RequestsConnectionError, lambda: client.query(1))
+
+  def test_urllib3_read_timeout(self):
+    self.server.latency = 0.5
+    client = self.server.client(transport=Urllib3Transport(timeout=0.05))
+    self.assertRaises(ReadTimeout, lambda: client.query(1))
+
+  def test_urllib3_uses_client_timeout(self):
+    self.server.latency = 0.5
+    client = self.server.client(transport=Urllib3Transport(), timeout=0.05)
+    self.assertRaises(ReadTimeout, lambda: client.query(1))
+    client = self.server.client(transport=Urllib3Transport(timeout=5), timeout=0.05)
+    self.assertEqual(client.query(1), 1)